@@ -5,10 +5,24 @@ USD 環境檢查腳本
 此腳本檢查系統是否具備運行 USD 相關工具所需的環境。
 
 This script checks if the system has the required environment for running USD tools.
+
+The USD probe (pxr path, USD version, plugin count) is cached by usd_env_probe.py,
+so repeated runs do not import pxr again.
+
+Usage:
+    python check_usd_environment.py [--json] [--refresh] [--no-cache] [--profile[=PATH]]
 """
 
+import argparse
+import json
 import sys
-import os
+
+import usd_profile
+
+if __name__ == "__main__":
+    usd_profile.start_from_argv()
+
+import usd_env_probe
 
 def check_python_version():
     """檢查 Python 版本"""
@@ -22,42 +36,36 @@ def check_python_version():
     print("  ✓ Python version is acceptable")
     return True
 
-def check_usd_api():
+def check_usd_api(info):
     """檢查 USD Python API"""
     print("\n檢查 USD Python API / Checking USD Python API...")
-    try:
-        from pxr import Usd
-        print("  ✓ USD Python API (pxr) 已安裝")
-        print("  ✓ USD Python API (pxr) is installed")
-        
-        # 嘗試獲取版本資訊
-        try:
-            import pxr
-            print(f"  ✓ pxr 模組路徑: {pxr.__file__}")
-            print(f"  ✓ pxr module path: {pxr.__file__}")
-        except:
-            pass
-        return True
-    except ImportError:
+    pxr_info = info["pxr"]
+    if not pxr_info["available"]:
         print("  ✗ USD Python API (pxr) 未安裝")
         print("  ✗ USD Python API (pxr) is not installed")
         return False
 
-def check_omniverse_environment():
+    print("  ✓ USD Python API (pxr) 已安裝")
+    print("  ✓ USD Python API (pxr) is installed")
+    if pxr_info["path"]:
+        print(f"  ✓ pxr 模組路徑: {pxr_info['path']}")
+        print(f"  ✓ pxr module path: {pxr_info['path']}")
+    if pxr_info["version"]:
+        print(f"  ✓ USD 版本 / USD version: {pxr_info['version']}")
+    if pxr_info["plugin_count"] is not None:
+        print(f"  ✓ 已註冊外掛 / Registered plugins: {pxr_info['plugin_count']}")
+    if info["cached"]:
+        print(f"  ℹ️  結果來自快取 / Cached result: {usd_env_probe.cache_path()} (--refresh to re-probe)")
+    return True
+
+def check_omniverse_environment(info):
     """檢查 Omniverse 環境變數"""
     print("\n檢查 Omniverse 環境 / Checking Omniverse environment...")
     
-    env_vars = {
-        "OMNIVERSE_PATH": os.environ.get("OMNIVERSE_PATH"),
-        "KIT_PATH": os.environ.get("KIT_PATH"),
-        "OMNIVERSE_APP_PATH": os.environ.get("OMNIVERSE_APP_PATH"),
-    }
-    
     found = False
-    for var_name, var_value in env_vars.items():
-        if var_value:
-            print(f"  ✓ {var_name} = {var_value}")
-            found = True
+    for var_name, var_value in info["kit_env"].items():
+        print(f"  ✓ {var_name} = {var_value}")
+        found = True
     
     if not found:
         print("  ✗ 未檢測到 Omniverse 環境變數")
@@ -67,7 +75,27 @@ def check_omniverse_environment():
     
     return found
 
-def main():
+def parse_args(argv=None):
+    """解析命令列參數"""
+    parser = argparse.ArgumentParser(description="Check the environment for the USD tools.")
+    parser.add_argument("--json", action="store_true",
+                        help="print the probe result as JSON (for scripts)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="ignore the cached probe and import pxr again")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="do not read or write the probe cache")
+    usd_profile.add_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    with usd_profile.phase("probe"):
+        info = usd_env_probe.probe(refresh=args.refresh, use_cache=not args.no_cache)
+
+    if args.json:
+        print(json.dumps(info, indent=2))
+        return 0 if info["pxr"]["available"] else 1
+
     separator = "=" * 70
     
     print(separator)
@@ -77,8 +105,8 @@ def main():
     
     results = {
         "python": check_python_version(),
-        "usd_api": check_usd_api(),
-        "omniverse": check_omniverse_environment(),
+        "usd_api": check_usd_api(info),
+        "omniverse": check_omniverse_environment(info),
     }
     
     print()
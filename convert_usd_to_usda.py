@@ -7,9 +7,50 @@ for easier inspection and learning purposes.
 
 Usage:
     python convert_usd_to_usda.py <input.usd> [output.usda]
+    python convert_usd_to_usda.py <dir | glob | file> [...] [--output-dir DIR] [-j N]
 
 If output filename is not provided, it will use the input filename with .usda extension.
 
+By default each file is converted as a single Sdf.Layer without composing its
+references, payloads or sublayers, so converting a layout file only touches
+that one layer. Pass --flatten to compose the stage and export the flattened
+result instead (the previous behaviour).
+
+--with-dependencies walks the sublayer/reference/payload graph of the inputs
+once, converts every referenced .usd layer in topological waves (dependencies
+first) and reports the graph size, depth and critical path.
+--rewrite-asset-paths points the converted layers at the new .usda targets.
+
+Outputs are written to a temporary file next to the target and atomically
+renamed, so an interrupted run never leaves a truncated .usda behind.
+--max-memory MB bounds the estimated memory of the conversions running at the
+same time; the peak RSS of every conversion is reported.
+
+--profile[=PATH] records where the wall time goes (interpreter startup, pxr
+import, plugin registration, layer open, composition, serialization) and writes
+a JSON trace (default: convert_usd_to_usda.profile.json); --profile-imports
+also times every module import. Per-file phases are recorded in this process,
+i.e. in single file mode or with -j 1.
+
+When the warm conversion daemon (usd_convert_daemon.py serve) is running, the
+conversions are sent to its pre-warmed worker processes and this script only
+acts as a thin client; pxr is then not even imported here. Without a daemon
+(or with --no-daemon) everything runs in-process as before.
+
+--verify re-opens every written .usda and compares it with the layer that was
+exported using one hash per prim (spec types, field values, time samples).
+Mismatching prims are reported by path and the output is not published.
+
+Batch runs keep a manifest (.usda_manifest.json) next to the output tree. Files
+whose size, mtime and content hash are unchanged since the last export are
+skipped; layers whose composed dependencies changed are re-exported. Use
+--force to re-export everything or --no-cache to disable the manifest.
+
+Batch mode is used when a directory, a glob pattern or several inputs are
+given. The files are converted on a process pool sized to the available cores
+(override with -j/--jobs), a failing file does not abort the batch, and a
+throughput summary (files/s, MB/s) is printed at the end.
+
 Note: This script requires the USD Python API (pxr module), which is available:
 1. In NVIDIA Omniverse applications (run from within Omniverse Kit environment)
 2. When USD is installed with Python bindings
@@ -20,18 +61,27 @@ Alternative: Use USD Explorer application to convert files:
   3. Choose USDA (ASCII) format
 """
 
+import argparse
+import glob
+import hashlib
+import json
 import sys
 import os
 import platform
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import usd_profile
+from usd_env_probe import in_omniverse_environment
+
+if __name__ == "__main__":
+    # 必須在匯入 pxr 之前啟動，才能量測匯入時間
+    usd_profile.start_from_argv()
 
-def check_environment():
-    """檢查是否在 Omniverse 環境中"""
-    omniverse_indicators = [
-        os.environ.get("OMNIVERSE_PATH"),
-        os.environ.get("KIT_PATH"),
-        os.environ.get("OMNIVERSE_APP_PATH"),
-    ]
-    return any(indicators for indicators in omniverse_indicators if indicators)
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 def print_helpful_message():
     """顯示有用的錯誤訊息和解決方案"""
@@ -42,7 +92,7 @@ def print_helpful_message():
     print()
 
     # 檢查環境
-    in_omniverse = check_environment()
+    in_omniverse = in_omniverse_environment()
     if in_omniverse:
         print("⚠️  檢測到 Omniverse 環境變數，但無法匯入 pxr 模組")
         print("⚠️  Omniverse environment detected, but cannot import pxr module")
@@ -108,49 +158,937 @@ def print_helpful_message():
     print()
     print("=" * 70)
 
-# Try to import USD Python API
-try:
-    from pxr import Usd
-except ImportError:
-    print_helpful_message()
-    sys.exit(1)
+# USD Python API 延遲到第一次轉換時才匯入，
+# 交給常駐轉換服務處理的用戶端不需要付出 pxr 的匯入與外掛載入成本
+Sdf = Usd = None
 
 
-def convert_usd_to_usda(input_path, output_path=None):
+def load_pxr():
+    """
+    匯入 USD Python API (pxr)；重複呼叫不會重新匯入
+
+    Raises:
+        ImportError: 目前的 Python 環境沒有 pxr 模組時
+    """
+    global Sdf, Usd
+    if Sdf is not None:
+        return
+    with usd_profile.phase("import pxr"):
+        from pxr import Sdf, Usd
+
+    if usd_profile.enabled():
+        # 外掛註冊通常延遲到第一次開啟圖層時才發生，剖析時先觸發以便分開計時
+        with usd_profile.phase("plugin registration"):
+            from pxr import Plug
+            Plug.Registry().GetAllPlugins()
+
+
+GLOB_CHARS = ("*", "?", "[")
+# 驗證時忽略的根圖層欄位（匯出時會自動寫入說明文字）
+VERIFY_IGNORED_LAYER_FIELDS = ("comment", "doc")
+# 子圖層欄位另外由 layer.subLayerPaths / subLayerOffsets 比對
+VERIFY_SUBLAYER_FIELDS = ("subLayers", "subLayerOffsets")
+# 每個檔案最多列出的不一致 prim 數量
+MAX_REPORTED_MISMATCHES = 20
+CONVERTIBLE_EXTENSIONS = (".usd", ".usdc")
+# 估算轉換記憶體用量：crate 轉為文字約膨脹數倍，再加上圖層本身的資料
+MEMORY_EXPANSION_FACTOR = 8
+MANIFEST_NAME = ".usda_manifest.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ConversionError(Exception):
+    """轉換失敗時拋出的例外 / Raised when a conversion fails."""
+
+
+class VerificationError(ConversionError):
+    """轉換結果與來源不一致時拋出的例外，mismatches 列出不一致的 prim"""
+
+    def __init__(self, message, mismatches):
+        super().__init__(message)
+        self.mismatches = mismatches
+
+
+def default_output_path(input_path):
+    """回傳與輸入檔同名、副檔名為 .usda 的輸出路徑"""
+    base_name = os.path.splitext(input_path)[0]
+    return f"{base_name}.usda"
+
+
+def convert_usd_to_usda(input_path, output_path=None, verbose=True, dependencies=None,
+                        flatten=False, asset_map=None, verify=False):
     """
     將 USD 檔案轉換為 USDA (ASCII) 格式
 
+    預設只轉換單一 Sdf.Layer，不組合 references/payloads/sublayers；
+    flatten=True 時會開啟完整的 Usd.Stage 並匯出攤平後的結果。
+
     Args:
         input_path: 輸入的 .usd 檔案路徑
         output_path: 輸出的 .usda 檔案路徑（可選）
+        verbose: 是否輸出轉換進度訊息
+        dependencies: 若提供 list，會加入轉換時讀取的其他圖層檔案路徑
+        flatten: 是否組合場景並匯出攤平後的圖層
+        asset_map: 來源圖層絕對路徑 -> 新輸出路徑的對照表，用於改寫資產路徑（僅圖層模式）
+        verify: 寫入後重新開啟輸出檔並與匯出的圖層做結構比對
+
+    Returns:
+        str: 實際寫入的輸出路徑
+
+    Raises:
+        ConversionError: 找不到檔案、無法開啟或匯出失敗時
+        VerificationError: verify=True 且輸出與來源不一致時（輸出檔不會被寫入）
     """
     if not os.path.exists(input_path):
-        print(f"錯誤: 找不到檔案 {input_path}")
-        sys.exit(1)
+        raise ConversionError(f"找不到檔案 {input_path}")
+    load_pxr()
 
     # 如果沒有指定輸出路徑，使用輸入檔名加上 .usda 副檔名
     if output_path is None:
-        base_name = os.path.splitext(input_path)[0]
-        output_path = f"{base_name}.usda"
+        output_path = default_output_path(input_path)
+
+    if verbose:
+        print(f"正在轉換: {input_path} -> {output_path}")
 
-    print(f"正在轉換: {input_path} -> {output_path}")
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
 
+    # 先寫入同目錄的暫存檔再原子性地取代目標，中斷時不會留下不完整的檔案
+    tmp_path = temp_output_path(output_path)
     try:
-        # 開啟 USD 檔案
-        stage = Usd.Stage.Open(input_path)
-        if not stage:
-            print(f"✗ 錯誤: 無法開啟 USD 檔案 {input_path}")
-            sys.exit(1)
+        if flatten:
+            exported = _export_flattened(input_path, tmp_path, dependencies)
+        else:
+            exported = _export_layer(input_path, tmp_path, asset_map)
+        if verify:
+            with usd_profile.phase("verify"):
+                verify_conversion(exported, tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
-        # 匯出為 ASCII 格式 (.usda)
-        stage.Export(output_path)
+    if verbose:
         print(f"✓ 轉換成功: {output_path}")
+        if verify:
+            print("✓ 驗證通過 / verified")
+    return output_path
+
+
+def temp_output_path(output_path):
+    """
+    回傳與輸出檔同目錄、同副檔名的暫存檔路徑
+
+    副檔名必須保留，Sdf 依副檔名決定輸出格式；同目錄才能保證 os.replace 是原子操作。
+    """
+    directory, name = os.path.split(output_path)
+    base, ext = os.path.splitext(name)
+    return os.path.join(directory, f".{base}.{os.getpid()}.tmp{ext}")
+
+
+def reset_peak_rss():
+    """重設本行程的 RSS 峰值（僅 Linux 支援），讓下一次讀取只反映之後的工作"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes():
+    """回傳本行程的 RSS 峰值（bytes）；無法取得時回傳 0"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以 bytes 回報，Linux 以 KB 回報
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def estimate_conversion_memory(path, graph=None, flatten=False):
+    """粗估轉換一個檔案所需的記憶體（bytes），用於 --max-memory 的排程"""
+    paths = [path]
+    if flatten and graph is not None:
+        # 攤平時會載入所有可達的相依圖層
+        pending = list(graph.edges.get(path, []))
+        while pending:
+            dep = pending.pop()
+            if dep not in paths:
+                paths.append(dep)
+                pending.extend(graph.edges.get(dep, []))
+    size = sum(os.path.getsize(p) for p in paths if os.path.isfile(p))
+    return size * MEMORY_EXPANSION_FACTOR
+
+
+def _export_layer(input_path, output_path, asset_map=None):
+    """只開啟單一圖層並匯出，不進行場景組合"""
+    with usd_profile.phase("layer open"):
+        layer = Sdf.Layer.FindOrOpen(input_path)
+    if not layer:
+        raise ConversionError(f"無法開啟 USD 檔案 {input_path}")
+
+    if asset_map:
+        with usd_profile.phase("asset path rewrite"):
+            layer = _rewrite_asset_paths(layer, output_path, asset_map)
+
+    # 匯出為 ASCII 格式 (.usda)，格式由副檔名決定
+    with usd_profile.phase("serialization"):
+        exported = layer.Export(output_path)
+    if not exported:
+        raise ConversionError(f"無法匯出 {output_path}")
+    return layer
+
+
+def _rewrite_asset_paths(layer, output_path, asset_map):
+    """
+    複製圖層並把指向已轉換圖層的資產路徑改為相對於輸出檔的新目標
+
+    來源圖層不會被修改；未出現在 asset_map 中的路徑（貼圖、MDL 等）保持不變。
+    """
+    from pxr import UsdUtils
+
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+
+    def modify(asset_path):
+        if not asset_path:
+            return asset_path
+        target = asset_map.get(os.path.normpath(layer.ComputeAbsolutePath(asset_path)))
+        if target is None:
+            return asset_path
+        relative = os.path.relpath(os.path.abspath(target), output_dir).replace(os.sep, "/")
+        return relative if relative.startswith("../") else f"./{relative}"
+
+    copy = Sdf.Layer.CreateAnonymous(os.path.splitext(output_path)[1])
+    copy.TransferContent(layer)
+    UsdUtils.ModifyAssetPaths(copy, modify)
+    return copy
+
+
+def layer_asset_dependencies(path):
+    """
+    回傳圖層直接引用（sublayers、references、payloads）且可轉換的本機 USD 檔案
+
+    Returns:
+        list: 排序後、不重複的絕對路徑
+    """
+    load_pxr()
+    layer = Sdf.Layer.FindOrOpen(path)
+    if not layer:
+        raise ConversionError(f"無法開啟 USD 檔案 {path}")
+
+    if hasattr(layer, "GetCompositionAssetDependencies"):
+        assets = layer.GetCompositionAssetDependencies()
+    else:
+        assets = layer.GetExternalReferences()
+
+    dependencies = set()
+    for asset in assets:
+        if not asset:
+            continue
+        resolved = os.path.normpath(layer.ComputeAbsolutePath(asset))
+        if resolved.lower().endswith(CONVERTIBLE_EXTENSIONS) and os.path.isfile(resolved):
+            dependencies.add(resolved)
+    return sorted(dependencies)
+
+
+class DependencyGraph:
+    """
+    輸入圖層與其引用圖層組成的相依圖
+
+    每個檔案只開啟一次；共用的相依圖層會合併為同一節點。
+    """
+
+    def __init__(self, edges=None):
+        # 節點 -> 直接相依的節點
+        self.edges = edges or {}
+
+    @classmethod
+    def build(cls, roots):
+        """從 roots 開始以廣度優先走訪相依圖"""
+        edges = {}
+        queue = [os.path.normpath(os.path.abspath(root)) for root in roots]
+        while queue:
+            node = queue.pop(0)
+            if node in edges:
+                continue
+            try:
+                edges[node] = layer_asset_dependencies(node)
+            except ConversionError:
+                # 無法開啟的檔案仍列為節點，讓轉換階段回報錯誤
+                edges[node] = []
+            queue.extend(dep for dep in edges[node] if dep not in edges)
+        return cls(edges)
+
+    @property
+    def nodes(self):
+        return list(self.edges)
+
+    def subgraph(self, nodes):
+        """只保留 nodes 之間的引用"""
+        keep = {os.path.normpath(os.path.abspath(node)) for node in nodes}
+        return DependencyGraph({
+            node: [dep for dep in deps if dep in keep]
+            for node, deps in self.edges.items() if node in keep
+        })
+
+    def edge_count(self):
+        return sum(len(deps) for deps in self.edges.values())
+
+    def waves(self):
+        """
+        依拓撲順序分組：第一波是沒有相依的葉節點，之後每波只依賴先前的波次。
+        若有循環引用，剩餘節點會放在最後一波。
+        """
+        remaining = {node: set(deps) for node, deps in self.edges.items()}
+        waves = []
+        while remaining:
+            wave = sorted(node for node, deps in remaining.items() if not deps)
+            if not wave:
+                print(f"⚠️  偵測到循環引用 / Dependency cycle among {len(remaining)} layer(s)")
+                waves.append(sorted(remaining))
+                break
+            waves.append(wave)
+            for node in wave:
+                del remaining[node]
+            for deps in remaining.values():
+                deps.difference_update(wave)
+        return waves
+
+    def critical_path(self, durations):
+        """
+        以每個節點的轉換耗時為權重，找出最長的相依鏈
+
+        Returns:
+            tuple: (總耗時秒數, 由最上層到葉節點的路徑)
+        """
+        finish = {}
+        previous = {}
+        for wave in self.waves():
+            for node in wave:
+                deps = [dep for dep in self.edges[node] if dep in finish]
+                slowest = max(deps, key=lambda dep: finish[dep], default=None)
+                finish[node] = durations.get(node, 0.0) + (finish[slowest] if slowest else 0.0)
+                previous[node] = slowest
+        if not finish:
+            return 0.0, []
+        node = max(finish, key=finish.get)
+        total = finish[node]
+        path = []
+        while node is not None:
+            path.append(node)
+            node = previous[node]
+        return total, path
+
+
+def print_graph_report(graph, results, root):
+    """輸出相依圖的節點數、深度與關鍵路徑"""
+    durations = {os.path.normpath(os.path.abspath(r["input"])): r["seconds"] for r in results}
+    waves = graph.waves()
+    total, path = graph.critical_path(durations)
+
+    print()
+    print("相依圖 / Dependency Graph")
+    print("-" * 70)
+    print(f"  節點 / Nodes:         {len(graph.nodes)}")
+    print(f"  引用 / Edges:         {graph.edge_count()}")
+    print(f"  深度 / Depth:         {len(waves)} wave(s)")
+    for index, wave in enumerate(waves, 1):
+        seconds = sum(durations.get(node, 0.0) for node in wave)
+        print(f"    wave {index}: {len(wave)} layer(s), {seconds:.2f}s of conversion time")
+    print(f"  關鍵路徑 / Critical path: {total:.2f}s")
+    for node in path:
+        print(f"    {os.path.relpath(node, root)} ({durations.get(node, 0.0):.2f}s)")
+
+
+def _export_flattened(input_path, output_path, dependencies=None):
+    """組合完整場景並匯出攤平後的圖層，同時回報讀取到的相依圖層"""
+    with usd_profile.phase("layer open"):
+        root_layer = Sdf.Layer.FindOrOpen(input_path)
+    if not root_layer:
+        raise ConversionError(f"無法開啟 USD 檔案 {input_path}")
+    with usd_profile.phase("composition"):
+        stage = Usd.Stage.Open(root_layer)
+    if not stage:
+        raise ConversionError(f"無法開啟 USD 檔案 {input_path}")
+
+    # 等同 stage.Export()，但保留攤平後的圖層供驗證使用
+    with usd_profile.phase("flatten"):
+        flattened = stage.Flatten()
+    if not flattened:
+        raise ConversionError(f"無法匯出 {output_path}")
+    with usd_profile.phase("serialization"):
+        exported = flattened.Export(output_path)
+    if not exported:
+        raise ConversionError(f"無法匯出 {output_path}")
+
+    if dependencies is not None:
+        root_path = stage.GetRootLayer().realPath
+        for layer in stage.GetUsedLayers():
+            if layer.realPath and layer.realPath != root_path:
+                dependencies.append(layer.realPath)
+    return flattened
+
+
+def _value_digest(value, digest):
+    """將欄位值加入雜湊；Vt 陣列直接使用其記憶體內容，其餘使用 repr"""
+    if isinstance(value, dict):
+        digest.update(b"{")
+        for key in sorted(value, key=repr):
+            digest.update(repr(key).encode("utf-8"))
+            _value_digest(value[key], digest)
+        digest.update(b"}")
+        return
+    try:
+        view = memoryview(value)
+    except TypeError:
+        text = repr(value)
+        if " object at 0x" in text:
+            # 部分型別（例如 Sdf.PayloadListOp）的 repr 只有記憶體位址，改用 str 取得內容
+            text = str(value)
+        digest.update(text.encode("utf-8"))
+    else:
+        digest.update(view.format.encode("ascii"))
+        digest.update(view.tobytes())
+
+
+def layer_prim_digests(layer):
+    """
+    計算圖層中每個 prim 的結構雜湊
+
+    Returns:
+        dict: prim 路徑 -> {"": prim 本身的雜湊, 屬性名稱: 屬性的雜湊}
+    """
+    load_pxr()
+    prims = {}
+
+    def visit(path):
+        spec = layer.GetObjectAtPath(path)
+        if spec is None:
+            return
+        if isinstance(spec, Sdf.VariantSetSpec) and not spec.variants:
+            # 沒有任何 variant 的 variantSet 不帶意見，.usda 也不會寫出
+            return
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(type(spec).__name__.encode("ascii"))
+        is_root = path == Sdf.Path.absoluteRootPath
+        for key in sorted(spec.ListInfoKeys()):
+            if is_root and key in VERIFY_IGNORED_LAYER_FIELDS + VERIFY_SUBLAYER_FIELDS:
+                continue
+            try:
+                value = spec.GetInfo(key)
+            except TypeError:
+                # 無法轉換成 Python 的欄位只比對欄位名稱
+                value = None
+            digest.update(key.encode("utf-8"))
+            _value_digest(value, digest)
+        if is_root and layer.subLayerPaths:
+            # std::vector<SdfLayerOffset> 沒有 Python 轉換器，改由圖層取得每個子圖層的路徑與 offset/scale；
+            # 沒有子圖層時 .usda 不會寫出這兩個欄位，因此也不列入雜湊
+            digest.update(b"subLayers")
+            _value_digest([(sublayer, offset.offset, offset.scale) for sublayer, offset
+                           in zip(layer.subLayerPaths, layer.subLayerOffsets)], digest)
 
+        if path.IsPropertyPath():
+            prim_path, name = path.GetPrimOrPrimVariantSelectionPath(), path.name
+        else:
+            prim_path, name = path, ""
+        prims.setdefault(str(prim_path), {})[name] = digest.hexdigest()
+
+    layer.Traverse(Sdf.Path.absoluteRootPath, visit)
+    return prims
+
+
+def compare_layers(expected, actual):
+    """
+    以每個 prim 的雜湊比較兩個圖層
+
+    Returns:
+        list: 不一致的描述（依 prim 路徑排序），完全一致時為空
+    """
+    expected_prims = layer_prim_digests(expected)
+    actual_prims = layer_prim_digests(actual)
+    mismatches = []
+    for path in sorted(set(expected_prims) | set(actual_prims)):
+        want = expected_prims.get(path)
+        got = actual_prims.get(path)
+        if want == got:
+            continue
+        if got is None:
+            mismatches.append(f"{path}: missing in output")
+        elif want is None:
+            mismatches.append(f"{path}: unexpected in output")
+        else:
+            names = sorted(name or "<prim>" for name in set(want) | set(got)
+                           if want.get(name) != got.get(name))
+            mismatches.append(f"{path}: differs ({', '.join(names)})")
+    return mismatches
+
+
+def verify_conversion(exported, output_path):
+    """
+    重新開啟輸出檔並與匯出的圖層比對
+
+    Raises:
+        VerificationError: 有任何 prim 不一致時
+    """
+    # 以匿名方式開啟，確保讀到的是磁碟上的檔案而不是快取中的圖層
+    written = Sdf.Layer.OpenAsAnonymous(output_path)
+    if not written:
+        raise ConversionError(f"無法重新開啟輸出檔 {output_path}")
+    mismatches = compare_layers(exported, written)
+    if mismatches:
+        raise VerificationError(
+            f"驗證失敗: {len(mismatches)} 個 prim 不一致 / verification failed", mismatches)
+
+
+def file_fingerprint(path):
+    """回傳檔案的 size、mtime_ns 與 sha256，作為快取判斷依據"""
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+
+
+class ConversionManifest:
+    """
+    增量轉換用的持久化清單（.usda_manifest.json）
+
+    每個來源檔記錄 size、mtime、內容雜湊、輸出路徑，以及組合時讀取的
+    相依圖層指紋。size 與 mtime 相同時直接視為未變更；否則比對內容雜湊，
+    雜湊相同時只更新 mtime。任一相依圖層變更時，引用它的圖層也會重新匯出。
+    """
+
+    VERSION = 1
+
+    def __init__(self, path, entries=None):
+        self.path = path
+        self.entries = entries or {}
+        self._root = os.path.dirname(os.path.abspath(path))
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path):
+        """讀取清單；檔案不存在、損毀或版本不符時回傳空清單"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get("version") != cls.VERSION:
+            return cls(path)
+        return cls(path, data.get("entries", {}))
+
+    def _key(self, path):
+        return os.path.relpath(os.path.abspath(path), self._root).replace(os.sep, "/")
+
+    def _path(self, key):
+        return os.path.normpath(os.path.join(self._root, key))
+
+    def _matches(self, path, recorded):
+        """檢查檔案是否與記錄的指紋相符（必要時才計算雜湊）"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size != recorded.get("size"):
+            return False
+        if stat.st_mtime_ns == recorded.get("mtime_ns"):
+            return True
+        if file_fingerprint(path)["sha256"] != recorded.get("sha256"):
+            return False
+        # 內容相同但 mtime 改變（例如重新 checkout），更新 mtime 讓下次只需 stat
+        recorded["mtime_ns"] = stat.st_mtime_ns
+        self._dirty = True
+        return True
+
+    def is_current(self, input_path, output_path, options=None):
+        """來源檔、輸出檔、轉換選項與所有相依圖層都未變更時回傳 True"""
+        entry = self.entries.get(self._key(input_path))
+        if not entry or entry.get("output") != self._key(output_path):
+            return False
+        wanted = dict(options or {})
+        recorded = dict(entry.get("options", {}))
+        # 驗證過的輸出也滿足不需驗證的請求，反之則需要重新轉換
+        if recorded.pop("verify", False) < wanted.pop("verify", False) or recorded != wanted:
+            return False
+        if not os.path.isfile(output_path):
+            return False
+        if not self._matches(input_path, entry.get("source", {})):
+            return False
+        return all(
+            self._matches(self._path(key), recorded)
+            for key, recorded in entry.get("dependencies", {}).items()
+        )
+
+    def record(self, input_path, output_path, dependencies=(), options=None):
+        """記錄一次成功的轉換"""
+        self.entries[self._key(input_path)] = {
+            "source": file_fingerprint(input_path),
+            "output": self._key(output_path),
+            "options": dict(options or {}),
+            "dependencies": {
+                self._key(path): file_fingerprint(path)
+                for path in dependencies if os.path.isfile(path)
+            },
+        }
+        self._dirty = True
+
+    def save(self):
+        """以暫存檔 + 原子性取代的方式寫回清單"""
+        if not self._dirty:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "entries": self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+def collect_inputs(paths, pattern="*.usd"):
+    """
+    展開輸入參數為 USD 檔案清單
+
+    目錄會遞迴搜尋符合 `pattern` 的檔案，含萬用字元的參數會以 glob 展開，
+    其餘視為單一檔案。重複的檔案只會保留一次。
+
+    Args:
+        paths: 檔案、目錄或 glob 樣式的清單
+        pattern: 搜尋目錄時使用的檔名樣式
+
+    Returns:
+        list: 依輸入順序排列、不重複的檔案路徑
+    """
+    files = []
+    seen = set()
+
+    def add(path):
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            files.append(path)
+
+    for path in paths:
+        if os.path.isdir(path):
+            matches = glob.glob(os.path.join(path, "**", pattern), recursive=True)
+            for match in sorted(matches):
+                if os.path.isfile(match):
+                    add(match)
+        elif any(char in path for char in GLOB_CHARS):
+            for match in sorted(glob.glob(path, recursive=True)):
+                if os.path.isfile(match):
+                    add(match)
+        else:
+            add(path)
+    return files
+
+
+def batch_root(paths):
+    """回傳批次輸入的共同根目錄，用於在輸出目錄中重建相對結構"""
+    directories = [os.path.abspath(os.path.dirname(path)) for path in paths]
+    if not directories:
+        return os.getcwd()
+    return os.path.commonpath(directories)
+
+
+def batch_output_path(input_path, root, output_dir=None):
+    """計算批次模式的輸出路徑；指定 output_dir 時保留相對於 root 的目錄結構"""
+    if output_dir is None:
+        return default_output_path(input_path)
+    relative = os.path.relpath(os.path.abspath(input_path), root)
+    return os.path.join(output_dir, default_output_path(relative))
+
+
+def _convert_job(input_path, output_path, flatten=False, asset_map=None, verify=False):
+    """
+    批次模式的工作函式（在子行程中執行）
+
+    所有錯誤都會被捕捉並回報在結果中，不會中斷整個批次。
+    """
+    reset_peak_rss()
+    start = time.perf_counter()
+    result = {
+        "input": input_path,
+        "output": output_path,
+        "ok": False,
+        "error": "",
+        "bytes": os.path.getsize(input_path) if os.path.isfile(input_path) else 0,
+        "dependencies": [],
+        "mismatches": [],
+    }
+    try:
+        convert_usd_to_usda(input_path, output_path, verbose=False,
+                            dependencies=result["dependencies"], flatten=flatten,
+                            asset_map=asset_map, verify=verify)
+        result["ok"] = True
+    except VerificationError as e:
+        result["error"] = str(e)
+        result["mismatches"] = e.mismatches[:MAX_REPORTED_MISMATCHES]
     except Exception as e:
-        print(f"✗ 轉換時發生錯誤: {e}")
-        import traceback
-        traceback.print_exc()
+        result["error"] = str(e) or e.__class__.__name__
+    result["seconds"] = time.perf_counter() - start
+    result["peak_rss"] = peak_rss_bytes()
+    return result
+
+
+def _print_job_result(result, done, total):
+    """輸出單一檔案的批次結果"""
+    prefix = f"[{done}/{total}]"
+    if result["ok"]:
+        print(f"{prefix} ✓ {result['input']} -> {result['output']} "
+              f"({result['seconds']:.2f}s, peak RSS {result['peak_rss'] / (1024 * 1024):.1f} MB)")
+    else:
+        print(f"{prefix} ✗ {result['input']}: {result['error']}")
+
+
+def print_batch_summary(results, elapsed, skipped=0):
+    """輸出批次轉換的成功/失敗統計與吞吐量 (files/s, MB/s)"""
+    succeeded = [r for r in results if r["ok"]]
+    failed = [r for r in results if not r["ok"]]
+    total_mb = sum(r["bytes"] for r in succeeded) / (1024 * 1024)
+    elapsed = max(elapsed, 1e-9)
+
+    print()
+    print("=" * 70)
+    print("批次轉換摘要 / Batch Summary")
+    print("=" * 70)
+    print(f"  檔案總數 / Files:     {len(results) + skipped}")
+    print(f"  未變更 / Unchanged:   {skipped}")
+    print(f"  成功 / Succeeded:     {len(succeeded)}")
+    print(f"  失敗 / Failed:        {len(failed)}")
+    print(f"  耗時 / Elapsed:       {elapsed:.2f}s")
+    print(f"  吞吐量 / Throughput:  {len(succeeded) / elapsed:.2f} files/s, {total_mb / elapsed:.2f} MB/s")
+    if results:
+        heaviest = max(results, key=lambda r: r.get("peak_rss", 0))
+        print(f"  最大 RSS / Peak RSS:  {heaviest.get('peak_rss', 0) / (1024 * 1024):.1f} MB "
+              f"({heaviest['input']})")
+    if failed:
+        print()
+        print("失敗的檔案 / Failed files:")
+        for result in failed:
+            print(f"  ✗ {result['input']}: {result['error']}")
+            for mismatch in result.get("mismatches", []):
+                print(f"      {mismatch}")
+    print("=" * 70)
+
+
+def default_manifest_path(inputs, output_dir=None):
+    """清單預設放在輸出目錄；未指定輸出目錄時放在來源的共同根目錄"""
+    return os.path.join(output_dir or batch_root(inputs), MANIFEST_NAME)
+
+
+def convert_batch(inputs, output_dir=None, jobs=None, manifest=None, force=False,
+                  flatten=False, graph=None, rewrite_asset_paths=False, max_memory=None,
+                  verify=False, executor=None):
+    """
+    以行程池平行轉換多個 USD 檔案
+
+    Args:
+        inputs: 要轉換的 .usd 檔案清單
+        output_dir: 輸出目錄（可選，預設寫在來源檔旁邊）
+        jobs: 工作行程數（預設為可用 CPU 核心數）
+        manifest: ConversionManifest（可選），用於略過未變更的檔案
+        force: 忽略清單內容，全部重新匯出
+        flatten: 組合場景並匯出攤平後的圖層（較慢）
+        graph: DependencyGraph（可選）；提供時依拓撲波次排程，inputs 應為圖中的節點
+        rewrite_asset_paths: 把指向批次內圖層的資產路徑改為新的 .usda 輸出
+        max_memory: 同時執行之轉換的估計記憶體上限（bytes，可選）
+        verify: 寫入後以每個 prim 的雜湊驗證輸出與來源一致
+        executor: 執行轉換的 Executor（可選，例如常駐服務的 DaemonExecutor）；
+            未提供時使用本機的行程池
+
+    Returns:
+        list: 每個已轉換檔案的結果 dict（input, output, ok, error, bytes, seconds）
+    """
+    root = batch_root(inputs)
+    outputs = {path: batch_output_path(path, root, output_dir) for path in inputs}
+    waves = graph.waves() if graph else [list(inputs)]
+    options = {"flatten": flatten, "rewrite_asset_paths": rewrite_asset_paths, "verify": verify}
+
+    asset_map = {}
+    if rewrite_asset_paths:
+        asset_map = {os.path.normpath(os.path.abspath(path)): output
+                     for path, output in outputs.items()}
+
+    def make_task(path):
+        deps = graph.edges.get(path, []) if graph else []
+        return (path, outputs[path], flatten,
+                {dep: asset_map[dep] for dep in deps if dep in asset_map} or None, verify)
+
+    total = len(inputs)
+    skipped = 0
+    if manifest is not None and not force:
+        pending_waves = []
+        for wave in waves:
+            pending = [path for path in wave
+                       if not manifest.is_current(path, outputs[path], options)]
+            skipped += len(wave) - len(pending)
+            pending_waves.append(pending)
+        waves = [wave for wave in pending_waves if wave]
+    pending_total = total - skipped
+    if executor is not None:
+        jobs = executor.workers
+    jobs = max(1, min(jobs or os.cpu_count() or 1, pending_total or 1))
+
+    if skipped:
+        print(f"略過 {skipped} 個未變更的檔案 / Skipping {skipped} unchanged file(s)")
+    if executor is not None:
+        print(f"批次轉換 {pending_total} 個檔案，使用常駐服務 {executor.address}")
+        print(f"Converting {pending_total} files on daemon {executor.address} "
+              f"({executor.workers} warm worker(s))")
+    else:
+        print(f"批次轉換 {pending_total} 個檔案，使用 {jobs} 個工作行程")
+        print(f"Converting {pending_total} files with {jobs} worker(s)")
+    print()
+
+    results = []
+    start = time.perf_counter()
+    if executor is None and jobs == 1:
+        for wave in waves:
+            for path in wave:
+                results.append(_convert_job(*make_task(path)))
+                _print_job_result(results[-1], len(results), pending_total)
+    else:
+        with executor or ProcessPoolExecutor(max_workers=jobs) as pool:
+            # 同一波次內平行轉換；下一波次等上一波次完成後才開始
+            for wave in waves:
+                # 大檔案先排，縮短整體完成時間
+                estimates = {path: estimate_conversion_memory(path, graph, flatten) for path in wave}
+                queue = sorted(wave, key=estimates.get, reverse=True)
+                running = {}
+                in_flight = 0
+                while queue or running:
+                    # 至少保留一個執行中的工作，避免單一大檔案超過上限時卡住
+                    while queue and (not running or max_memory is None
+                                     or in_flight + estimates[queue[0]] <= max_memory):
+                        path = queue.pop(0)
+                        running[pool.submit(_convert_job, *make_task(path))] = estimates[path]
+                        in_flight += estimates[path]
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        in_flight -= running.pop(future)
+                        results.append(future.result())
+                        _print_job_result(results[-1], len(results), pending_total)
+    elapsed = time.perf_counter() - start
+
+    if manifest is not None:
+        for result in results:
+            if result["ok"]:
+                manifest.record(result["input"], result["output"], result["dependencies"], options)
+        manifest.save()
+
+    print_batch_summary(results, elapsed, skipped)
+    if graph:
+        print_graph_report(graph, results, root)
+    return results
+
+
+def convert_on_daemon(executor, input_path, output_path=None, flatten=False, verify=False):
+    """單一檔案模式：交給常駐服務轉換並輸出與本機轉換相同的訊息，失敗時結束程式"""
+    if output_path is None:
+        output_path = default_output_path(input_path)
+    print(f"正在轉換: {input_path} -> {output_path} (daemon {executor.address})")
+    with executor:
+        result = executor.submit(_convert_job, input_path, output_path, flatten, None,
+                                 verify).result()
+    if not result["ok"]:
+        print(f"✗ 錯誤: {result['error']}")
+        for mismatch in result["mismatches"]:
+            print(f"    {mismatch}")
         sys.exit(1)
+    print(f"✓ 轉換成功: {output_path} ({result['seconds']:.2f}s)")
+    if verify:
+        print("✓ 驗證通過 / verified")
+    print(f"  峰值 RSS / Peak RSS (worker): {result['peak_rss'] / (1024 * 1024):.1f} MB")
+
+
+def parse_args(argv=None):
+    """解析命令列參數"""
+    parser = argparse.ArgumentParser(
+        description="Convert binary USD files (.usd) to ASCII USDA (.usda).",
+    )
+    parser.add_argument(
+        "inputs", nargs="+",
+        help="input .usd files, directories or glob patterns",
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="output .usda path (single file mode only)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        help="write batch outputs under this directory, mirroring the input tree",
+    )
+    parser.add_argument(
+        "--pattern", default="*.usd",
+        help="file pattern used when an input is a directory (default: *.usd)",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None,
+        help="number of worker processes (default: number of CPU cores)",
+    )
+    parser.add_argument(
+        "--flatten", action="store_true",
+        help="compose the stage and export the flattened result instead of the single layer",
+    )
+    parser.add_argument(
+        "--with-dependencies", action="store_true",
+        help="also convert every .usd layer referenced by the inputs, in dependency order",
+    )
+    parser.add_argument(
+        "--rewrite-asset-paths", action="store_true",
+        help="point references to converted layers at their new .usda outputs",
+    )
+    parser.add_argument(
+        "--max-memory", type=float, default=None, metavar="MB",
+        help="upper bound for the estimated memory of concurrently running conversions",
+    )
+    parser.add_argument(
+        "--verify", action="store_true",
+        help="re-open each output and compare it prim by prim with the exported layer",
+    )
+    parser.add_argument(
+        "--manifest",
+        help=f"incremental cache manifest (default: <output tree>/{MANIFEST_NAME})",
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="re-export every file even if the manifest says it is unchanged",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="do not read or write the incremental cache manifest",
+    )
+    parser.add_argument(
+        "--daemon", metavar="ADDRESS",
+        help="conversion daemon to use (Unix socket path or HOST:PORT, "
+             "default: the usd_convert_daemon.py default address if it is running)",
+    )
+    parser.add_argument(
+        "--no-daemon", action="store_true",
+        help="always convert in this process, even if a conversion daemon is running",
+    )
+    usd_profile.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.rewrite_asset_paths and args.flatten:
+        parser.error("--rewrite-asset-paths cannot be combined with --flatten")
+
+    # 相容舊用法: convert_usd_to_usda.py <input.usd> <output.usda>
+    if (args.output is None and len(args.inputs) == 2
+            and args.inputs[1].lower().endswith(".usda")):
+        args.output = args.inputs.pop()
+    return args
 
 
 def main():
@@ -159,12 +1097,91 @@ def main():
         print("\n範例:")
         print("  python convert_usd_to_usda.py Factory_Lite/Factory_Lite.usd")
         print("  python convert_usd_to_usda.py Factory_Lite/SubUSDs/Vehicle_Hanger_Adjust.usd")
+        print("  python convert_usd_to_usda.py Factory_Lite --output-dir Factory_Lite_usda")
+        print("  python convert_usd_to_usda.py \"Factory_Lite/SubUSDs/*.usd\" -j 8")
+        sys.exit(1)
+
+    args = parse_args()
+
+    executor = None
+    if not args.no_daemon:
+        import usd_convert_daemon
+        executor = usd_convert_daemon.connect(args.daemon)
+        if executor is None and args.daemon:
+            print(f"⚠️  找不到常駐轉換服務 {args.daemon}，改用本機轉換")
+            print(f"⚠️  No conversion daemon at {args.daemon}, converting in-process")
+
+    # 相依圖需要在本行程開啟圖層，其餘工作交給常駐服務時不需要 pxr
+    if executor is None or args.with_dependencies or args.rewrite_asset_paths:
+        try:
+            load_pxr()
+        except ImportError:
+            print_helpful_message()
+            sys.exit(1)
+
+    single_file = (
+        len(args.inputs) == 1
+        and args.output_dir is None
+        and not args.with_dependencies
+        and not args.rewrite_asset_paths
+        and not os.path.isdir(args.inputs[0])
+        and not any(char in args.inputs[0] for char in GLOB_CHARS)
+    )
+    if single_file and executor is not None:
+        convert_on_daemon(executor, args.inputs[0], args.output, args.flatten, args.verify)
+        return
+
+    if single_file:
+        try:
+            with usd_profile.phase("convert"):
+                convert_usd_to_usda(args.inputs[0], args.output, flatten=args.flatten,
+                                    verify=args.verify)
+            print(f"  峰值 RSS / Peak RSS: {peak_rss_bytes() / (1024 * 1024):.1f} MB")
+        except VerificationError as e:
+            print(f"✗ 錯誤: {e}")
+            for mismatch in e.mismatches[:MAX_REPORTED_MISMATCHES]:
+                print(f"    {mismatch}")
+            sys.exit(1)
+        except ConversionError as e:
+            print(f"✗ 錯誤: {e}")
+            sys.exit(1)
+        except Exception as e:
+            print(f"✗ 轉換時發生錯誤: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+        return
+
+    if args.output:
+        print("錯誤: -o/--output 僅適用於單一檔案，批次模式請使用 --output-dir")
+        sys.exit(1)
+
+    inputs = collect_inputs(args.inputs, args.pattern)
+    if not inputs:
+        print(f"錯誤: 找不到符合的 USD 檔案: {' '.join(args.inputs)}")
         sys.exit(1)
 
-    input_path = sys.argv[1]
-    output_path = sys.argv[2] if len(sys.argv) > 2 else None
+    graph = None
+    if args.with_dependencies or args.rewrite_asset_paths:
+        with usd_profile.phase("dependency graph"):
+            graph = DependencyGraph.build(inputs)
+        if not args.with_dependencies:
+            # 只改寫批次內彼此之間的引用，不額外轉換其他檔案
+            graph = graph.subgraph(inputs)
+        inputs = graph.nodes
+
+    manifest = None
+    if not args.no_cache:
+        manifest = ConversionManifest.load(
+            args.manifest or default_manifest_path(inputs, args.output_dir))
 
-    convert_usd_to_usda(input_path, output_path)
+    max_memory = args.max_memory * 1024 * 1024 if args.max_memory else None
+    with usd_profile.phase("batch"):
+        results = convert_batch(inputs, args.output_dir, args.jobs, manifest, args.force,
+                                args.flatten, graph, args.rewrite_asset_paths, max_memory,
+                                args.verify, executor)
+    if not all(result["ok"] for result in results):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+USDA to USD (crate) Converter Script
+
+Counterpart of convert_usd_to_usda.py: re-crates edited ASCII .usda files into
+the binary crate format (.usd) that production viewers load fastest.
+
+Usage:
+    python convert_usda_to_usd.py <input.usda> [output.usd]
+    python convert_usda_to_usd.py <dir | glob | file> [...] [--output-dir DIR] [-j N]
+
+If output filename is not provided, it will use the input filename with .usd
+extension. Existing files are only replaced when --overwrite is given, because
+the default target is usually the original crate file the .usda came from.
+
+For every file the script reports the size delta and the open time of both
+forms, measured with Sdf.Layer.FindOrOpen: "cold" is the first open in the
+process, "warm" re-opens the file after the layer was released (OS cache warm).
+
+Crate files compress their numeric arrays; --usdc-version selects the crate
+version to write (0.8.0 and later use the compressed encodings).
+
+Note: This script requires the USD Python API (pxr module), see
+convert_usd_to_usda.py and check_usd_environment.py for setup help.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from convert_usd_to_usda import (
+    GLOB_CHARS,
+    ConversionError,
+    batch_root,
+    collect_inputs,
+    print_helpful_message,
+    temp_output_path,
+)
+
+try:
+    from pxr import Sdf
+except ImportError:
+    print_helpful_message()
+    sys.exit(1)
+
+USDC_VERSION_ENV = "USD_WRITE_NEW_USDC_FILES_AS_VERSION"
+
+
+def default_output_path(input_path):
+    """回傳與輸入檔同名、副檔名為 .usd 的輸出路徑"""
+    base_name = os.path.splitext(input_path)[0]
+    return f"{base_name}.usd"
+
+
+def batch_output_path(input_path, root, output_dir=None):
+    """計算批次模式的輸出路徑；指定 output_dir 時保留相對於 root 的目錄結構"""
+    if output_dir is None:
+        return default_output_path(input_path)
+    relative = os.path.relpath(os.path.abspath(input_path), root)
+    return os.path.join(output_dir, default_output_path(relative))
+
+
+def time_layer_open(path):
+    """
+    量測 Sdf.Layer.FindOrOpen 的開啟時間
+
+    Returns:
+        tuple: (cold 秒數, warm 秒數)；cold 為本行程第一次開啟，
+        warm 為釋放圖層後再次開啟
+    """
+    if Sdf.Layer.Find(path):
+        raise ConversionError(f"{path} 已在記憶體中，無法量測開啟時間")
+
+    start = time.perf_counter()
+    layer = Sdf.Layer.FindOrOpen(path)
+    cold = time.perf_counter() - start
+    if not layer:
+        raise ConversionError(f"無法開啟 {path}")
+    del layer
+
+    start = time.perf_counter()
+    layer = Sdf.Layer.FindOrOpen(path)
+    warm = time.perf_counter() - start
+    del layer
+    return cold, warm
+
+
+def convert_usda_to_usd(input_path, output_path=None, overwrite=False):
+    """
+    將 USDA 檔案轉換為 crate (.usd) 格式，並量測大小與開啟時間
+
+    Args:
+        input_path: 輸入的 .usda 檔案路徑
+        output_path: 輸出的 .usd 檔案路徑（可選）
+        overwrite: 是否允許覆寫已存在的輸出檔
+
+    Returns:
+        dict: input, output, input_bytes, output_bytes, open_usda, open_usd
+        （open_* 為 (cold, warm) 秒數）
+
+    Raises:
+        ConversionError: 找不到檔案、輸出已存在、無法開啟或匯出失敗時
+    """
+    if not os.path.exists(input_path):
+        raise ConversionError(f"找不到檔案 {input_path}")
+
+    if output_path is None:
+        output_path = default_output_path(input_path)
+    if os.path.exists(output_path) and not overwrite:
+        raise ConversionError(f"輸出檔已存在: {output_path}（使用 --overwrite 覆寫）")
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    if Sdf.Layer.Find(input_path):
+        raise ConversionError(f"{input_path} 已在記憶體中，無法量測開啟時間")
+
+    # 開啟文字圖層本身就是 cold open 的量測
+    start = time.perf_counter()
+    layer = Sdf.Layer.FindOrOpen(input_path)
+    usda_cold = time.perf_counter() - start
+    if not layer:
+        raise ConversionError(f"無法開啟 USDA 檔案 {input_path}")
+
+    tmp_path = temp_output_path(output_path)
+    try:
+        # .usd 副檔名搭配 format=usdc 參數會寫出 crate 格式
+        if not layer.Export(tmp_path, args={"format": "usdc"}):
+            raise ConversionError(f"無法匯出 {output_path}")
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    del layer
+
+    start = time.perf_counter()
+    layer = Sdf.Layer.FindOrOpen(input_path)
+    usda_warm = time.perf_counter() - start
+    del layer
+
+    return {
+        "input": input_path,
+        "output": output_path,
+        "input_bytes": os.path.getsize(input_path),
+        "output_bytes": os.path.getsize(output_path),
+        "open_usda": (usda_cold, usda_warm),
+        "open_usd": time_layer_open(output_path),
+    }
+
+
+def _convert_job(input_path, output_path, overwrite):
+    """批次模式的工作函式（在子行程中執行），錯誤會回報在結果中"""
+    try:
+        result = convert_usda_to_usd(input_path, output_path, overwrite)
+        result["ok"] = True
+        result["error"] = ""
+    except Exception as e:
+        result = {"input": input_path, "output": output_path, "ok": False,
+                  "error": str(e) or e.__class__.__name__}
+    return result
+
+
+def _format_ms(seconds):
+    return f"{seconds * 1000:.1f}ms"
+
+
+def print_result(result):
+    """輸出單一檔案的大小與開啟時間比較"""
+    if not result["ok"]:
+        print(f"✗ {result['input']}: {result['error']}")
+        return
+    before = result["input_bytes"]
+    after = result["output_bytes"]
+    ratio = after / before if before else 0.0
+    usda_cold, usda_warm = result["open_usda"]
+    usd_cold, usd_warm = result["open_usd"]
+    print(f"✓ {result['input']} -> {result['output']}")
+    print(f"    size: {before / 1024:.1f} KB -> {after / 1024:.1f} KB "
+          f"({after - before:+,d} bytes, {ratio:.2f}x)")
+    print(f"    open cold: {_format_ms(usda_cold)} -> {_format_ms(usd_cold)}, "
+          f"warm: {_format_ms(usda_warm)} -> {_format_ms(usd_warm)}")
+
+
+def print_summary(results, elapsed):
+    """輸出整批的大小與開啟時間總計"""
+    succeeded = [r for r in results if r["ok"]]
+    failed = [r for r in results if not r["ok"]]
+    total_before = sum(r["input_bytes"] for r in succeeded)
+    total_after = sum(r["output_bytes"] for r in succeeded)
+
+    def total_open(key, index):
+        return sum(r[key][index] for r in succeeded)
+
+    print()
+    print("=" * 70)
+    print("轉換摘要 / Summary")
+    print("=" * 70)
+    print(f"  成功 / Succeeded:  {len(succeeded)}")
+    print(f"  失敗 / Failed:     {len(failed)}")
+    print(f"  耗時 / Elapsed:    {elapsed:.2f}s")
+    if succeeded:
+        print(f"  大小 / Size:       {total_before / (1024 * 1024):.2f} MB -> "
+              f"{total_after / (1024 * 1024):.2f} MB "
+              f"({(total_after - total_before) / (1024 * 1024):+.2f} MB)")
+        print(f"  開啟 cold / Open cold: {_format_ms(total_open('open_usda', 0))} -> "
+              f"{_format_ms(total_open('open_usd', 0))}")
+        print(f"  開啟 warm / Open warm: {_format_ms(total_open('open_usda', 1))} -> "
+              f"{_format_ms(total_open('open_usd', 1))}")
+    print("=" * 70)
+
+
+def convert_batch(inputs, output_dir=None, jobs=None, overwrite=False):
+    """
+    以行程池平行轉換多個 USDA 檔案
+
+    Returns:
+        list: 每個檔案的結果 dict
+    """
+    root = batch_root(inputs)
+    tasks = [(path, batch_output_path(path, root, output_dir), overwrite) for path in inputs]
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(tasks)))
+
+    print(f"轉換 {len(tasks)} 個檔案，使用 {jobs} 個工作行程")
+    print(f"Converting {len(tasks)} files with {jobs} worker(s)")
+    print()
+
+    results = []
+    start = time.perf_counter()
+    if jobs == 1:
+        for task in tasks:
+            results.append(_convert_job(*task))
+            print_result(results[-1])
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(_convert_job, *task) for task in tasks]
+            for future in as_completed(futures):
+                results.append(future.result())
+                print_result(results[-1])
+    print_summary(results, time.perf_counter() - start)
+    return results
+
+
+def parse_args(argv=None):
+    """解析命令列參數"""
+    parser = argparse.ArgumentParser(
+        description="Convert ASCII USDA files (.usda) back to binary crate USD (.usd).",
+    )
+    parser.add_argument(
+        "inputs", nargs="+",
+        help="input .usda files, directories or glob patterns",
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="output .usd path (single file mode only)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        help="write outputs under this directory, mirroring the input tree",
+    )
+    parser.add_argument(
+        "--pattern", default="*.usda",
+        help="file pattern used when an input is a directory (default: *.usda)",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None,
+        help="number of worker processes (default: number of CPU cores)",
+    )
+    parser.add_argument(
+        "--overwrite", action="store_true",
+        help="replace existing output files (e.g. the original crate file)",
+    )
+    parser.add_argument(
+        "--usdc-version",
+        help=f"crate version to write, sets {USDC_VERSION_ENV} (e.g. 0.8.0)",
+    )
+    parser.add_argument(
+        "--json", metavar="PATH",
+        help="also write the per-file size/open-time report as JSON",
+    )
+    args = parser.parse_args(argv)
+
+    # 相容 convert_usd_to_usda.py 的用法: <input.usda> <output.usd>
+    if (args.output is None and len(args.inputs) == 2
+            and args.inputs[1].lower().endswith((".usd", ".usdc"))):
+        args.output = args.inputs.pop()
+    return args
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        print("\n範例:")
+        print("  python convert_usda_to_usd.py Factory_Lite/Factory_Lite.usda --overwrite")
+        print("  python convert_usda_to_usd.py Factory_Lite_usda --output-dir Factory_Lite_crate")
+        sys.exit(1)
+
+    args = parse_args()
+    if args.usdc_version:
+        # 需在第一次寫入 crate 之前設定；子行程會繼承此環境變數
+        os.environ[USDC_VERSION_ENV] = args.usdc_version
+
+    single_file = (
+        len(args.inputs) == 1
+        and args.output_dir is None
+        and not os.path.isdir(args.inputs[0])
+        and not any(char in args.inputs[0] for char in GLOB_CHARS)
+    )
+    if single_file:
+        start = time.perf_counter()
+        results = [_convert_job(args.inputs[0], args.output, args.overwrite)]
+        print_result(results[0])
+        print_summary(results, time.perf_counter() - start)
+    else:
+        if args.output:
+            print("錯誤: -o/--output 僅適用於單一檔案，批次模式請使用 --output-dir")
+            sys.exit(1)
+        inputs = collect_inputs(args.inputs, args.pattern)
+        if not inputs:
+            print(f"錯誤: 找不到符合的 USDA 檔案: {' '.join(args.inputs)}")
+            sys.exit(1)
+        results = convert_batch(inputs, args.output_dir, args.jobs, args.overwrite)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if not all(result["ok"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,11 @@ USD Python API is not available.
 
 Usage:
     python convert_via_explorer.py <input.usd> [output.usda]
-    
+    python convert_via_explorer.py <input.usd> <input.usd> ...
+
+Add --profile[=PATH] to write a JSON trace of where the time goes (see
+usd_profile.py), --profile-imports to also time every module import.
+
 Note: This script requires USD Explorer application to be installed.
 """
 
@@ -18,6 +22,13 @@ import subprocess
 import platform
 from pathlib import Path
 
+import usd_profile
+
+if __name__ == "__main__":
+    usd_profile.start_from_argv()
+
+from kit_batch_convert import JOBS_FILE_NAME, write_jobs
+
 
 def find_usd_explorer_app():
     """
@@ -90,110 +101,46 @@ def convert_via_explorer_manual(input_path, output_path=None):
     print()
     print("=" * 70)
     print()
-    print("Alternative: Use the automated script in Omniverse Kit environment")
-    print("See: convert_in_kit_environment.py")
+    print("Alternative: Use the batch converter in Omniverse Kit environment")
+    print("See: kit_batch_convert.py")
     print()
 
 
-def create_kit_script(input_path, output_path=None):
+def create_kit_script(input_paths, output_paths=None, manifest_path=JOBS_FILE_NAME):
     """
-    Create a Python script that can be run in Omniverse Kit environment.
-    
+    Create a job manifest for the reusable Kit batch converter.
+
+    Instead of generating a one-off script with hard-coded absolute paths,
+    the input/output pairs are written to a manifest (paths relative to the
+    manifest) that kit_batch_convert.py converts in a single Kit process.
+
     Args:
-        input_path: Input USD file path
-        output_path: Output USDA file path (optional)
-    """
-    if output_path is None:
-        base_name = os.path.splitext(input_path)[0]
-        output_path = f"{base_name}.usda"
-    
-    abs_input = os.path.abspath(input_path)
-    abs_output = os.path.abspath(output_path)
-    
-    script_content = f'''#!/usr/bin/env python3
-"""
-USD to USDA Converter Script for Omniverse Kit Environment
+        input_paths: Input USD file paths
+        output_paths: Output USDA file paths (optional, same length as input_paths)
+        manifest_path: Where to write the job manifest
 
-This script should be run from within Omniverse Kit application's Python console.
+    Returns:
+        str: Path of the written manifest
+    """
+    if output_paths is None:
+        output_paths = [None] * len(input_paths)
 
-Usage in Kit Console:
-    exec(open('convert_in_kit.py').read())
-    
-Or copy and paste the code below directly into Kit Console.
-"""
+    write_jobs(list(zip(input_paths, output_paths)), manifest_path)
+    converter = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kit_batch_convert.py")
 
-try:
-    from pxr import Usd
-    
-    def convert_usd_to_usda(input_path, output_path):
-        """Convert USD to USDA format."""
-        print(f"Opening USD file: {{input_path}}")
-        stage = Usd.Stage.Open(input_path)
-        if not stage:
-            print(f"Error: Cannot open USD file {{input_path}}")
-            return False
-        
-        print(f"Exporting to USDA: {{output_path}}")
-        stage.Export(output_path)
-        print(f"✓ Successfully converted: {{input_path}} -> {{output_path}}")
-        return True
-    
-    # Convert the file
-    input_file = r"{abs_input}"
-    output_file = r"{abs_output}"
-    
-    print("=" * 70)
-    print("USD to USDA Conversion in Kit Environment")
-    print("=" * 70)
+    print(f"✓ Created Kit job manifest: {manifest_path} ({len(input_paths)} file(s))")
     print()
-    
-    if convert_usd_to_usda(input_file, output_file):
-        print()
-        print("=" * 70)
-        print("Conversion completed successfully!")
-        print("=" * 70)
-    else:
-        print()
-        print("=" * 70)
-        print("Conversion failed!")
-        print("=" * 70)
-        
-except ImportError as e:
-    print("=" * 70)
-    print("Error: USD Python API (pxr) is not available")
-    print("=" * 70)
+    print("To convert headlessly in one Kit process:")
+    print(f'  <kit> --no-window --exec "{converter} {manifest_path} --quit"')
     print()
-    print("Please ensure you are running this in Omniverse Kit application's Python console")
-    print("(Window > Console in USD Explorer application)")
+    print("Or in the Kit Python console (Window > Console):")
+    print(f"  exec(open(r'{converter}').read())")
+    print(f"  run(r'{os.path.abspath(manifest_path)}')")
     print()
-    print(f"Import error: {{e}}")
-except Exception as e:
-    print("=" * 70)
-    print(f"Error during conversion: {{e}}")
-    print("=" * 70)
-    import traceback
-    traceback.print_exc()
-'''
-    
-    script_path = "convert_in_kit.py"
-    with open(script_path, 'w', encoding='utf-8') as f:
-        f.write(script_content)
-    
-    # Make executable on Unix systems
-    if platform.system() != "windows":
-        os.chmod(script_path, 0o755)
-    
-    print(f"✓ Created Kit environment script: {script_path}")
+    print("Progress is printed as JSON lines (add --progress <file> to keep a copy).")
     print()
-    print("To use this script in Kit Console:")
-    print("1. Launch your USD Explorer application")
-    print("2. Open Window > Console (to access Python console)")
-    print(f"3. Run: exec(open('{script_path}').read())")
-    print()
-    print("Or copy and paste the code from the script directly into the console.")
-    print()
-    
-    return script_path
+
+    return manifest_path
 
 
 def main():
@@ -202,35 +149,44 @@ def main():
         print("\nExamples:")
         print("  python convert_via_explorer.py Factory_Lite/Factory_Lite.usd")
         print("  python convert_via_explorer.py Factory_Lite/Factory_Lite.usd output.usda")
+        print("  python convert_via_explorer.py Factory_Lite/SubUSDs/*.usd")
         sys.exit(1)
-    
-    input_path = sys.argv[1]
-    output_path = sys.argv[2] if len(sys.argv) > 2 else None
-    
-    if not os.path.exists(input_path):
-        print(f"Error: File not found: {input_path}")
+
+    input_paths = sys.argv[1:]
+    output_paths = None
+    # Single file with explicit output: <input.usd> <output.usda>
+    if len(input_paths) == 2 and input_paths[1].lower().endswith(".usda"):
+        output_paths = [input_paths.pop()]
+
+    missing = [path for path in input_paths if not os.path.exists(path)]
+    if missing:
+        for path in missing:
+            print(f"Error: File not found: {path}")
         sys.exit(1)
     
     # Check if USD Explorer is available
-    explorer_path = find_usd_explorer_app()
+    with usd_profile.phase("find USD Explorer"):
+        explorer_path = find_usd_explorer_app()
     
     if explorer_path:
         print(f"Found USD Explorer at: {explorer_path}")
         print("However, automated conversion requires Kit SDK integration.")
-        print("Please use manual method or Kit environment script.")
+        print("Please use manual method or Kit batch converter.")
         print()
     
     # Provide manual instructions
-    convert_via_explorer_manual(input_path, output_path)
+    for index, input_path in enumerate(input_paths):
+        convert_via_explorer_manual(input_path, output_paths[index] if output_paths else None)
     
-    # Create Kit environment script
-    create_kit_script(input_path, output_path)
+    # Create Kit job manifest
+    with usd_profile.phase("write job manifest"):
+        create_kit_script(input_paths, output_paths)
     
     print("=" * 70)
     print("Summary:")
     print("=" * 70)
     print("1. Manual method: Follow the steps above in USD Explorer")
-    print("2. Kit environment: Use convert_in_kit.py in Kit's Python console")
+    print(f"2. Kit environment: Run kit_batch_convert.py with {JOBS_FILE_NAME}")
     print("=" * 70)
 
 
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Headless Batch Converter for Omniverse Kit
+
+Converts every input/output pair listed in a job manifest inside a single Kit
+(or pxr-enabled Python) process, so the Kit and USD plugin bootstrap is paid
+once for the whole batch. Progress is streamed as JSON lines.
+
+Usage (headless Kit):
+    <kit> --no-window --exec "kit_batch_convert.py kit_convert_jobs.json --quit"
+
+Usage (Kit Python console):
+    exec(open('kit_batch_convert.py').read())
+    run('kit_convert_jobs.json')
+
+Usage (any Python with the USD bindings):
+    python kit_batch_convert.py kit_convert_jobs.json [--progress progress.jsonl]
+
+Job manifest (generated by convert_via_explorer.py); relative paths are
+resolved against the manifest's directory:
+    {
+        "jobs": [
+            {"input": "Factory_Lite/Factory_Lite.usd", "output": "Factory_Lite/Factory_Lite.usda"},
+            {"input": "Factory_Lite/SubUSDs/RoofPiece.usd", "flatten": false}
+        ]
+    }
+
+Progress events (one JSON object per line on stdout and in --progress):
+    {"event": "start", "total": 2}
+    {"event": "converted", "index": 1, "total": 2, "input": ..., "output": ..., "ok": true, "error": "", "seconds": 0.12}
+    {"event": "done", "total": 2, "succeeded": 2, "failed": 0, "seconds": 0.31}
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+try:
+    _SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+except NameError:
+    # exec() in the Kit console does not define __file__
+    _SCRIPT_DIR = os.getcwd()
+
+JOBS_FILE_NAME = "kit_convert_jobs.json"
+
+
+def default_output_path(input_path):
+    """Return the input path with a .usda extension."""
+    return f"{os.path.splitext(input_path)[0]}.usda"
+
+
+def load_jobs(manifest_path):
+    """
+    Load the job list from a manifest file.
+
+    Args:
+        manifest_path: Path of the JSON manifest
+
+    Returns:
+        list: Jobs as dicts with absolute "input" and "output" paths
+    """
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    entries = data.get("jobs", []) if isinstance(data, dict) else data
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+
+    jobs = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"input": entry}
+        input_path = os.path.join(base_dir, entry["input"])
+        output_path = entry.get("output")
+        output_path = (os.path.join(base_dir, output_path) if output_path
+                       else default_output_path(input_path))
+        jobs.append({
+            "input": os.path.normpath(input_path),
+            "output": os.path.normpath(output_path),
+            "flatten": bool(entry.get("flatten", False)),
+            "verify": bool(entry.get("verify", False)),
+        })
+    return jobs
+
+
+def write_jobs(pairs, manifest_path=JOBS_FILE_NAME):
+    """
+    Write a job manifest for the given (input, output) pairs.
+
+    Paths are stored relative to the manifest so the file can be moved
+    together with the assets.
+
+    Returns:
+        str: Path of the written manifest
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+
+    def relative(path):
+        return os.path.relpath(os.path.abspath(path), base_dir).replace(os.sep, "/")
+
+    jobs = [
+        {"input": relative(input_path), "output": relative(output_path or default_output_path(input_path))}
+        for input_path, output_path in pairs
+    ]
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"jobs": jobs}, f, indent=2)
+    return manifest_path
+
+
+def run(manifest_path, progress_path=None, flatten=False, verify=False):
+    """
+    Convert every job of the manifest in this process.
+
+    Args:
+        manifest_path: Path of the JSON manifest
+        progress_path: Optional file that receives a copy of the JSON-lines progress
+        flatten: Compose and flatten every stage (overrides per-job setting when True)
+        verify: Verify every output (overrides per-job setting when True)
+
+    Returns:
+        bool: True if every job succeeded
+    """
+    # Imported here so that writing manifests works without the USD Python API
+    if _SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, _SCRIPT_DIR)
+    from convert_usd_to_usda import convert_usd_to_usda, load_pxr
+
+    # Fail once up front instead of once per job when pxr is missing
+    load_pxr()
+    jobs = load_jobs(manifest_path)
+    progress_file = open(progress_path, "w", encoding="utf-8") if progress_path else None
+
+    def emit(**event):
+        line = json.dumps(event)
+        print(line, flush=True)
+        if progress_file:
+            progress_file.write(line + "\n")
+            progress_file.flush()
+
+    succeeded = 0
+    batch_start = time.perf_counter()
+    try:
+        emit(event="start", total=len(jobs))
+        for index, job in enumerate(jobs, 1):
+            start = time.perf_counter()
+            error = ""
+            try:
+                convert_usd_to_usda(job["input"], job["output"], verbose=False,
+                                    flatten=flatten or job["flatten"],
+                                    verify=verify or job["verify"])
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+            else:
+                succeeded += 1
+            emit(event="converted", index=index, total=len(jobs),
+                 input=job["input"], output=job["output"], ok=not error, error=error,
+                 seconds=round(time.perf_counter() - start, 4))
+        emit(event="done", total=len(jobs), succeeded=succeeded,
+             failed=len(jobs) - succeeded,
+             seconds=round(time.perf_counter() - batch_start, 4))
+    finally:
+        if progress_file:
+            progress_file.close()
+    return succeeded == len(jobs)
+
+
+def _quit_kit(exit_code):
+    """Ask the running Kit application to exit; returns False outside Kit."""
+    try:
+        import omni.kit.app
+    except ImportError:
+        return False
+    omni.kit.app.get_app().post_quit(exit_code)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert all jobs of a manifest in one Kit/pxr process.",
+    )
+    parser.add_argument("manifest", nargs="?", default=JOBS_FILE_NAME,
+                        help=f"job manifest (default: {JOBS_FILE_NAME})")
+    parser.add_argument("--progress", help="also write JSON-lines progress to this file")
+    parser.add_argument("--flatten", action="store_true",
+                        help="compose and flatten every stage before exporting")
+    parser.add_argument("--verify", action="store_true",
+                        help="verify every output against the exported layer")
+    parser.add_argument("--quit", action="store_true",
+                        help="quit the Kit application when the batch is finished")
+    args = parser.parse_args(argv)
+
+    ok = run(args.manifest, args.progress, args.flatten, args.verify)
+    exit_code = 0 if ok else 1
+    if args.quit:
+        _quit_kit(exit_code)
+    return exit_code
+
+
+# exec() in the Kit console has no __file__; only define run() there
+if __name__ == "__main__" and "__file__" in globals():
+    _exit_code = main()
+    if "omni.kit.app" not in sys.modules:
+        sys.exit(_exit_code)
@@ -0,0 +1,178 @@
+# SPDX-FileCopyrightText: Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: LicenseRef-NvidiaProprietary
+#
+# NVIDIA CORPORATION, its affiliates and licensors retain all intellectual
+# property and proprietary rights in and to this material, related
+# documentation and any modifications thereto. Any use, reproduction,
+# disclosure or distribution of this material and related documentation
+# without an express license agreement from NVIDIA CORPORATION or
+# its affiliates is strictly prohibited.
+
+from pxr import Sdf
+
+import carb
+import carb.events
+import omni.kit.app
+import omni.kit.livestream.messaging as messaging
+import omni.usd
+
+from carb.eventdispatcher import get_eventdispatcher
+from omni.kit.viewport.utility import get_active_viewport_camera_string
+
+
+def snapshot_camera(stage, camera_path) -> dict:
+    """The current value of every attribute of the camera at `camera_path`."""
+    camera = stage.GetPrimAtPath(camera_path)
+    if not camera:
+        raise ValueError(f"No camera at '{camera_path}'")
+    snapshot = {}
+    for attr in camera.GetAttributes():
+        value = attr.Get()
+        if value is not None:
+            snapshot[attr.GetName()] = value
+    return snapshot
+
+
+def restore_camera(stage, camera_path, snapshot: dict) -> int:
+    """
+    Write back the attributes of `snapshot` that differ from the camera at
+    `camera_path`, on the session layer and in one change block.
+
+    The camera lives on the session layer, which has a higher opinion than
+    the root stage, so the values are authored there. Returns the number of
+    attributes that changed.
+    """
+    camera = stage.GetPrimAtPath(camera_path)
+    if not camera:
+        raise ValueError(f"No camera at '{camera_path}'")
+    changed = []
+    for name, value in snapshot.items():
+        attr = camera.GetAttribute(name)
+        if attr and attr.Get() != value:
+            changed.append((attr, value))
+    if not changed:
+        return 0
+
+    layer = stage.GetSessionLayer()
+    # Authored with the Sdf API, which is safe inside a change block, so the
+    # stage recomposes the camera once.
+    with Sdf.ChangeBlock():
+        prim_spec = Sdf.CreatePrimInLayer(layer, camera.GetPath())
+        for attr, value in changed:
+            spec = layer.GetAttributeAtPath(attr.GetPath())
+            if not spec:
+                spec = Sdf.AttributeSpec(prim_spec, attr.GetName(), attr.GetTypeName(),
+                                         attr.GetVariability(), attr.IsCustom())
+            spec.default = value
+    return len(changed)
+
+
+class CameraBookmarkManager:
+    """Stores named snapshots of the active camera and restores them."""
+    def __init__(self):
+        self._subscriptions = []
+        # bookmark name -> attribute values of the active camera
+        self._bookmarks = {}
+
+        # -- register outgoing events/messages
+        outgoing = [
+            # response to saveCameraRequest
+            "saveCameraResponse",
+            # response to restoreCameraRequest
+            "restoreCameraResponse",
+        ]
+
+        for o in outgoing:
+            messaging.register_event_type_to_send(o)
+            omni.kit.app.register_event_alias(
+                carb.events.type_from_string(o),
+                o,
+            )
+
+        # -- register incoming events/messages
+        incoming = {
+            # request to store the active camera under a name
+            "saveCameraRequest": self._on_save_camera,
+            # request to move the active camera to a stored bookmark
+            "restoreCameraRequest": self._on_restore_camera,
+        }
+
+        ed = get_eventdispatcher()
+        for event_type, handler in incoming.items():
+            omni.kit.app.register_event_alias(
+                carb.events.type_from_string(event_type),
+                event_type,
+            )
+            self._subscriptions.append(
+                ed.observe_event(
+                    observer_name=f"CameraBookmarkManager:{event_type}",
+                    event_name=event_type,
+                    on_event=handler,
+                )
+            )
+
+        # -- bookmarks belong to the stage they were saved on
+        usd_context = omni.usd.get_context()
+        self._subscriptions.append(
+            ed.observe_event(
+                observer_name="CameraBookmarkManager:StageOpened",
+                event_name=usd_context.stage_event_name(omni.usd.StageEventType.OPENED),
+                on_event=self._on_stage_event_opened,
+            )
+        )
+
+    def _on_stage_event_opened(self, event) -> None:
+        self._bookmarks.clear()
+
+    def _on_save_camera(self, event: carb.events.IEvent) -> None:
+        """
+        Handler for `saveCameraRequest` event.
+
+        Stores the active camera under `name`, replacing a bookmark of the
+        same name, or deletes the bookmark when `delete` is set. Sends
+        `saveCameraResponse` with the names of all bookmarks.
+        """
+        name = str(event.payload["name"]) if "name" in event.payload else ""
+        payload = {"name": name, "result": "success", "error": ""}
+        try:
+            if not name:
+                raise ValueError("A bookmark needs a name")
+            if "delete" in event.payload and event.payload["delete"]:
+                self._bookmarks.pop(name, None)
+            else:
+                stage = omni.usd.get_context().get_stage()
+                if not stage:
+                    raise RuntimeError("No stage is open")
+                self._bookmarks[name] = snapshot_camera(stage, get_active_viewport_camera_string())
+        except Exception as e:
+            payload.update({"result": "error", "error": str(e)})
+        payload["bookmarks"] = sorted(self._bookmarks)
+        get_eventdispatcher().dispatch_event("saveCameraResponse", payload=payload)
+
+    def _on_restore_camera(self, event: carb.events.IEvent) -> None:
+        """
+        Handler for `restoreCameraRequest` event.
+
+        Moves the active camera to the bookmark `name`, writing only the
+        attributes that differ. Sends `restoreCameraResponse` with the number
+        of `changed` attributes.
+        """
+        name = str(event.payload["name"]) if "name" in event.payload else ""
+        payload = {"name": name, "result": "success", "error": "", "changed": 0}
+        try:
+            if name not in self._bookmarks:
+                raise ValueError(f"No camera bookmark '{name}'")
+            stage = omni.usd.get_context().get_stage()
+            if not stage:
+                raise RuntimeError("No stage is open")
+            payload["changed"] = restore_camera(stage, get_active_viewport_camera_string(), self._bookmarks[name])
+        except Exception as e:
+            payload.update({"result": "error", "error": str(e)})
+        carb.log_info(f"Restored camera bookmark '{name}': {payload['changed']} attributes changed")
+        get_eventdispatcher().dispatch_event("restoreCameraResponse", payload=payload)
+
+    def on_shutdown(self):
+        """This is called every time the extension is deactivated. It is used
+        to clean up the extension state."""
+        self._subscriptions.clear()
+        self._bookmarks.clear()
@@ -8,8 +8,13 @@
 # without an express license agreement from NVIDIA CORPORATION or
 # its affiliates is strictly prohibited.
 
+from .camera_bookmarks import CameraBookmarkManager
+from .lod_management import LodManager
+from .prim_search import PrimSearchManager
+from .spatial_index import SpatialIndexManager
 from .stage_loading import LoadingManager
 from .stage_management import StageManager
+from .stage_statistics import StageStatisticsManager
 import omni.ext
 
 
@@ -25,6 +30,11 @@ class Extension(omni.ext.IExt):
         # Internal messaging state
         self._loading_manager: LoadingManager = LoadingManager()
         self._stage_manager: StageManager = StageManager()
+        self._lod_manager: LodManager = LodManager()
+        self._spatial_index_manager: SpatialIndexManager = SpatialIndexManager()
+        self._stage_statistics_manager: StageStatisticsManager = StageStatisticsManager()
+        self._prim_search_manager: PrimSearchManager = PrimSearchManager()
+        self._camera_bookmark_manager: CameraBookmarkManager = CameraBookmarkManager()
 
     def on_shutdown(self):
         """This is called every time the extension is deactivated. It is used to
@@ -36,3 +46,18 @@ class Extension(omni.ext.IExt):
         if self._stage_manager:
             self._stage_manager.on_shutdown()
             self._stage_manager = None
+        if self._lod_manager:
+            self._lod_manager.on_shutdown()
+            self._lod_manager = None
+        if self._spatial_index_manager:
+            self._spatial_index_manager.on_shutdown()
+            self._spatial_index_manager = None
+        if self._stage_statistics_manager:
+            self._stage_statistics_manager.on_shutdown()
+            self._stage_statistics_manager = None
+        if self._prim_search_manager:
+            self._prim_search_manager.on_shutdown()
+            self._prim_search_manager = None
+        if self._camera_bookmark_manager:
+            self._camera_bookmark_manager.on_shutdown()
+            self._camera_bookmark_manager = None
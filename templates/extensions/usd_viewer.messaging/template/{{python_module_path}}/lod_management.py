@@ -0,0 +1,248 @@
+# SPDX-FileCopyrightText: Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: LicenseRef-NvidiaProprietary
+#
+# NVIDIA CORPORATION, its affiliates and licensors retain all intellectual
+# property and proprietary rights in and to this material, related
+# documentation and any modifications thereto. Any use, reproduction,
+# disclosure or distribution of this material and related documentation
+# without an express license agreement from NVIDIA CORPORATION or
+# its affiliates is strictly prohibited.
+
+from pxr import Sdf, Usd, UsdGeom
+
+import carb
+import carb.dictionary
+import carb.events
+import carb.settings
+import omni.kit.app
+import omni.kit.livestream.messaging as messaging
+import omni.usd
+
+from carb.eventdispatcher import get_eventdispatcher
+from omni.kit.viewport.utility import get_active_viewport_camera_string
+
+# Name of the variant set authored by usd_lod_generate.py. Its variants are
+# ordered from the full asset ("LOD0") to the coarsest level.
+LOD_VARIANT_SET = "LOD"
+# Select LOD variants by camera distance.
+LOD_POLICY_SETTING = "/exts/{{ extension_name }}/lodPolicy"
+# Camera distances in meters at which the next coarser LOD is selected.
+LOD_DISTANCES_SETTING = "/exts/{{ extension_name }}/lodDistances"
+# Number of frames between two evaluations of the policy.
+LOD_INTERVAL_SETTING = "/exts/{{ extension_name }}/lodUpdateInterval"
+# Fraction of a distance threshold a prim has to move past it before its LOD
+# changes back, so prims near a threshold do not flicker.
+LOD_HYSTERESIS = 0.1
+
+
+class LodManager:
+    """Selects the `LOD` variant of prims by their distance to the active camera."""
+    def __init__(self):
+        self._subscriptions = []
+        settings = carb.settings.get_settings()
+        self._enabled: bool = bool(settings.get(LOD_POLICY_SETTING))
+        self._distances = list(settings.get(LOD_DISTANCES_SETTING) or [])
+        self._interval: int = max(1, settings.get_as_int(LOD_INTERVAL_SETTING) or 1)
+        self._frame: int = 0
+        self._camera_position = None
+
+        # prim path -> [world bound center, bound radius, variant names, selected level]
+        self._lod_prims = {}
+        self._needs_scan: bool = True
+
+        # -- register outgoing events/messages
+        outgoing = [
+            # response to setLodPolicyRequest with the active policy
+            "lodPolicyResponse",
+        ]
+
+        for o in outgoing:
+            messaging.register_event_type_to_send(o)
+            omni.kit.app.register_event_alias(
+                carb.events.type_from_string(o),
+                o,
+            )
+
+        # -- register incoming events/messages
+        incoming = {
+            # request to enable/disable the policy or change its distances
+            "setLodPolicyRequest": self._on_set_lod_policy,
+        }
+
+        ed = get_eventdispatcher()
+        for event_type, handler in incoming.items():
+            omni.kit.app.register_event_alias(
+                carb.events.type_from_string(event_type),
+                event_type,
+            )
+            self._subscriptions.append(
+                ed.observe_event(
+                    observer_name=f"LodManager:{event_type}",
+                    event_name=event_type,
+                    on_event=handler,
+                )
+            )
+
+        # -- rescan for LOD prims when the stage or its loaded payloads change
+        usd_context = omni.usd.get_context()
+        for observer_name, event_name, handler in (
+            ("LodManager:StageOpened", usd_context.stage_event_name(omni.usd.StageEventType.OPENED),
+             self._on_stage_content_changed),
+            ("LodManager:payloadLoadingProgress", "payloadLoadingProgress", self._on_payload_loading_progress),
+            ("LodManager:loadPayloadsResponse", "loadPayloadsResponse", self._on_stage_content_changed),
+        ):
+            self._subscriptions.append(
+                ed.observe_event(
+                    observer_name=observer_name,
+                    event_name=event_name,
+                    on_event=handler,
+                )
+            )
+        self._subscriptions.append(
+            ed.observe_event(
+                observer_name="LodManager:update",
+                event_name=omni.kit.app.GLOBAL_EVENT_UPDATE,
+                on_event=self._on_update,
+            )
+        )
+
+    def _on_stage_content_changed(self, event) -> None:
+        self._needs_scan = True
+        self._camera_position = None
+
+    def _on_payload_loading_progress(self, event) -> None:
+        # Rescan once the deferred payloads have all loaded, not after every batch.
+        if event.payload["done"]:
+            self._on_stage_content_changed(event)
+
+    def _scan(self, stage) -> None:
+        """Collect the prims with an `LOD` variant set and their world bounds."""
+        self._lod_prims.clear()
+        bbox_cache = UsdGeom.BBoxCache(Usd.TimeCode.Default(), [UsdGeom.Tokens.default_, UsdGeom.Tokens.render])
+        for prim in stage.Traverse():
+            variant_sets = prim.GetVariantSets()
+            if not variant_sets.HasVariantSet(LOD_VARIANT_SET):
+                continue
+            variant_set = variant_sets.GetVariantSet(LOD_VARIANT_SET)
+            names = sorted(variant_set.GetVariantNames())
+            # Bounds are computed with the currently selected LOD; the levels
+            # share the same extent up to the clustering error.
+            box = bbox_cache.ComputeWorldBound(prim).ComputeAlignedRange()
+            if box.IsEmpty():
+                continue
+            selected = variant_set.GetVariantSelection()
+            level = names.index(selected) if selected in names else 0
+            self._lod_prims[prim.GetPath()] = [box.GetMidpoint(), box.GetSize().GetLength() / 2.0, names, level]
+        self._needs_scan = False
+        carb.log_info(f"LOD policy: found {len(self._lod_prims)} prims with an LOD variant set")
+
+    def _target_level(self, distance: float, level: int, count: int) -> int:
+        """
+        Pick the LOD level for a distance in meters, with hysteresis around the thresholds.
+
+        Threshold `i` switches between levels `i` and `i + 1`: moving away, a
+        prim steps to the coarsest level whose threshold it has passed by
+        `LOD_HYSTERESIS`; moving closer, to the finest level whose threshold
+        it is below by as much. In between it keeps its level.
+        """
+        coarser = sum(1 for threshold in self._distances if distance > threshold * (1.0 + LOD_HYSTERESIS))
+        finer = sum(1 for threshold in self._distances if distance > threshold * (1.0 - LOD_HYSTERESIS))
+        if coarser > level:
+            return min(coarser, count - 1)
+        if finer < level:
+            return finer
+        return level
+
+    def _on_update(self, event) -> None:
+        if not self._enabled or not self._distances:
+            return
+        self._frame += 1
+        if self._frame % self._interval:
+            return
+        stage = omni.usd.get_context().get_stage()
+        if not stage:
+            return
+        if self._needs_scan:
+            self._scan(stage)
+        if not self._lod_prims:
+            return
+
+        camera = stage.GetPrimAtPath(get_active_viewport_camera_string())
+        if not camera:
+            return
+        position = UsdGeom.Xformable(camera).ComputeLocalToWorldTransform(Usd.TimeCode.Default()).ExtractTranslation()
+        # Nothing to do while the camera stands still.
+        if self._camera_position is not None and (position - self._camera_position).GetLength() < 1e-6:
+            return
+        self._camera_position = position
+        meters_per_unit = UsdGeom.GetStageMetersPerUnit(stage)
+
+        changes = []
+        for path, entry in self._lod_prims.items():
+            center, radius, names, level = entry
+            distance = max(0.0, (center - position).GetLength() - radius) * meters_per_unit
+            target = self._target_level(distance, level, len(names))
+            if target != level:
+                entry[3] = target
+                changes.append((path, names[target]))
+        if changes:
+            self._apply(stage, changes)
+
+    def _apply(self, stage, changes) -> None:
+        """Author the variant selections on the session layer in one change block."""
+        with Usd.EditContext(stage, Usd.EditTarget(stage.GetSessionLayer())):
+            with Sdf.ChangeBlock():
+                for path, name in changes:
+                    prim = stage.GetPrimAtPath(path)
+                    if prim:
+                        prim.GetVariantSets().GetVariantSet(LOD_VARIANT_SET).SetVariantSelection(name)
+        carb.log_info(f"LOD policy: switched {len(changes)} prims")
+
+    def _clear_selections(self) -> None:
+        """Remove the session layer selections so the authored LOD is used again."""
+        stage = omni.usd.get_context().get_stage()
+        if not stage:
+            return
+        session = stage.GetSessionLayer()
+        with Sdf.ChangeBlock():
+            for path in self._lod_prims:
+                spec = session.GetPrimAtPath(path)
+                if spec and LOD_VARIANT_SET in spec.variantSelections:
+                    del spec.variantSelections[LOD_VARIANT_SET]
+        self._needs_scan = True
+        self._camera_position = None
+
+    def _on_set_lod_policy(self, event: carb.events.IEvent) -> None:
+        """
+        Handler for `setLodPolicyRequest` event.
+
+        Enables or disables the distance based LOD selection (`enabled`) and
+        optionally replaces the distance thresholds in meters (`distances`).
+        Sends `lodPolicyResponse` with the active policy.
+        """
+        payload = {"result": "success", "error": ""}
+        try:
+            if "distances" in event.payload:
+                distances = event.payload["distances"]
+                if isinstance(distances, carb.dictionary.Item):
+                    distances = distances.get_dict()
+                distances = [float(distance) for distance in distances]
+                if distances != sorted(distances):
+                    raise ValueError("distances must be increasing")
+                self._distances = distances
+                self._camera_position = None
+            if "enabled" in event.payload:
+                enabled = bool(event.payload["enabled"])
+                if self._enabled and not enabled:
+                    self._clear_selections()
+                self._enabled = enabled
+        except Exception as e:
+            payload = {"result": "error", "error": str(e)}
+        payload.update({"enabled": self._enabled, "distances": self._distances, "prims": len(self._lod_prims)})
+        get_eventdispatcher().dispatch_event("lodPolicyResponse", payload=payload)
+
+    def on_shutdown(self):
+        """This is called every time the extension is deactivated. It is used
+        to clean up the extension state."""
+        self._subscriptions.clear()
+        self._lod_prims.clear()
@@ -0,0 +1,318 @@
+# SPDX-FileCopyrightText: Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: LicenseRef-NvidiaProprietary
+#
+# NVIDIA CORPORATION, its affiliates and licensors retain all intellectual
+# property and proprietary rights in and to this material, related
+# documentation and any modifications thereto. Any use, reproduction,
+# disclosure or distribution of this material and related documentation
+# without an express license agreement from NVIDIA CORPORATION or
+# its affiliates is strictly prohibited.
+
+import bisect
+import fnmatch
+import time
+
+from pxr import Sdf, Tf, Usd
+
+import carb
+import carb.dictionary
+import carb.events
+import omni.kit.app
+import omni.kit.livestream.messaging as messaging
+import omni.usd
+
+from carb.eventdispatcher import get_eventdispatcher
+
+from .stage_management import FILTER_TYPES
+
+# Results per page when a findPrimsRequest has no `limit`, and the largest page.
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def _trigrams(text: str):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class PrimSearchIndex:
+    """Prims of a stage indexed by type name, name trigrams and path."""
+    def __init__(self):
+        # path string -> (name, type name)
+        self._prims = {}
+        self._by_type = {}
+        self._by_trigram = {}
+        # Sorted paths; descendants of a path form one contiguous range.
+        self._sorted = []
+        self._sorted_dirty = False
+
+    def __len__(self) -> int:
+        return len(self._prims)
+
+    def clear(self) -> None:
+        self._prims.clear()
+        self._by_type.clear()
+        self._by_trigram.clear()
+        self._sorted = []
+        self._sorted_dirty = False
+
+    @staticmethod
+    def _hidden(prim) -> bool:
+        """Prims getChildrenRequest does not show: the Kit cameras and render settings."""
+        name = prim.GetName()
+        return name.startswith("OmniverseKit_") or (name == "Render" and prim.GetParent().IsPseudoRoot())
+
+    def add_subtree(self, prim) -> None:
+        """Index `prim` and its descendants, including instance proxies."""
+        prims = iter(Usd.PrimRange(prim, Usd.TraverseInstanceProxies()))
+        for descendant in prims:
+            if descendant.IsPseudoRoot():
+                continue
+            if self._hidden(descendant):
+                prims.PruneChildren()
+                continue
+            path = str(descendant.GetPath())
+            name = descendant.GetName()
+            type_name = str(descendant.GetTypeName())
+            if path in self._prims:
+                self._remove(path)
+            self._prims[path] = (name, type_name)
+            self._by_type.setdefault(type_name, set()).add(path)
+            for trigram in _trigrams(name.lower()):
+                self._by_trigram.setdefault(trigram, set()).add(path)
+        self._sorted_dirty = True
+
+    def _remove(self, path: str) -> None:
+        name, type_name = self._prims.pop(path)
+        self._by_type[type_name].discard(path)
+        for trigram in _trigrams(name.lower()):
+            self._by_trigram[trigram].discard(path)
+
+    def _range(self, root: str):
+        """The sorted paths at and below `root`."""
+        if self._sorted_dirty:
+            self._sorted = sorted(self._prims)
+            self._sorted_dirty = False
+        if root == "/":
+            return self._sorted
+        # "/" sorts right before "0", so "root/" .. "root0" are the descendants.
+        start = bisect.bisect_left(self._sorted, root)
+        end = bisect.bisect_left(self._sorted, root + "0")
+        return self._sorted[start:end]
+
+    def remove_subtree(self, root: str) -> None:
+        """Remove `root` and its descendants."""
+        for path in list(self._range(root)):
+            if path == root or path.startswith(root.rstrip("/") + "/"):
+                self._remove(path)
+        self._sorted_dirty = True
+
+    def _type_names(self, types):
+        """The indexed type names that are, or derive from, one of `types`."""
+        schemas = []
+        for type_name in types:
+            schema = FILTER_TYPES.get(type_name)
+            tf_type = Tf.Type.Find(schema) if schema else Usd.SchemaRegistry.GetTypeFromName(type_name)
+            if tf_type.isUnknown:
+                raise ValueError(f"Unknown prim type '{type_name}'")
+            schemas.append(tf_type)
+        matches = set()
+        for type_name in self._by_type:
+            tf_type = Usd.SchemaRegistry.GetTypeFromName(type_name)
+            if not tf_type.isUnknown and any(tf_type.IsA(schema) for schema in schemas):
+                matches.add(type_name)
+        return matches
+
+    def find(self, root: str = "/", name: str = "", pattern: str = "", types=None):
+        """
+        The sorted paths below `root` whose name contains `name` (ignoring
+        case), whose path matches the glob `pattern` and whose type is one of
+        `types` or derives from it.
+        """
+        candidates = None
+        if types:
+            candidates = set()
+            for type_name in self._type_names(types):
+                candidates |= self._by_type[type_name]
+        needle = name.lower()
+        if len(needle) >= 3:
+            # Every trigram of the needle has to occur in the name.
+            for trigram in sorted(_trigrams(needle), key=lambda t: len(self._by_trigram.get(t, ()))):
+                paths = self._by_trigram.get(trigram, set())
+                candidates = paths.copy() if candidates is None else candidates & paths
+                if not candidates:
+                    return []
+        if pattern:
+            # The literal part of the pattern up to its first wildcard narrows the range.
+            literal = pattern
+            for wildcard in "*?[":
+                literal = literal.split(wildcard)[0]
+            literal_root = literal.rsplit("/", 1)[0] or "/"
+            if Sdf.Path(literal_root).HasPrefix(Sdf.Path(root)):
+                root = literal_root
+
+        results = []
+        for path in self._range(root):
+            if candidates is not None and path not in candidates:
+                continue
+            if needle and needle not in self._prims[path][0].lower():
+                continue
+            if pattern and not fnmatch.fnmatchcase(path, pattern):
+                continue
+            results.append(path)
+        return results
+
+    def describe(self, path: str) -> dict:
+        name, type_name = self._prims[path]
+        return {"name": name, "path": path, "type": type_name}
+
+
+class PrimSearchManager:
+    """Answers `findPrimsRequest` from a per-stage prim search index."""
+    def __init__(self):
+        self._subscriptions = []
+        self._index = PrimSearchIndex()
+        self._stage = None
+        self._listener = None
+        # Resynced prim paths, re-indexed before the next search.
+        self._resynced = set()
+
+        # -- register outgoing events/messages
+        outgoing = [
+            # response to findPrimsRequest with a page of matching prims
+            "findPrimsResponse",
+        ]
+
+        for o in outgoing:
+            messaging.register_event_type_to_send(o)
+            omni.kit.app.register_event_alias(
+                carb.events.type_from_string(o),
+                o,
+            )
+
+        # -- register incoming events/messages
+        incoming = {
+            # request to search the prims of the stage by type, name or path
+            "findPrimsRequest": self._on_find_prims,
+        }
+
+        ed = get_eventdispatcher()
+        for event_type, handler in incoming.items():
+            omni.kit.app.register_event_alias(
+                carb.events.type_from_string(event_type),
+                event_type,
+            )
+            self._subscriptions.append(
+                ed.observe_event(
+                    observer_name=f"PrimSearchManager:{event_type}",
+                    event_name=event_type,
+                    on_event=handler,
+                )
+            )
+
+        # -- subscribe to stage events
+        usd_context = omni.usd.get_context()
+        self._subscriptions.extend([
+            ed.observe_event(
+                observer_name="PrimSearchManager:stage:assets_loaded",
+                event_name=usd_context.stage_event_name(omni.usd.StageEventType.ASSETS_LOADED),
+                on_event=self._on_stage_event_assets_loaded,
+            ),
+            ed.observe_event(
+                observer_name="PrimSearchManager:stage:closed",
+                event_name=usd_context.stage_event_name(omni.usd.StageEventType.CLOSED),
+                on_event=self._on_stage_event_closed,
+            ),
+        ])
+
+    def build(self, stage) -> None:
+        """Index every prim of `stage` and follow its changes."""
+        start = time.perf_counter()
+        self.clear()
+        self._stage = stage
+        self._index.add_subtree(stage.GetPseudoRoot())
+        self._listener = Tf.Notice.Register(Usd.Notice.ObjectsChanged, self._on_objects_changed, stage)
+        carb.log_info(f"Prim search index: {len(self._index)} prims in {time.perf_counter() - start:.3f}s")
+
+    def clear(self) -> None:
+        if self._listener:
+            self._listener.Revoke()
+            self._listener = None
+        self._stage = None
+        self._index.clear()
+        self._resynced.clear()
+
+    def _on_objects_changed(self, notice, stage) -> None:
+        for path in notice.GetResyncedPaths():
+            self._resynced.add(path.GetPrimPath())
+
+    def _refresh(self) -> None:
+        """Re-index the prims resynced since the last search."""
+        for path in Sdf.Path.RemoveDescendentPaths(list(self._resynced)):
+            self._index.remove_subtree(str(path))
+            prim = self._stage.GetPrimAtPath(path)
+            if prim:
+                self._index.add_subtree(prim)
+        self._resynced.clear()
+
+    def find(self, root="/", name="", pattern="", types=None):
+        """The sorted paths of the prims matching the search, see `PrimSearchIndex.find`."""
+        stage = omni.usd.get_context().get_stage()
+        if not stage:
+            raise RuntimeError("No stage is open")
+        if stage is not self._stage:
+            self.build(stage)
+        self._refresh()
+        return self._index.find(root, name, pattern, types)
+
+    def _on_stage_event_assets_loaded(self, event) -> None:
+        stage = omni.usd.get_context().get_stage()
+        if stage and stage is not self._stage:
+            self.build(stage)
+
+    def _on_stage_event_closed(self, event) -> None:
+        self.clear()
+
+    def _on_find_prims(self, event: carb.events.IEvent) -> None:
+        """
+        Handler for `findPrimsRequest` event.
+
+        Searches the prims below `root` (default "/") whose name contains
+        `name` (ignoring case), whose path matches the glob `pattern` (e.g.
+        "/World/ConveyorBelt_*") and whose type is one of `types` (schema type
+        names such as "Mesh" or "Gprim", or the getChildrenRequest filters).
+        Sends `findPrimsResponse` with the page of results selected by
+        `offset` and `limit`, the `total` number of matches and the
+        `next_offset` of the following page (-1 after the last page).
+        """
+        def get(key, default):
+            value = event.payload[key] if key in event.payload else default
+            return value.get_dict() if isinstance(value, carb.dictionary.Item) else value
+
+        start = time.perf_counter()
+        offset = max(0, int(get("offset", 0) or 0))
+        limit = min(MAX_LIMIT, max(1, int(get("limit", DEFAULT_LIMIT) or DEFAULT_LIMIT)))
+        payload = {"offset": offset, "limit": limit, "prims": [], "total": 0, "next_offset": -1}
+        try:
+            paths = self.find(
+                root=str(get("root", "/") or "/"),
+                name=str(get("name", "") or ""),
+                pattern=str(get("pattern", "") or ""),
+                types=[str(type_name) for type_name in get("types", None) or []],
+            )
+            payload.update({
+                "prims": [self._index.describe(path) for path in paths[offset:offset + limit]],
+                "total": len(paths),
+                "next_offset": offset + limit if offset + limit < len(paths) else -1,
+                "result": "success",
+                "error": "",
+            })
+        except Exception as e:
+            payload.update({"result": "error", "error": str(e)})
+        payload["elapsed_ms"] = (time.perf_counter() - start) * 1000.0
+        get_eventdispatcher().dispatch_event("findPrimsResponse", payload=payload)
+
+    def on_shutdown(self):
+        """This is called every time the extension is deactivated. It is used
+        to clean up the extension state."""
+        self._subscriptions.clear()
+        self.clear()
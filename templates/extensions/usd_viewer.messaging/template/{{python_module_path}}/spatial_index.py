@@ -0,0 +1,463 @@
+# SPDX-FileCopyrightText: Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: LicenseRef-NvidiaProprietary
+#
+# NVIDIA CORPORATION, its affiliates and licensors retain all intellectual
+# property and proprietary rights in and to this material, related
+# documentation and any modifications thereto. Any use, reproduction,
+# disclosure or distribution of this material and related documentation
+# without an express license agreement from NVIDIA CORPORATION or
+# its affiliates is strictly prohibited.
+
+import heapq
+import time
+
+import numpy as np
+from pxr import Sdf, Tf, Usd, UsdGeom
+
+import carb
+import carb.dictionary
+import carb.events
+import carb.settings
+import omni.kit.app
+import omni.kit.livestream.messaging as messaging
+import omni.usd
+
+from carb.eventdispatcher import get_eventdispatcher
+
+# Build the spatial index once the stage assets have loaded.
+SPATIAL_INDEX_SETTING = "/exts/{{ extension_name }}/spatialIndex"
+# Maximum number of prims in a leaf; a leaf is tested with one vectorized comparison.
+LEAF_SIZE = 8
+# Properties of an ancestor prim that move the bounds of its descendants.
+INHERITED_BOUNDS_PROPERTIES = ("xformOp", "visibility", "purpose")
+# Properties that can add gprims to the index anywhere below the changed prim.
+VISIBILITY_PROPERTIES = ("visibility", "purpose")
+
+
+class BoundingVolumeHierarchy:
+    """Axis aligned bounding volume hierarchy over a fixed list of boxes.
+
+    Boxes keep their row index for the lifetime of the hierarchy. Moving boxes
+    only refits the node bounds; adding or removing boxes needs a new hierarchy.
+    """
+    def __init__(self, lo, hi):
+        self.lo = np.array(lo, dtype=np.float64).reshape(-1, 3)
+        self.hi = np.array(hi, dtype=np.float64).reshape(-1, 3)
+        self.order = np.arange(len(self.lo))
+        self._centers = (self.lo + self.hi) / 2.0
+        start, count, left, right, depth = [], [], [], [], []
+
+        def build(begin: int, end: int, level: int) -> int:
+            node = len(start)
+            start.append(begin)
+            count.append(end - begin)
+            left.append(-1)
+            right.append(-1)
+            depth.append(level)
+            if end - begin > LEAF_SIZE:
+                # Median split along the longest axis of the box centers.
+                items = self.order[begin:end]
+                centers = self._centers[items]
+                axis = int(np.argmax(centers.max(axis=0) - centers.min(axis=0)))
+                middle = (end - begin) // 2
+                self.order[begin:end] = items[np.argpartition(centers[:, axis], middle)]
+                left[node] = build(begin, begin + middle, level + 1)
+                right[node] = build(begin + middle, end, level + 1)
+            return node
+
+        if len(self.lo):
+            build(0, len(self.lo), 0)
+        self.start = np.array(start, dtype=np.int64)
+        self.count = np.array(count, dtype=np.int64)
+        self.left = np.array(left, dtype=np.int64)
+        self.right = np.array(right, dtype=np.int64)
+        self.node_lo = np.zeros((len(start), 3))
+        self.node_hi = np.zeros((len(start), 3))
+        # Leaves tile the ordered boxes in increasing order, internal nodes are
+        # refitted from the deepest level up to the root.
+        self._leaves = np.flatnonzero(self.left < 0)
+        depth = np.array(depth, dtype=np.int64)
+        internal = np.flatnonzero(self.left >= 0)
+        self._levels = [internal[depth[internal] == level] for level in sorted(set(depth[internal]), reverse=True)]
+        self.refit()
+
+    def __len__(self) -> int:
+        return len(self.lo)
+
+    def refit(self) -> None:
+        """Recompute the node bounds from the current boxes."""
+        if not len(self.lo):
+            return
+        starts = self.start[self._leaves]
+        self.node_lo[self._leaves] = np.minimum.reduceat(self.lo[self.order], starts, axis=0)
+        self.node_hi[self._leaves] = np.maximum.reduceat(self.hi[self.order], starts, axis=0)
+        for nodes in self._levels:
+            self.node_lo[nodes] = np.minimum(self.node_lo[self.left[nodes]], self.node_lo[self.right[nodes]])
+            self.node_hi[nodes] = np.maximum(self.node_hi[self.left[nodes]], self.node_hi[self.right[nodes]])
+
+    def update(self, rows, lo, hi) -> None:
+        """Move the boxes at `rows` and refit the hierarchy."""
+        self.lo[rows] = lo
+        self.hi[rows] = hi
+        self.refit()
+
+    def _collect(self, node_test, item_test):
+        """Rows of the boxes passing `item_test` in the nodes passing `node_test`."""
+        found = []
+        stack = [0] if len(self.lo) else []
+        while stack:
+            node = stack.pop()
+            if not node_test(self.node_lo[node], self.node_hi[node]):
+                continue
+            if self.left[node] >= 0:
+                stack.extend((self.left[node], self.right[node]))
+                continue
+            items = self.order[self.start[node]:self.start[node] + self.count[node]]
+            found.append(items[item_test(self.lo[items], self.hi[items])])
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def query_box(self, lo, hi, contained: bool = False):
+        """Rows of the boxes overlapping (or with `contained`, inside) the box `lo`..`hi`."""
+        lo = np.asarray(lo, dtype=np.float64)
+        hi = np.asarray(hi, dtype=np.float64)
+
+        def overlaps(box_lo, box_hi):
+            return np.all((box_lo <= hi) & (box_hi >= lo), axis=-1)
+
+        def inside(box_lo, box_hi):
+            return np.all((box_lo >= lo) & (box_hi <= hi), axis=-1)
+
+        return self._collect(overlaps, inside if contained else overlaps)
+
+    @staticmethod
+    def _distance_sq(point, box_lo, box_hi):
+        """Squared distance from `point` to the boxes (0 inside)."""
+        gap = np.maximum(np.maximum(box_lo - point, point - box_hi), 0.0)
+        return np.sum(gap * gap, axis=-1)
+
+    def query_sphere(self, center, radius: float):
+        """Rows of the boxes within `radius` of `center`."""
+        center = np.asarray(center, dtype=np.float64)
+        radius_sq = float(radius) ** 2
+
+        def near(box_lo, box_hi):
+            return self._distance_sq(center, box_lo, box_hi) <= radius_sq
+
+        return self._collect(near, near)
+
+    def query_ray(self, origin, direction, max_distance: float = np.inf):
+        """Rows of the boxes hit by the ray and their entry distances, nearest first."""
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        length = np.linalg.norm(direction)
+        if not length:
+            raise ValueError("direction must not be zero")
+        direction = direction / length
+        parallel = direction == 0.0
+        with np.errstate(divide="ignore"):
+            inverse = 1.0 / direction
+
+        def slabs(box_lo, box_hi):
+            with np.errstate(invalid="ignore"):
+                t1 = (box_lo - origin) * inverse
+                t2 = (box_hi - origin) * inverse
+            # A ray parallel to a slab hits it everywhere or nowhere.
+            inside = (origin >= box_lo) & (origin <= box_hi)
+            near = np.where(parallel, -np.inf, np.minimum(t1, t2)).max(axis=-1)
+            far = np.where(parallel, np.where(inside, np.inf, -np.inf), np.maximum(t1, t2)).min(axis=-1)
+            return near, far
+
+        def hit(box_lo, box_hi):
+            near, far = slabs(box_lo, box_hi)
+            return (far >= np.maximum(near, 0.0)) & (near <= max_distance)
+
+        rows = self._collect(hit, hit)
+        distances = np.maximum(slabs(self.lo[rows], self.hi[rows])[0], 0.0)
+        order = np.argsort(distances, kind="stable")
+        return rows[order], distances[order]
+
+    def query_nearest(self, point, k: int = 1):
+        """Rows of the `k` boxes nearest to `point` and their distances, nearest first."""
+        point = np.asarray(point, dtype=np.float64)
+        best = []  # max-heap of (-distance², row)
+        heap = [(0.0, 0)] if len(self.lo) and k > 0 else []
+        while heap:
+            distance_sq, node = heapq.heappop(heap)
+            if len(best) == k and distance_sq > -best[0][0]:
+                break
+            if self.left[node] >= 0:
+                children = np.array([self.left[node], self.right[node]])
+                for child, child_sq in zip(children, self._distance_sq(point, self.node_lo[children], self.node_hi[children])):
+                    heapq.heappush(heap, (float(child_sq), int(child)))
+                continue
+            items = self.order[self.start[node]:self.start[node] + self.count[node]]
+            for row, row_sq in zip(items, self._distance_sq(point, self.lo[items], self.hi[items])):
+                if len(best) < k:
+                    heapq.heappush(best, (-float(row_sq), int(row)))
+                elif row_sq < -best[0][0]:
+                    heapq.heapreplace(best, (-float(row_sq), int(row)))
+        best.sort(reverse=True)
+        rows = np.array([row for _, row in best], dtype=np.int64)
+        return rows, np.sqrt([-distance_sq for distance_sq, _ in best])
+
+
+class SpatialIndexManager:
+    """Keeps a bounding volume hierarchy over the world bounds of the gprims of
+    the stage and answers spatial queries from the streaming client."""
+    def __init__(self):
+        self._subscriptions = []
+        self._enabled: bool = bool(carb.settings.get_settings().get(SPATIAL_INDEX_SETTING))
+        self._listener = None
+
+        # prim path -> row of the hierarchy
+        self._rows = {}
+        self._paths = []
+        self._bvh: BoundingVolumeHierarchy = BoundingVolumeHierarchy([], [])
+        # Prims with indexed descendants; their transforms move the index.
+        self._ancestors = set()
+        # Changes collected from Tf notices, applied before the next query.
+        self._resynced = set()
+        self._dirty = set()
+
+        # -- register outgoing events/messages
+        outgoing = [
+            # response to spatialQueryRequest with the matching prims
+            "spatialQueryResponse",
+        ]
+
+        for o in outgoing:
+            messaging.register_event_type_to_send(o)
+            omni.kit.app.register_event_alias(
+                carb.events.type_from_string(o),
+                o,
+            )
+
+        # -- register incoming events/messages
+        incoming = {
+            # request for the prims in a box or sphere, hit by a ray or nearest to a point
+            "spatialQueryRequest": self._on_spatial_query,
+        }
+
+        ed = get_eventdispatcher()
+        for event_type, handler in incoming.items():
+            omni.kit.app.register_event_alias(
+                carb.events.type_from_string(event_type),
+                event_type,
+            )
+            self._subscriptions.append(
+                ed.observe_event(
+                    observer_name=f"SpatialIndexManager:{event_type}",
+                    event_name=event_type,
+                    on_event=handler,
+                )
+            )
+
+        # -- subscribe to stage events
+        usd_context = omni.usd.get_context()
+        self._subscriptions.extend([
+            ed.observe_event(
+                observer_name="SpatialIndexManager:stage:assets_loaded",
+                event_name=usd_context.stage_event_name(omni.usd.StageEventType.ASSETS_LOADED),
+                on_event=self._on_stage_event_assets_loaded,
+            ),
+            ed.observe_event(
+                observer_name="SpatialIndexManager:stage:closed",
+                event_name=usd_context.stage_event_name(omni.usd.StageEventType.CLOSED),
+                on_event=self._on_stage_event_closed,
+            ),
+        ])
+
+    @staticmethod
+    def _bounds(bbox_cache, prim):
+        """World aligned bounds of a visible prim, or None."""
+        if UsdGeom.Imageable(prim).ComputeVisibility() == UsdGeom.Tokens.invisible:
+            return None
+        box = bbox_cache.ComputeWorldBound(prim).ComputeAlignedRange()
+        if box.IsEmpty():
+            return None
+        return tuple(box.GetMin()), tuple(box.GetMax())
+
+    @staticmethod
+    def _bbox_cache():
+        return UsdGeom.BBoxCache(Usd.TimeCode.Default(), [UsdGeom.Tokens.default_, UsdGeom.Tokens.render])
+
+    @staticmethod
+    def _gprims(prim):
+        """The gprims at and below `prim`, including instance proxies."""
+        for descendant in Usd.PrimRange(prim, Usd.TraverseInstanceProxies()):
+            if descendant.IsA(UsdGeom.Gprim):
+                yield descendant
+
+    def _rebuild(self, bounds) -> None:
+        """Build a new hierarchy over `bounds` (prim path -> (min, max))."""
+        self._paths = list(bounds)
+        self._rows = {path: row for row, path in enumerate(self._paths)}
+        boxes = list(bounds.values())
+        self._bvh = BoundingVolumeHierarchy([box[0] for box in boxes], [box[1] for box in boxes])
+        self._ancestors = set()
+        for path in self._paths:
+            for ancestor in path.GetParentPath().GetPrefixes():
+                self._ancestors.add(ancestor)
+
+    def build(self, stage) -> None:
+        """Index the world bounds of every visible gprim of `stage`."""
+        start = time.perf_counter()
+        bbox_cache = self._bbox_cache()
+        bounds = {}
+        for prim in self._gprims(stage.GetPseudoRoot()):
+            box = self._bounds(bbox_cache, prim)
+            if box is not None:
+                bounds[prim.GetPath()] = box
+        self._rebuild(bounds)
+        self._resynced.clear()
+        self._dirty.clear()
+        if self._listener:
+            self._listener.Revoke()
+        self._listener = Tf.Notice.Register(Usd.Notice.ObjectsChanged, self._on_objects_changed, stage)
+        carb.log_info(f"Spatial index: {len(self._paths)} prims in {time.perf_counter() - start:.3f}s")
+
+    def clear(self) -> None:
+        if self._listener:
+            self._listener.Revoke()
+            self._listener = None
+        self._rebuild({})
+        self._resynced.clear()
+        self._dirty.clear()
+
+    def _on_objects_changed(self, notice, stage) -> None:
+        """Record the changed prims; the index is brought up to date by the next query."""
+        for path in notice.GetResyncedPaths():
+            self._resynced.add(path.GetPrimPath())
+        for path in notice.GetChangedInfoOnlyPaths():
+            prim_path = path.GetPrimPath()
+            if prim_path in self._rows:
+                self._dirty.add(prim_path)
+            elif path.IsPropertyPath() and path.name in VISIBILITY_PROPERTIES:
+                # Gprims hidden when the index was built have no row yet;
+                # the subtree is walked again and new boxes rebuild the index.
+                self._dirty.add(prim_path)
+            elif prim_path in self._ancestors and path.IsPropertyPath() and \
+                    path.name.startswith(INHERITED_BOUNDS_PROPERTIES):
+                self._dirty.add(prim_path)
+
+    def _refresh(self, stage) -> None:
+        """Apply the recorded changes: moved prims refit the hierarchy, added or
+        removed prims rebuild it."""
+        if not self._resynced and not self._dirty:
+            return
+        bbox_cache = self._bbox_cache()
+        bounds = None
+        if self._resynced:
+            bounds = {path: (tuple(self._bvh.lo[row]), tuple(self._bvh.hi[row])) for path, row in self._rows.items()}
+            for resynced in Sdf.Path.RemoveDescendentPaths(list(self._resynced)):
+                for path in [path for path in bounds if path.HasPrefix(resynced)]:
+                    del bounds[path]
+                prim = stage.GetPrimAtPath(resynced)
+                if prim:
+                    for gprim in self._gprims(prim):
+                        box = self._bounds(bbox_cache, gprim)
+                        if box is not None:
+                            bounds[gprim.GetPath()] = box
+
+        moved = {}
+        for dirty in Sdf.Path.RemoveDescendentPaths(list(self._dirty)):
+            prim = stage.GetPrimAtPath(dirty)
+            if not prim:
+                continue
+            for gprim in self._gprims(prim) if dirty not in self._rows else [prim]:
+                moved[gprim.GetPath()] = self._bounds(bbox_cache, gprim)
+        self._resynced.clear()
+        self._dirty.clear()
+
+        if bounds is None and all(box is not None and path in self._rows for path, box in moved.items()):
+            if moved:
+                rows = [self._rows[path] for path in moved]
+                self._bvh.update(rows, [box[0] for box in moved.values()], [box[1] for box in moved.values()])
+            return
+        if bounds is None:
+            bounds = {path: (tuple(self._bvh.lo[row]), tuple(self._bvh.hi[row])) for path, row in self._rows.items()}
+        for path, box in moved.items():
+            if box is None:
+                bounds.pop(path, None)
+            else:
+                bounds[path] = box
+        self._rebuild(bounds)
+
+    @staticmethod
+    def _get(payload, key: str, default):
+        return payload[key] if key in payload else default
+
+    @staticmethod
+    def _vector(payload, key: str):
+        value = payload[key]
+        if isinstance(value, carb.dictionary.Item):
+            value = value.get_dict()
+        vector = [float(component) for component in value]
+        if len(vector) != 3:
+            raise ValueError(f"'{key}' must have 3 components")
+        return vector
+
+    def query(self, payload) -> dict:
+        """Answer a spatial query; coordinates and distances are in world stage units."""
+        stage = omni.usd.get_context().get_stage()
+        if not stage or self._listener is None:
+            raise RuntimeError("the spatial index has not been built")
+        self._refresh(stage)
+        query_type = payload["type"]
+        distances = None
+        if query_type == "box":
+            rows = self._bvh.query_box(self._vector(payload, "min"), self._vector(payload, "max"),
+                                       bool(self._get(payload, "contained", False)))
+        elif query_type == "sphere":
+            rows = self._bvh.query_sphere(self._vector(payload, "center"), float(payload["radius"]))
+        elif query_type == "ray":
+            rows, distances = self._bvh.query_ray(self._vector(payload, "origin"), self._vector(payload, "direction"),
+                                                  float(self._get(payload, "max_distance", np.inf)))
+        elif query_type == "nearest":
+            rows, distances = self._bvh.query_nearest(self._vector(payload, "point"), int(self._get(payload, "k", 1)))
+        else:
+            raise ValueError(f"unknown query type '{query_type}'")
+        result = {"paths": [str(self._paths[row]) for row in rows]}
+        if distances is not None:
+            result["distances"] = [float(distance) for distance in distances]
+        return result
+
+    def _on_stage_event_assets_loaded(self, event) -> None:
+        if not self._enabled:
+            return
+        stage = omni.usd.get_context().get_stage()
+        if stage:
+            self.build(stage)
+
+    def _on_stage_event_closed(self, event) -> None:
+        self.clear()
+
+    def _on_spatial_query(self, event: carb.events.IEvent) -> None:
+        """
+        Handler for `spatialQueryRequest` event.
+
+        `type` selects the query:
+        - "box": prims overlapping `min`..`max` (`contained`: only prims inside it)
+        - "sphere": prims within `radius` of `center`
+        - "ray": prims whose bounds are hit from `origin` along `direction`
+          (up to `max_distance`), with their distances, nearest first
+        - "nearest": the `k` prims nearest to `point`, with their distances
+
+        Sends `spatialQueryResponse` with the prim paths.
+        """
+        start = time.perf_counter()
+        payload = {"type": self._get(event.payload, "type", ""), "paths": []}
+        try:
+            payload.update(self.query(event.payload))
+        except Exception as e:
+            payload.update({"result": "error", "error": str(e)})
+        else:
+            payload.update({"result": "success", "error": ""})
+        payload["elapsed_ms"] = (time.perf_counter() - start) * 1000.0
+        get_eventdispatcher().dispatch_event("spatialQueryResponse", payload=payload)
+
+    def on_shutdown(self):
+        """This is called every time the extension is deactivated. It is used
+        to clean up the extension state."""
+        self._subscriptions.clear()
+        self.clear()
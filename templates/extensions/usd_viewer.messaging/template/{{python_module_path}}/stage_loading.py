@@ -10,9 +10,12 @@
 
 import asyncio
 import os
+import time
 
 import carb
+import carb.dictionary
 import carb.events
+import carb.settings
 import carb.tokens
 from carb.eventdispatcher import get_eventdispatcher
 
@@ -20,6 +23,90 @@ import omni.client
 import omni.kit.app
 import omni.kit.livestream.messaging as messaging
 import omni.usd
+from pxr import Sdf
+
+# Stage load mode. "all" composes every payload while the stage opens, "none"
+# opens the stage with no payloads loaded, reports it as opened and then loads
+# the payloads progressively (or only on request, see `streamPayloads`).
+LOAD_MODE_SETTING = "/exts/{{ extension_name }}/loadMode"
+# Number of payloads loaded per frame in "none" mode.
+PAYLOAD_BATCH_SETTING = "/exts/{{ extension_name }}/payloadBatchSize"
+# In "none" mode, load all payloads after the stage has opened.
+STREAM_PAYLOADS_SETTING = "/exts/{{ extension_name }}/streamPayloads"
+# Seconds to wait for the assets and streaming of an opened stage before
+# `openedStageResult` is sent anyway.
+LOAD_TIMEOUT_SETTING = "/exts/{{ extension_name }}/loadTimeout"
+LOAD_MODES = {
+    "all": omni.usd.UsdContextInitialLoadSet.LOAD_ALL,
+    "none": omni.usd.UsdContextInitialLoadSet.LOAD_NONE,
+}
+
+
+class LoadCompletion:
+    """
+    Completion of one stage open, driven by the stage, rendering and
+    streaming status events instead of polling every frame.
+
+    Records the seconds from the OPENING event to each milestone:
+    "first_frame" (first frame rendered), "assets_loaded" (ASSETS_LOADED)
+    and "streaming_idle" (the streaming manager is idle after the assets
+    have loaded). The open is complete once the assets have loaded and
+    streaming is idle; the first frame is only recorded, since nothing may
+    be rendering.
+    """
+    MILESTONES = ("first_frame", "assets_loaded", "streaming_idle")
+    COMPLETE = ("assets_loaded", "streaming_idle")
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._times = {}
+        self._events = {milestone: asyncio.Event() for milestone in self.MILESTONES}
+        self._streaming_busy = False
+
+    def mark(self, milestone: str) -> None:
+        """Record `milestone`; later marks of the same milestone are ignored."""
+        if milestone in self._times:
+            return
+        self._times[milestone] = time.perf_counter() - self._start
+        self._events[milestone].set()
+
+    def assets_loaded(self) -> None:
+        self.mark("assets_loaded")
+        if not self._streaming_busy:
+            self.mark("streaming_idle")
+
+    def set_streaming_busy(self, busy: bool) -> None:
+        self._streaming_busy = busy
+        # Streaming can go idle between layers; only idle after ASSETS_LOADED counts.
+        if not busy and "assets_loaded" in self._times:
+            self.mark("streaming_idle")
+
+    async def wait(self, milestones=COMPLETE, timeout: float = None) -> bool:
+        """
+        Wait until all `milestones` are reached, at most `timeout` seconds
+        (no limit when None). Returns False on timeout.
+        """
+        async def reached():
+            for milestone in milestones:
+                await self._events[milestone].wait()
+
+        try:
+            await asyncio.wait_for(reached(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def timings(self) -> dict:
+        """Milliseconds to each milestone, None for the ones not reached."""
+        return {
+            f"{milestone}_ms": self._times[milestone] * 1000.0 if milestone in self._times else None
+            for milestone in self.MILESTONES
+        }
+
+    @classmethod
+    def no_timings(cls) -> dict:
+        """Timings of an open that recorded no milestones."""
+        return {f"{milestone}_ms": None for milestone in cls.MILESTONES}
 
 
 class LoadingManager:
@@ -42,7 +129,16 @@ class LoadingManager:
         # States if opened stage is opened from storage as in not a
         # new unsaved stage
         self._persisted_stage: bool = False
-        self._is_evaluating_loading_status: bool = False
+        # Task waiting for the opened stage to finish loading.
+        self._evaluate_task = None
+
+        # Load mode of the requested stage, and the task loading its payloads
+        # after the stage has opened (load mode "none" only).
+        self._load_mode: str = "all"
+        self._payload_task = None
+
+        # Milestones of the stage being opened, from its OPENING event.
+        self._load_completion: LoadCompletion = None
 
         # -- register outgoing events/messages
         outgoing = [
@@ -50,6 +146,8 @@ class LoadingManager:
             "updateProgressAmount",  # Status bar event denoting progress
             "updateProgressActivity",  # Status bar event denoting activity
             "loadingStateResponse",  # Response to loadingStateQuery
+            "payloadLoadingProgress",  # Deferred payloads loaded so far
+            "loadPayloadsResponse",  # Response to loadPayloadsRequest
         ]
 
         for o in outgoing:
@@ -67,6 +165,8 @@ class LoadingManager:
             # internal event to capture progress activity
             "omni.kit.window.status_bar@activity": self._on_activity,
             "loadingStateQuery": self._on_load_state_query,
+            # request to load (or unload) payloads of the opened stage
+            "loadPayloadsRequest": self._on_load_payloads,
         }
         ed = get_eventdispatcher()
         for event_type, handler in incoming.items():
@@ -97,6 +197,11 @@ class LoadingManager:
                 event_name=usd_context.stage_event_name(omni.usd.StageEventType.ASSETS_LOADED),
                 on_event=self._on_stage_event_assets_loaded,
             ),
+            ed.observe_event(
+                observer_name="LoadingManager:rendering:new_frame",
+                event_name=usd_context.stage_rendering_event_name(omni.usd.StageRenderingEventType.NEW_FRAME),
+                on_event=self._on_new_frame,
+            ),
         ])
 
         self._subscriptions.append(
@@ -131,6 +236,12 @@ class LoadingManager:
             return
 
         self._requested_stage_url = event.payload["url"]
+        settings = carb.settings.get_settings()
+        load_mode = event.payload["load"] if "load" in event.payload else ""
+        load_mode = load_mode or settings.get_as_string(LOAD_MODE_SETTING) or "all"
+        if load_mode not in LOAD_MODES:
+            carb.log_warn(f"Unknown load mode '{load_mode}', loading all payloads")
+            load_mode = "all"
         carb.log_info(
             f"Received message to load '{self._requested_stage_url}'"
         )
@@ -161,24 +272,33 @@ class LoadingManager:
         # If we are, we don't need to reload the file, instead we'll just send the success message.
         if omni.client.utils.equal_urls(url, current_stage):
             carb.log_info(f'Client requested to open a stage that is already open: {url}')
-            payload = {"url": self._requested_stage_url, "result": "success", "error": ''}
+            payload = {"url": self._requested_stage_url, "result": "success", "error": '',
+                       "timings": LoadCompletion.no_timings()}
             get_eventdispatcher().dispatch_event("openedStageResult", payload=payload)
             self._reset_state()
             return
 
+        # A new stage replaces the one whose payloads are still loading.
+        self._cancel_payload_loading()
+        self._load_mode = load_mode
+        # Milestones recorded from here on belong to the requested stage.
+        self._load_completion = None
+
         # Asynchronously load the incoming stage
         async def open_stage():
             carb.log_info(f'Opening stage per client request: {url}')
             usd_context = omni.usd.get_context()
             if url:
-                result, error = await usd_context.open_stage_async(url, omni.usd.UsdContextInitialLoadSet.LOAD_ALL)
+                result, error = await usd_context.open_stage_async(url, LOAD_MODES[load_mode])
             else:
                 result, error = await usd_context.new_stage_async()
 
             if result is not True:
                 # Send message to client that loading failed.
                 carb.log_warn(f'The file that the client requested failed to load: {url} (error: {error})')
-                payload = {"url": url, "result": "error", "error": error}
+                completion = self._load_completion
+                timings = completion.timings() if completion else LoadCompletion.no_timings()
+                payload = {"url": url, "result": "error", "error": error, "timings": timings}
                 get_eventdispatcher().dispatch_event("openedStageResult", payload=payload)
                 self._reset_state()
                 return
@@ -194,6 +314,10 @@ class LoadingManager:
             event (carb.events.IEvent): Event type
         """
         self._stage_is_opening = True
+        # The evaluation of a previous open would report into this one.
+        self._cancel_load_evaluation()
+        self._load_completion = LoadCompletion()
+        self._load_completion.set_streaming_busy(self._streaming_manager_is_busy)
         payload: dict = dict(event.payload)
         if 'val' in payload.keys():
             self._opened_stage_url = payload['val']
@@ -215,9 +339,12 @@ class LoadingManager:
             return
         self._stage_is_opening = False
         self._stage_has_opened = True
+        if self._load_completion:
+            self._load_completion.assets_loaded()
 
         # Async call to evaluate opened state
-        asyncio.ensure_future(self._evaluate_load_status())
+        if self._persisted_stage and not self._evaluate_task:
+            self._evaluate_task = asyncio.ensure_future(self._evaluate_load_status(self._load_completion))
         return
 
     def _on_rxt_streaming_event(self, event) -> None:
@@ -229,39 +356,118 @@ class LoadingManager:
             https://docs.omniverse.nvidia.com/kit/docs/kit-manual/105.0/carb.events/carb.events.IEvent.html
         """
         self._streaming_manager_is_busy = event.payload['isBusy']
+        if self._load_completion:
+            self._load_completion.set_streaming_busy(self._streaming_manager_is_busy)
+
+    def _on_new_frame(self, event) -> None:
+        if self._load_completion:
+            self._load_completion.mark("first_frame")
 
-    async def _evaluate_load_status(self):
+    async def wait_for_load(self, timeout: float = None) -> bool:
         """
-        If streaming manager is not busy and the stage is loaded from storage,
-        notify the client.
+        Wait until the stage being opened has loaded its assets and the
+        streaming manager is idle, at most `timeout` seconds. Returns False on timeout, True right away when no stage is
+        being opened.
         """
-        # Only evaluate for stage loaded from storage.
-        if not self._persisted_stage:
-            return
-
-        if self._is_evaluating_loading_status:
-            return
-        self._is_evaluating_loading_status = True
+        if not self._load_completion:
+            return True
+        return await self._load_completion.wait(timeout=timeout)
 
+    async def _evaluate_load_status(self, completion: LoadCompletion):
+        """
+        Once the stage has loaded its assets and the streaming manager is
+        idle, notify the client with the time each milestone took.
+        """
         # Wait until all dependencies have loaded by streaming manager
-        while self._streaming_manager_is_busy or not self._stage_has_opened:
-            await omni.kit.app.get_app().next_update_async()
-
-        for _ in range(2):
-            await omni.kit.app.get_app().next_update_async()
+        timeout = carb.settings.get_settings().get_as_float(LOAD_TIMEOUT_SETTING) or None
+        if not await completion.wait(timeout=timeout):
+            carb.log_warn(f"Stage did not finish loading within {timeout}s: {completion.timings()}")
 
         # Stage has loaded with all dependencies. Send message to client.
         url = self._requested_stage_url if self._requested_stage_url  else '[obfuscated]'
         carb.log_info(
             f'Sending message to client that stage has loaded: {url}'
         )
-        payload = {"url": url, "result": "success", "error": ''}
+        payload = {"url": url, "result": "success", "error": '', "timings": completion.timings()}
         get_eventdispatcher().dispatch_event("openedStageResult", payload=payload)
 
+        # The client has the shell of the stage now, load the deferred payloads.
+        if self._load_mode == "none" and carb.settings.get_settings().get(STREAM_PAYLOADS_SETTING):
+            self._payload_task = asyncio.ensure_future(self._stream_payloads())
+
         # reset
-        self._is_evaluating_loading_status = False
+        self._evaluate_task = None
         self._reset_state()
 
+    async def _stream_payloads(self):
+        """
+        Load the payloads of a stage opened with load mode "none", a batch per
+        frame, reporting `payloadLoadingProgress` after every batch.
+        """
+        stage = omni.usd.get_context().get_stage()
+        if not stage:
+            return
+        batch_size = max(1, carb.settings.get_settings().get_as_int(PAYLOAD_BATCH_SETTING) or 1)
+        # Top-most loadable prims; loading them also loads nested payloads.
+        pending = [path for path in stage.FindLoadable() if not stage.GetPrimAtPath(path).IsLoaded()]
+        total = len(pending)
+        carb.log_info(f"Loading {total} deferred payloads, {batch_size} per frame")
+        if not pending:
+            payload = {"loaded": 0, "total": 0, "done": True}
+            get_eventdispatcher().dispatch_event("payloadLoadingProgress", payload=payload)
+        while pending:
+            batch, pending = pending[:batch_size], pending[batch_size:]
+            # A payload may have been loaded on request in the meantime.
+            batch = [path for path in batch if not stage.GetPrimAtPath(path).IsLoaded()]
+            if batch:
+                stage.LoadAndUnload(batch, [])
+            loaded = total - len(pending)
+            payload = {"loaded": loaded, "total": total, "done": not pending}
+            get_eventdispatcher().dispatch_event("payloadLoadingProgress", payload=payload)
+            await omni.kit.app.get_app().next_update_async()
+            if omni.usd.get_context().get_stage() is not stage:
+                return
+        self._payload_task = None
+
+    def _cancel_load_evaluation(self):
+        if self._evaluate_task and not self._evaluate_task.done():
+            self._evaluate_task.cancel()
+        self._evaluate_task = None
+
+    def _cancel_payload_loading(self):
+        if self._payload_task and not self._payload_task.done():
+            self._payload_task.cancel()
+        self._payload_task = None
+
+    def _on_load_payloads(self, event: carb.events.IEvent) -> None:
+        """
+        Handler for `loadPayloadsRequest` event.
+
+        Loads the payloads under the given `paths` right away, ahead of the
+        progressive loading, and unloads the ones under `unload`. Sends
+        `loadPayloadsResponse` with the result.
+        """
+        def as_list(key):
+            value = event.payload[key] if key in event.payload else []
+            if isinstance(value, carb.dictionary.Item):
+                value = value.get_dict()
+            return [str(path) for path in value]
+
+        load_paths = as_list("paths")
+        unload_paths = as_list("unload")
+        payload = {"paths": load_paths, "unload": unload_paths, "result": "success", "error": ""}
+        stage = omni.usd.get_context().get_stage()
+        try:
+            if not stage:
+                raise RuntimeError("No stage is open")
+            stage.LoadAndUnload(
+                [Sdf.Path(path) for path in load_paths],
+                [Sdf.Path(path) for path in unload_paths],
+            )
+        except Exception as e:
+            payload.update({"result": "error", "error": str(e)})
+        get_eventdispatcher().dispatch_event("loadPayloadsResponse", payload=payload)
+
     def _on_progress(self, event: carb.events.IEvent):
         """
         Handler for `omni.kit.window.status_bar@progress` event.
@@ -293,6 +499,9 @@ class LoadingManager:
         """
         Clean up subscriptions
         """
+        self._cancel_payload_loading()
+        self._cancel_load_evaluation()
+        self._load_completion = None
         if self._subscriptions:
             self._subscriptions.clear()
 
@@ -8,7 +8,12 @@
 # without an express license agreement from NVIDIA CORPORATION or
 # its affiliates is strictly prohibited.
 
-from pxr import UsdGeom, Usd
+import asyncio
+import fnmatch
+import time
+from collections import deque
+
+from pxr import Sdf, Tf, UsdGeom, Usd
 
 import carb
 import carb.dictionary
@@ -24,21 +29,74 @@ import omni.kit.livestream.messaging as messaging
 from carb.eventdispatcher import get_eventdispatcher
 from omni.kit.viewport.utility import get_active_viewport_camera_string
 
+from .camera_bookmarks import restore_camera, snapshot_camera
+
+# Schema types a `getChildrenRequest` can filter on.
+FILTER_TYPES = {
+    "USDGeom": UsdGeom.Mesh,
+    "mesh": UsdGeom.Mesh,
+    "xform": UsdGeom.Xform,
+    "scope": UsdGeom.Scope,
+}
+# Maximum number of prims in a `getSubtreeResponse`.
+SUBTREE_MAX_NODES_SETTING = "/exts/{{ extension_name }}/subtreeMaxNodes"
+# Index the children of the prims sent to the client before it expands them.
+PREFETCH_CHILDREN_SETTING = "/exts/{{ extension_name }}/prefetchChildren"
+# Default number of levels in a `getSubtreeResponse`.
+SUBTREE_DEPTH = 3
+# Number of prims whose children are prefetched per frame.
+PREFETCH_BATCH = 64
+# Send `stageSelectionChanged` as `added`/`removed` deltas instead of the full selection.
+SELECTION_DELTAS_SETTING = "/exts/{{ extension_name }}/selectionDeltas"
+# Minimum number of seconds between two `stageSelectionChanged` messages.
+SELECTION_INTERVAL_SETTING = "/exts/{{ extension_name }}/selectionBroadcastInterval"
+# Number of `set_pickable` calls per frame when a request changes many prims.
+PICKABLE_BATCH = 2000
+
 
 class StageManager:
     """This class manages the stage and its related events."""
     def __init__(self):
         # Internal messaging state
-        self._is_external_update: bool = False
         self._camera_attrs = {}
         self._subscriptions = []
 
+        # prim path -> [(child info, matching filter names)], built on the
+        # first request for a prim and dropped when its children are resynced.
+        self._child_index = {}
+        self._listener = None
+        # Prims whose children are indexed in the background, a batch per frame.
+        self._prefetch_queue = deque()
+        self._prefetch_task = None
+
+        # Selection changes are broadcast at most once per frame. The client
+        # is known to have `_client_selection`, either from the last broadcast
+        # or from its own selectPrimsRequest, so changes it made itself are not
+        # echoed back, however many of them arrive in one frame.
+        self._client_selection = []
+        self._selection_dirty: bool = False
+        self._selection_request_id = ""
+        self._selection_sequence: int = 0
+        self._last_selection_broadcast: float = 0.0
+
+        # Prims requested to be pickable on top of the unpickable stage;
+        # pickability of a prim applies to its whole subtree, so only the
+        # top-most ones are applied. Requests are applied in order.
+        self._pickable = set()
+        # Path -> value of every `set_pickable` call since the stage opened.
+        # The most specific path decides, so these have to stay consistent
+        # with the requested prims.
+        self._pickable_applied = {}
+        self._pickable_task = None
+
         # -- register outgoing events/messages
         outgoing = [
             # notify when user selects something in the viewport.
             "stageSelectionChanged",
             # response to request for children of a prim
             "getChildrenResponse",
+            # response to request for several levels of descendants of a prim
+            "getSubtreeResponse",
             # response to request for primitive being pickable.
             "makePrimsPickableResponse",
             # response to the request to reset camera attributes
@@ -56,6 +114,8 @@ class StageManager:
         incoming = {
             # request to get children of a prim
             'getChildrenRequest': self._on_get_children,
+            # request to get several levels of descendants of a prim
+            'getSubtreeRequest': self._on_get_subtree,
             # request to select a prim
             'selectPrimsRequest': self._on_select_prims,
             # request to make primitives pickable
@@ -95,80 +155,258 @@ class StageManager:
                 on_event=self._on_stage_event_selection_changed,
             )
         )
-
-    def get_children(self, prim_path, filters=None):
-        """
-        Collect any children of the given `prim_path`, potentially filtered by `filters`
-        """
-        stage = omni.usd.get_context().get_stage()
-        prim = stage.GetPrimAtPath(prim_path)
-        if not prim:
-            return []
-
-        filter_types = {
-            "USDGeom": UsdGeom.Mesh,
-            "mesh": UsdGeom.Mesh,
-            "xform": UsdGeom.Xform,
-            "scope": UsdGeom.Scope,
-        }
-
-        children = []
+        self._subscriptions.append(
+            ed.observe_event(
+                observer_name="StageManager:update",
+                event_name=omni.kit.app.GLOBAL_EVENT_UPDATE,
+                on_event=self._on_update,
+            )
+        )
+        # The extension can be enabled after a stage was opened, in which
+        # case no OPENED event arrives for it.
+        self._watch_stage(usd_context.get_stage())
+
+    def _watch_stage(self, stage) -> None:
+        """Follow changes of `stage` to keep the children index current."""
+        if self._listener:
+            self._listener.Revoke()
+            self._listener = None
+        if stage:
+            self._listener = Tf.Notice.Register(Usd.Notice.ObjectsChanged, self._on_objects_changed, stage)
+
+    @staticmethod
+    def _has_children(prim) -> bool:
+        """Whether `prim` has children, without listing them."""
+        descendants = iter(Usd.PrimRange(prim))
+        next(descendants)
+        return next(descendants, None) is not None
+
+    def _indexed_children(self, prim):
+        """The cached children entries of `prim`, building them on first use."""
+        path = prim.GetPath()
+        entries = self._child_index.get(path)
+        if entries is not None:
+            return entries
+
+        parent_path = str(path) if path != Sdf.Path.absoluteRootPath else ''
+        entries = []
         for child in prim.GetChildren():
-            # If a child doesn't pass any filter, we skip it.
-            if filters is not None:
-                if isinstance(filters, carb.dictionary.Item):
-                    filters = filters.get_dict()
-                if not any(child.IsA(filter_types[filt]) for filt in filters if filt in filter_types):
-                    continue
-
             child_name = child.GetName()
-            child_path = str(prim.GetPath())
             # Skipping over cameras
             if child_name.startswith('OmniverseKit_'):
                 continue
             # Also skipping rendering primitives.
-            if prim_path == '/' and child_name == 'Render':
+            if not parent_path and child_name == 'Render':
                 continue
-            child_path = child_path if child_path != '/' else ''
-            carb.log_info(f'child_path: {child_path}')
-            info = {"name": child_name, "path": f'{child_path}/{child_name}'}
-
+            info = {"name": child_name, "path": f'{parent_path}/{child_name}'}
             # We return an empty list here to indicate that children are
-            # available, but the current app does not support pagination,
-            # so we use this to lazy load the stage tree.
-            if child.GetChildren():
+            # available; they are requested when the client expands the prim.
+            if self._has_children(child):
                 info["children"] = []
+            matches = frozenset(name for name, schema in FILTER_TYPES.items() if child.IsA(schema))
+            entries.append((info, matches))
+        self._child_index[path] = entries
+        return entries
 
-            children.append(info)
+    def get_children_page(self, prim_path, filters=None, offset=0, limit=0):
+        """
+        Collect the children of the given `prim_path`, potentially filtered by
+        `filters`, from `offset` on and at most `limit` of them (all when 0).
 
-        return children
+        Returns the children and the number of children passing the filters.
+        """
+        stage = omni.usd.get_context().get_stage()
+        prim = stage.GetPrimAtPath(prim_path) if stage else None
+        if not prim:
+            return [], 0
+
+        entries = self._filtered(self._indexed_children(prim), filters)
+        offset = max(0, int(offset))
+        end = offset + int(limit) if limit and int(limit) > 0 else len(entries)
+        children = [dict(info) for info, _ in entries[offset:end]]
+        self._prefetch(child["path"] for child in children if "children" in child)
+        return children, len(entries)
+
+    @staticmethod
+    def _filtered(entries, filters):
+        """The children entries passing any of `filters` (all entries when None)."""
+        # A child that doesn't pass any filter is skipped.
+        if filters is None:
+            return entries
+        if isinstance(filters, carb.dictionary.Item):
+            filters = filters.get_dict()
+        filters = set(filters)
+        return [entry for entry in entries if entry[1] & filters]
+
+    def get_subtree(self, prim_path, filters=None, depth=SUBTREE_DEPTH, max_nodes=None):
+        """
+        Collect the descendants of `prim_path` down to `depth` levels, breadth
+        first and at most `max_nodes` of them, in the format of `get_children`
+        with the `children` of expanded prims filled in.
+
+        Returns the children of `prim_path`, the number of prims collected and
+        whether prims were left out because of `max_nodes`. The children of
+        `prim_path` itself are cut to the first `max_nodes`; below it, sibling
+        lists are kept whole or left unexpanded.
+        """
+        stage = omni.usd.get_context().get_stage()
+        prim = stage.GetPrimAtPath(prim_path) if stage else None
+        if not prim:
+            return [], 0, False
+        if max_nodes is None:
+            max_nodes = carb.settings.get_settings().get_as_int(SUBTREE_MAX_NODES_SETTING) or 1000
+
+        root = {"children": []}
+        queue = deque([(prim, root, 0)])
+        count = 0
+        truncated = False
+        frontier = []
+        while queue:
+            parent, info, level = queue.popleft()
+            entries = self._filtered(self._indexed_children(parent), filters)
+            if count + len(entries) > max_nodes:
+                truncated = True
+                if info is not root:
+                    # Keep whole sibling lists; the client expands the rest lazily.
+                    frontier.append(str(parent.GetPath()))
+                    continue
+                # The requested prim always gets its first `max_nodes` children,
+                # the client pages through the rest with getChildrenRequest.
+                entries = entries[:max_nodes]
+            count += len(entries)
+            info["children"] = [dict(entry_info) for entry_info, _ in entries]
+            for child in info["children"]:
+                if "children" not in child:
+                    continue
+                if level + 1 < depth:
+                    queue.append((stage.GetPrimAtPath(child["path"]), child, level + 1))
+                else:
+                    frontier.append(child["path"])
+        # The client is likely to expand the unexpanded prims next.
+        self._prefetch(frontier)
+        return root["children"], count, truncated
+
+    def _prefetch(self, paths) -> None:
+        """Index the children of `paths` in the background, a batch per frame."""
+        if not carb.settings.get_settings().get(PREFETCH_CHILDREN_SETTING):
+            return
+        self._prefetch_queue.extend(Sdf.Path(path) for path in paths)
+        if self._prefetch_queue and (self._prefetch_task is None or self._prefetch_task.done()):
+            self._prefetch_task = asyncio.ensure_future(self._prefetch_children())
+
+    async def _prefetch_children(self):
+        stage = omni.usd.get_context().get_stage()
+        while self._prefetch_queue and stage:
+            for _ in range(min(PREFETCH_BATCH, len(self._prefetch_queue))):
+                path = self._prefetch_queue.popleft()
+                if path not in self._child_index and (prim := stage.GetPrimAtPath(path)):
+                    self._indexed_children(prim)
+            await omni.kit.app.get_app().next_update_async()
+            if omni.usd.get_context().get_stage() is not stage:
+                break
+        self._prefetch_queue.clear()
+        self._prefetch_task = None
+
+    def _cancel_prefetch(self) -> None:
+        if self._prefetch_task and not self._prefetch_task.done():
+            self._prefetch_task.cancel()
+        self._prefetch_task = None
+        self._prefetch_queue.clear()
+
+    def get_children(self, prim_path, filters=None):
+        """
+        Collect any children of the given `prim_path`, potentially filtered by `filters`
+        """
+        return self.get_children_page(prim_path, filters)[0]
+
+    def _on_objects_changed(self, notice, stage) -> None:
+        """Drop the cached children of resynced prims, of their parents and
+        grandparents."""
+        for path in notice.GetResyncedPaths():
+            prim_path = path.GetPrimPath()
+            if prim_path == Sdf.Path.absoluteRootPath:
+                self._child_index.clear()
+                return
+            for cached in [cached for cached in self._child_index if cached.HasPrefix(prim_path)]:
+                del self._child_index[cached]
+            parent_path = prim_path.GetParentPath()
+            self._child_index.pop(parent_path, None)
+            # The parent may have gained its first or lost its last child, which
+            # changes the `children` flag of its entry in the grandparent.
+            if parent_path != Sdf.Path.absoluteRootPath:
+                self._child_index.pop(parent_path.GetParentPath(), None)
 
     def _on_get_children(self, event: carb.events.IEvent) -> None:
         """
         Handler for the `getChildrenRequest` event
         Collects a filtered collection of a given primitives children.
+
+        The optional `offset` and `limit` keys select a page of the children;
+        the response carries the `total` number of children and the
+        `next_offset` of the following page (-1 after the last page).
         """
+        def get(key, default):
+            return event.payload[key] if key in event.payload else default
 
+        prim_path = event.payload["prim_path"]
+        offset = int(get("offset", 0) or 0)
+        limit = int(get("limit", 0) or 0)
         carb.log_info(
-            "Received message to return list of a prim\'s children"
+            f"Received message to return list of a prim\'s children: {prim_path} (offset {offset}, limit {limit})"
         )
-        children = self.get_children(
-            prim_path=event.payload["prim_path"],
-            filters=event.payload["filters"]
+        children, total = self.get_children_page(
+            prim_path=prim_path,
+            filters=get("filters", None),
+            offset=offset,
+            limit=limit,
         )
+        next_offset = offset + len(children)
         payload = {
-            "prim_path": event.payload["prim_path"],
-            "children": children
+            "prim_path": prim_path,
+            "children": children,
+            "offset": offset,
+            "limit": limit,
+            "total": total,
+            "next_offset": next_offset if next_offset < total else -1,
         }
 
-
         get_eventdispatcher().dispatch_event("getChildrenResponse", payload=payload)
 
+    def _on_get_subtree(self, event: carb.events.IEvent) -> None:
+        """
+        Handler for the `getSubtreeRequest` event
+
+        Collects `depth` levels (default 3) of filtered descendants of
+        `prim_path` in one response, capped at `max_nodes` prims (default and
+        upper bound: the `subtreeMaxNodes` setting). Prims that were not
+        expanded keep an empty `children` list, as in `getChildrenResponse`.
+        """
+        def get(key, default):
+            return event.payload[key] if key in event.payload else default
+
+        prim_path = event.payload["prim_path"]
+        depth = max(1, int(get("depth", SUBTREE_DEPTH) or SUBTREE_DEPTH))
+        max_nodes = carb.settings.get_settings().get_as_int(SUBTREE_MAX_NODES_SETTING) or 1000
+        max_nodes = max(1, min(max_nodes, int(get("max_nodes", max_nodes) or max_nodes)))
+        carb.log_info(f"Received message to return the subtree of {prim_path} ({depth} levels)")
+        children, count, truncated = self.get_subtree(prim_path, get("filters", None), depth, max_nodes)
+        payload = {
+            "prim_path": prim_path,
+            "depth": depth,
+            "children": children,
+            "count": count,
+            "truncated": truncated,
+        }
+
+        get_eventdispatcher().dispatch_event("getSubtreeResponse", payload=payload)
+
     def _on_select_prims(self, event: carb.events.IEvent) -> None:
         """
         Handler for `selectPrimsRequest` event.
 
-        Selects the given primitives.
+        Selects the given primitives. An optional `request_id` is sent back
+        with the next `stageSelectionChanged`, if the selection differs from
+        the requested one by then.
         """
         new_selection = []
         if "paths" in event.payload:
@@ -177,9 +415,10 @@ class StageManager:
             else:
                 new_selection = list(event.payload["paths"])
             carb.log_info(f"Received message to select '{new_selection}'")
-        # Flagging this as an external event because it
-        # was initiated by the client.
-        self._is_external_update = True
+        # The client initiated this change and is already aware of it.
+        self._client_selection = [str(path) for path in new_selection]
+        if "request_id" in event.payload:
+            self._selection_request_id = str(event.payload["request_id"])
         sel = omni.usd.get_context().get_selection()
         sel.clear_selected_prim_paths()
         sel.set_selected_prim_paths(new_selection, True)
@@ -188,56 +427,77 @@ class StageManager:
         stage = omni.usd.get_context().get_stage()
         stage_url = stage.GetRootLayer().identifier if stage else ''
 
+        # The children index belongs to the previous stage.
+        self._cancel_prefetch()
+        self._child_index.clear()
+        self._watch_stage(stage)
+
         if stage_url:
             # Set the entire stage to not be pickable.
             ctx = omni.usd.get_context()
             ctx.set_pickable("/", False)
-            # Clear before using, so that we're sure the data is only
-            # from the new stage.
-            self._camera_attrs.clear()
+            self._pickable.clear()
+            self._pickable_applied = {Sdf.Path.absoluteRootPath: False}
             # Capture the active camera's camera data, used to reset
             # the scene to a known good state.
-            if (prim := ctx.get_stage().GetPrimAtPath(get_active_viewport_camera_string())):
-                for attr in prim.GetAttributes():
-                    self._camera_attrs[attr.GetName()] = attr.Get()
+            camera_path = get_active_viewport_camera_string()
+            self._camera_attrs = snapshot_camera(stage, camera_path) if stage.GetPrimAtPath(camera_path) else {}
 
     def _on_stage_event_selection_changed(self, event):
-        # If the selection changed came from an external event,
-        # we don't need to let the streaming client know because it
-        # initiated the change and is already aware.
-        if self._is_external_update:
-            self._is_external_update = False
+        # Coalesced with the other changes of this frame, see `_on_update`.
+        self._selection_dirty = True
+
+    def _on_update(self, event) -> None:
+        if not self._selection_dirty:
+            return
+        settings = carb.settings.get_settings()
+        interval = settings.get_as_float(SELECTION_INTERVAL_SETTING) or 0.0
+        now = time.monotonic()
+        if now - self._last_selection_broadcast < interval:
+            return
+        self._selection_dirty = False
+        self._broadcast_selection(bool(settings.get(SELECTION_DELTAS_SETTING)), now)
+
+    def _broadcast_selection(self, deltas: bool, now: float) -> None:
+        """Send `stageSelectionChanged` if the selection differs from what the client has."""
+        selection = list(omni.usd.get_context().get_selection().get_selected_prim_paths())
+        # If the selection is the one the client requested or was last sent,
+        # we don't need to let the streaming client know.
+        if selection == self._client_selection:
+            self._selection_request_id = ""
+            return
+
+        self._selection_sequence += 1
+        payload = {"sequence": self._selection_sequence, "request_id": self._selection_request_id}
+        if deltas:
+            previous = set(self._client_selection)
+            current = set(selection)
+            payload.update({
+                "added": [path for path in selection if path not in previous],
+                "removed": [path for path in self._client_selection if path not in current],
+                "count": len(selection),
+            })
         else:
-            payload = {"prims": omni.usd.get_context().get_selection().
-                        get_selected_prim_paths()}
+            payload["prims"] = selection
+        self._client_selection = selection
+        self._selection_request_id = ""
+        self._last_selection_broadcast = now
 
-            get_eventdispatcher().dispatch_event("stageSelectionChanged", payload=payload)
-            carb.log_info(f"Selection changed: Path to USD prims currently selected = {omni.usd.get_context().get_selection().get_selected_prim_paths()}")
+        get_eventdispatcher().dispatch_event("stageSelectionChanged", payload=payload)
+        carb.log_info(f"Selection changed: {len(selection)} USD prims currently selected")
 
     def _on_reset_camera(self, event: carb.events.IEvent):
         """
         Handler for `resetStage` event.
 
-        Resets the camera back to values collected when the stage was opened.
+        Resets the camera back to values collected when the stage was opened,
+        writing only the attributes that changed since.
         A success message is sent if all attributes are succesfully reset, and error message is set otherwise.
         """
-        ctx = omni.usd.get_context()
-        stage = ctx.get_stage()
+        stage = omni.usd.get_context().get_stage()
         try:
-            # Reset the camera.
-            # The camera lives on the session layer, which has a higher
-            # opinion than the root stage. So we need to explicitly target
-            # the session layer when resetting the camera's attributes.
-            camera_prim = ctx.get_stage().GetPrimAtPath(
-                get_active_viewport_camera_string()
-            )
-            edit_context = Usd.EditContext(
-                stage, Usd.EditTarget(stage.GetSessionLayer())
-            )
-            with edit_context:
-                for name, value in self._camera_attrs.items():
-                    attr = camera_prim.GetAttribute(name)
-                    attr.Set(value)
+            # Reset the camera on the session layer, see `restore_camera`.
+            restore_camera(stage, get_active_viewport_camera_string(), self._camera_attrs)
         except Exception as e:
             payload = {"result": "error", "error": str(e)}
         else:
@@ -245,38 +505,123 @@ class StageManager:
 
         get_eventdispatcher().dispatch_event("resetStageResponse", payload=payload)
 
+    @staticmethod
+    def _expand_paths(stage, paths):
+        """Prim paths for `paths`, where entries with `*`, `?` or `[` are glob
+        patterns matched against the prim paths of the stage."""
+        expanded = []
+        for path in paths:
+            if not any(wildcard in path for wildcard in "*?["):
+                expanded.append(Sdf.Path(path))
+                continue
+            # Only the subtree of the literal part of the pattern is searched.
+            literal = path
+            for wildcard in "*?[":
+                literal = literal.split(wildcard)[0]
+            root = stage.GetPrimAtPath(literal.rsplit("/", 1)[0] or "/")
+            if not root:
+                continue
+            depth = path.count("/")
+            prims = iter(Usd.PrimRange(root))
+            for prim in prims:
+                prim_path = prim.GetPath()
+                if fnmatch.fnmatchcase(str(prim_path), path):
+                    expanded.append(prim_path)
+                    prims.PruneChildren()
+                elif prim_path.pathElementCount >= depth and "**" not in path:
+                    # fnmatch's `*` also matches `/`, but deeper prims are only
+                    # searched for patterns meant to cross levels (`**`).
+                    prims.PruneChildren()
+        return expanded
+
+    async def _apply_pickable(self, previous, reset, add, remove, start):
+        """Apply one pickability request after the `previous` one, `PICKABLE_BATCH` changes per frame."""
+        if previous and not previous.done():
+            await asyncio.wait([previous])
+        payload = {"result": "success", "error": ""}
+        try:
+            ctx = omni.usd.get_context()
+            stage = ctx.get_stage()
+            if not stage:
+                raise RuntimeError("No stage is open")
+            add = self._expand_paths(stage, add)
+            remove = self._expand_paths(stage, remove)
+            applied = self._pickable_applied
+            if reset:
+                # Reset the stage to not be pickable.
+                ctx.set_pickable("/", False)
+                applied[Sdf.Path.absoluteRootPath] = False
+                self._pickable.clear()
+            requested = (self._pickable - set(remove)) | set(add)
+            # Descendants of a pickable prim are pickable already.
+            target = set(Sdf.Path.RemoveDescendentPaths(list(requested)))
+            changes = [(path, True) for path in target if applied.get(path) is not True]
+            # The most specific path decides: a path set earlier has to match
+            # whether a target prim now covers it.
+            for path, pickable in applied.items():
+                if path in target:
+                    continue
+                covered = any(prefix in target for prefix in path.GetPrefixes())
+                if pickable != covered:
+                    changes.append((path, covered))
+            for index in range(0, len(changes), PICKABLE_BATCH):
+                if index:
+                    await omni.kit.app.get_app().next_update_async()
+                    if ctx.get_stage() is not stage:
+                        raise RuntimeError("The stage changed while applying pickability")
+                for path, pickable in changes[index:index + PICKABLE_BATCH]:
+                    ctx.set_pickable(str(path), pickable)
+                    applied[path] = pickable
+            self._pickable = requested
+            payload.update({"changed": len(changes), "pickable": len(requested)})
+        except Exception as e:
+            payload = {"result": "error", "error": str(e)}
+        payload["elapsed_ms"] = (time.perf_counter() - start) * 1000.0
+        get_eventdispatcher().dispatch_event("makePrimsPickableResponse", payload=payload)
+
     def _on_make_pickable(self, event: carb.events.IEvent):
         """
         Handler for `makePrimsPickable` event.
 
-        Enables viewport selection for the provided primitives.
-        Sends 'makePrimsPickableResponse' back to streamer with
-        current success status.
+        Enables viewport selection for prims and their subtrees. `paths`
+        replaces the pickable prims (the stage is reset to not pickable
+        first); `add` and `remove` change them incrementally, and `reset`
+        forces the reset. Entries may be glob patterns such as
+        "/World/Conveyor_*". All changes of a request are applied as one
+        batch, spread over frames when large.
+        Sends 'makePrimsPickableResponse' back to streamer with the success
+        status, the number of `changed` and `pickable` prims and `elapsed_ms`.
         """
-        # Reset the stage to not be pickable.
-        ctx = omni.usd.get_context()
-        ctx.set_pickable("/", False)
-        # Set the provided paths to be pickable.
-        try:
-            if "paths" in event.payload:
-                if isinstance(event.payload["paths"], carb.dictionary.Item):
-                    paths = list(event.payload["paths"].get_dict())
-                else:
-                    paths = list(event.payload["paths"])
-
-            for path in paths:
-                ctx.set_pickable(path, True)
-        except Exception as e:
-            payload = {"result": "error", "error": str(e)}
-        else:
-            payload = {"result": "success", "error": ""}
-
-        get_eventdispatcher().dispatch_event("makePrimsPickableResponse", payload=payload)
+        def as_list(key):
+            value = event.payload[key] if key in event.payload else []
+            if isinstance(value, carb.dictionary.Item):
+                value = value.get_dict()
+            return [str(path) for path in value]
+
+        start = time.perf_counter()
+        reset = "paths" in event.payload or bool(event.payload["reset"] if "reset" in event.payload else False)
+        add = as_list("paths") + as_list("add")
+        remove = as_list("remove")
+        carb.log_info(f"Received message to make {len(add)} paths pickable and {len(remove)} not pickable")
+        self._pickable_task = asyncio.ensure_future(
+            self._apply_pickable(self._pickable_task, reset, add, remove, start)
+        )
 
     def on_shutdown(self):
         """This is called every time the extension is deactivated. It is used
         to clean up the extension state."""
         # Reseting the state.
         self._subscriptions.clear()
-        self._is_external_update: bool = False
+        self._client_selection = []
+        self._selection_dirty = False
         self._camera_attrs.clear()
+        self._cancel_prefetch()
+        if self._pickable_task and not self._pickable_task.done():
+            self._pickable_task.cancel()
+        self._pickable_task = None
+        self._pickable.clear()
+        self._pickable_applied.clear()
+        if self._listener:
+            self._listener.Revoke()
+            self._listener = None
+        self._child_index.clear()
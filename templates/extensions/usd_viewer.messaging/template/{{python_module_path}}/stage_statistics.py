@@ -0,0 +1,288 @@
+# SPDX-FileCopyrightText: Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: LicenseRef-NvidiaProprietary
+#
+# NVIDIA CORPORATION, its affiliates and licensors retain all intellectual
+# property and proprietary rights in and to this material, related
+# documentation and any modifications thereto. Any use, reproduction,
+# disclosure or distribution of this material and related documentation
+# without an express license agreement from NVIDIA CORPORATION or
+# its affiliates is strictly prohibited.
+
+import os
+import time
+
+import numpy as np
+from pxr import Sdf, Usd, UsdGeom, UsdShade
+
+import carb
+import carb.dictionary
+import carb.events
+import omni.kit.app
+import omni.kit.livestream.messaging as messaging
+import omni.usd
+
+from carb.eventdispatcher import get_eventdispatcher
+
+# Depth below the requested root down to which subtrees are reported.
+DEFAULT_DEPTH = 3
+# Counters collected per prim and summed per subtree.
+COUNTERS = (
+    "prims", "meshes", "triangles", "materials", "instances", "instance_proxies",
+    "references", "payloads", "inherits", "specializes", "variant_sets",
+)
+# Metrics that can be written as folded stacks for flame graphs.
+FOLDED_METRICS = ("prims", "triangles", "meshes", "materials", "instance_proxies")
+
+
+def _prim_counters(prim, triangle_cache):
+    """Own counters of `prim` and the texture asset paths it reads."""
+    counters = {"prims": 1}
+    textures = set()
+    if prim.IsA(UsdGeom.Mesh):
+        counters["meshes"] = 1
+        # Instance proxies share the mesh data of their prototype.
+        key = prim.GetPrimInPrototype().GetPath() if prim.IsInstanceProxy() else prim.GetPath()
+        if key not in triangle_cache:
+            counts = UsdGeom.Mesh(prim).GetFaceVertexCountsAttr().Get()
+            triangle_cache[key] = int(np.maximum(np.asarray(counts) - 2, 0).sum()) if counts else 0
+        counters["triangles"] = triangle_cache[key]
+    elif prim.IsA(UsdShade.Material):
+        counters["materials"] = 1
+    elif prim.IsA(UsdShade.Shader):
+        for shader_input in UsdShade.Shader(prim).GetInputs():
+            if shader_input.GetTypeName() == Sdf.ValueTypeNames.Asset:
+                value = shader_input.Get()
+                if value and value.path:
+                    textures.add(value.resolvedPath or value.path)
+    if prim.IsInstance():
+        counters["instances"] = 1
+    if prim.IsInstanceProxy():
+        counters["instance_proxies"] = 1
+    for name, has_arc in (
+        ("references", prim.HasAuthoredReferences),
+        ("payloads", prim.HasAuthoredPayloads),
+        ("inherits", prim.HasAuthoredInherits),
+        ("specializes", prim.HasAuthoredSpecializes),
+    ):
+        if has_arc():
+            counters[name] = 1
+    variant_sets = len(prim.GetVariantSets().GetNames())
+    if variant_sets:
+        counters["variant_sets"] = variant_sets
+    return counters, textures
+
+
+def collect_statistics(stage, root: str = "/", depth: int = DEFAULT_DEPTH, folded_metric: str = ""):
+    """
+    Collect the statistics of the subtree at `root`.
+
+    Returns the subtree as nested nodes (`path`, counters, `textures`,
+    `instancing_ratio`, `children`) down to `depth` levels below `root`, and
+    when `folded_metric` is given, the folded stacks ("A;B;C value" lines) of
+    that metric for every prim, ready for flamegraph.pl or speedscope.
+    """
+    root_prim = stage.GetPrimAtPath(root)
+    if not root_prim:
+        raise ValueError(f"No prim at '{root}'")
+    if folded_metric and folded_metric not in FOLDED_METRICS:
+        raise ValueError(f"Unknown metric '{folded_metric}', expected one of {', '.join(FOLDED_METRICS)}")
+
+    root_path = root_prim.GetPath()
+    root_name = root_prim.GetName() or "/"
+    nodes = {}
+    children = {}
+    triangle_cache = {}
+    folded = {}
+    for prim in Usd.PrimRange(root_prim, Usd.TraverseInstanceProxies()):
+        path = prim.GetPath()
+        counters, textures = _prim_counters(prim, triangle_cache)
+        relative = path.MakeRelativePath(root_path) if path != root_path else Sdf.Path(".")
+        names = [] if relative == Sdf.Path(".") else str(relative).split("/")
+        # Sum into the reported ancestors: the root and `depth` levels below it.
+        for level in range(min(len(names), depth) + 1):
+            node_path = root_path
+            for name in names[:level]:
+                node_path = node_path.AppendChild(name)
+            node = nodes.get(node_path)
+            if node is None:
+                node = nodes[node_path] = {counter: 0 for counter in COUNTERS}
+                node["textures"] = set()
+                children[node_path] = []
+                if level:
+                    children[node_path.GetParentPath()].append(node_path)
+            for counter, value in counters.items():
+                node[counter] += value
+            node["textures"] |= textures
+        if folded_metric and counters.get(folded_metric):
+            stack = ";".join([root_name] + names)
+            folded[stack] = folded.get(stack, 0) + counters[folded_metric]
+
+    def as_tree(path):
+        node = nodes[path]
+        tree = {"path": str(path)}
+        tree.update({counter: node[counter] for counter in COUNTERS})
+        tree["textures"] = len(node["textures"])
+        tree["instancing_ratio"] = node["instance_proxies"] / node["prims"] if node["prims"] else 0.0
+        # Heaviest subtrees first.
+        tree["children"] = sorted((as_tree(child) for child in children[path]),
+                                  key=lambda child: (child["triangles"], child["prims"]), reverse=True)
+        return tree
+
+    tree = as_tree(root_path)
+    folded_lines = [f"{stack} {value}" for stack, value in folded.items()]
+    return tree, folded_lines
+
+
+class StageStatisticsManager:
+    """Reports where the cost of the opened stage lives: per subtree counts
+    and the time spent opening each layer."""
+    def __init__(self):
+        self._subscriptions = []
+
+        # Status bar activities seen while the stage was opening, as
+        # (seconds since the OPENING event, activity text).
+        self._opening_start = None
+        self._activities = []
+        self._open_seconds = None
+
+        # -- register outgoing events/messages
+        outgoing = [
+            # response to stageStatisticsRequest with the statistics of a subtree
+            "stageStatisticsResponse",
+        ]
+
+        for o in outgoing:
+            messaging.register_event_type_to_send(o)
+            omni.kit.app.register_event_alias(
+                carb.events.type_from_string(o),
+                o,
+            )
+
+        # -- register incoming events/messages
+        incoming = {
+            # request for the statistics of a subtree of the stage
+            "stageStatisticsRequest": self._on_stage_statistics,
+            # internal event to capture which asset is loading (see LoadingManager)
+            "omni.kit.window.status_bar@activity": self._on_activity,
+        }
+
+        ed = get_eventdispatcher()
+        for event_type, handler in incoming.items():
+            omni.kit.app.register_event_alias(
+                carb.events.type_from_string(event_type),
+                event_type,
+            )
+            self._subscriptions.append(
+                ed.observe_event(
+                    observer_name=f"StageStatisticsManager:{event_type}",
+                    event_name=event_type,
+                    on_event=handler,
+                )
+            )
+
+        # -- subscribe to the stage events the LoadingManager uses for the open time
+        usd_context = omni.usd.get_context()
+        self._subscriptions.extend([
+            ed.observe_event(
+                observer_name="StageStatisticsManager:stage:opening",
+                event_name=usd_context.stage_event_name(omni.usd.StageEventType.OPENING),
+                on_event=self._on_stage_event_opening,
+            ),
+            ed.observe_event(
+                observer_name="StageStatisticsManager:stage:assets_loaded",
+                event_name=usd_context.stage_event_name(omni.usd.StageEventType.ASSETS_LOADED),
+                on_event=self._on_stage_event_assets_loaded,
+            ),
+        ])
+
+    def _on_stage_event_opening(self, event) -> None:
+        self._opening_start = time.perf_counter()
+        self._activities = []
+        self._open_seconds = None
+
+    def _on_activity(self, event: carb.events.IEvent) -> None:
+        if self._opening_start is None:
+            return
+        texts = [value for value in dict(event.payload).values() if isinstance(value, str) and value]
+        if texts:
+            self._activities.append((time.perf_counter() - self._opening_start, texts[0]))
+
+    def _on_stage_event_assets_loaded(self, event) -> None:
+        # Assets can load again after the stage has opened; keep the first open.
+        if self._opening_start is None:
+            return
+        self._open_seconds = time.perf_counter() - self._opening_start
+        self._opening_start = None
+
+    def layer_timings(self, stage):
+        """
+        Attribute the stage open time to its layers.
+
+        Each status bar activity lasts until the next one (the last one until
+        ASSETS_LOADED) and is attributed to the layers whose file name it
+        mentions. Layer names are relative to the root layer, so server paths
+        are not sent to the client.
+        """
+        root_dir = os.path.dirname(stage.GetRootLayer().realPath or "")
+        layers = []
+        for layer in stage.GetUsedLayers():
+            if layer.anonymous:
+                continue
+            real_path = layer.realPath or layer.identifier
+            name = os.path.relpath(real_path, root_dir) if root_dir and real_path.startswith(root_dir) else \
+                os.path.basename(real_path)
+            layers.append({"layer": name.replace("\\", "/"), "file": os.path.basename(real_path), "open_ms": 0.0})
+
+        unattributed = 0.0
+        if self._open_seconds is not None:
+            ends = [start for start, _ in self._activities[1:]] + [self._open_seconds]
+            for (start, text), end in zip(self._activities, ends):
+                matches = [layer for layer in layers if layer["file"] and layer["file"] in text]
+                duration = (end - start) * 1000.0
+                if not matches:
+                    unattributed += duration
+                for layer in matches:
+                    layer["open_ms"] += duration / len(matches)
+        for layer in layers:
+            del layer["file"]
+        layers.sort(key=lambda layer: layer["open_ms"], reverse=True)
+        return {
+            "open_ms": self._open_seconds * 1000.0 if self._open_seconds is not None else None,
+            "unattributed_ms": unattributed,
+            "layers": layers,
+        }
+
+    def _on_stage_statistics(self, event: carb.events.IEvent) -> None:
+        """
+        Handler for `stageStatisticsRequest` event.
+
+        Collects the statistics of the subtree at `prim_path` (default "/") down
+        to `depth` levels, the open time of each layer and, with `folded` set
+        to one of the counters (e.g. "triangles"), folded stacks for a flame
+        graph. Sends `stageStatisticsResponse`.
+        """
+        def get(key, default):
+            return event.payload[key] if key in event.payload else default
+
+        start = time.perf_counter()
+        prim_path = str(get("prim_path", "/") or "/")
+        payload = {"prim_path": prim_path, "result": "success", "error": ""}
+        try:
+            stage = omni.usd.get_context().get_stage()
+            if not stage:
+                raise RuntimeError("No stage is open")
+            tree, folded = collect_statistics(stage, prim_path, int(get("depth", DEFAULT_DEPTH)),
+                                              str(get("folded", "") or ""))
+            payload.update({"statistics": tree, "timings": self.layer_timings(stage)})
+            if folded:
+                payload["folded"] = "\n".join(folded)
+        except Exception as e:
+            payload.update({"result": "error", "error": str(e)})
+        payload["elapsed_ms"] = (time.perf_counter() - start) * 1000.0
+        get_eventdispatcher().dispatch_event("stageStatisticsResponse", payload=payload)
+
+    def on_shutdown(self):
+        """This is called every time the extension is deactivated. It is used
+        to clean up the extension state."""
+        self._subscriptions.clear()
+        self._activities = []
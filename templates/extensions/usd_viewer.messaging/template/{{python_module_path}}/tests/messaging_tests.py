@@ -8,51 +8,63 @@
 # without an express license agreement from NVIDIA CORPORATION or
 # its affiliates is strictly prohibited.
 
+import asyncio
+import tempfile
 from pathlib import Path
 from typing import Dict, List
 
 import carb.events
 import carb.tokens
 import omni.kit.app
+import omni.usd
 from carb.eventdispatcher import get_eventdispatcher, Event
 from omni.kit.test import AsyncTestCase
+from omni.kit.viewport.utility import get_active_viewport_camera_string
+from pxr import Usd, UsdGeom
 
+from {{ python_module }}.lod_management import LodManager
 
 
-async def wait_stage_loading(wait_frames: int = 2, usd_context=None, timeout=1000, timeout_error=True):
+
+async def open_stage(url: Path, load: str = "", timeout: float = 60.0, wait_frames: int = 2) -> dict:
     """
-    Waits for the USD stage to complete loading.
+    Sends `openStageRequest` and waits for its `openedStageResult`.
 
     Args:
-        wait_frames (int): How many frames to wait after loading the stage if given (2 by default)
-        usd_context (UsdContext): UsdContext to use (omni.usd.get_context() by default)
-        timeout (int): How many frames to wait before reporting error & abort.
-        timeout_error (bool): Report timeout as error (True by default)
+        url (Path): Stage to open
+        load (str): Load mode of the stage, the `loadMode` setting by default
+        timeout (float): Seconds to wait for `openedStageResult` before failing
+        wait_frames (int): How many frames to wait after the result (2 by default)
+
+    Returns:
+        The payload of `openedStageResult`.
     """
-    context = usd_context if usd_context else omni.usd.get_context()
-    stage_name = context.get_stage_url()
-
-    # wait for get_stage_loading_status() files to be loaded.
-    maxloops = timeout
-    while True:
-        _, files_loaded, total_files = context.get_stage_loading_status()
-        if files_loaded or total_files:  # pragma: no cover
-            await omni.kit.app.get_app().next_update_async()
-            maxloops -= 1
-            if maxloops == 0:
-                if timeout_error:
-                    carb.log_error(f"wait_stage_loading waiting for {files_loaded} vs {total_files} for {stage_name}")
-                break
-            continue
-        break
-
-    context.reset_renderer_accumulation()
-
-    frame_count = 0
-    while frame_count < wait_frames:
+    opened = asyncio.get_event_loop().create_future()
+
+    def on_opened(event: Event) -> None:
+        if not opened.done():
+            opened.set_result(dict(event.payload))
+
+    # Observe before the request: a stage that is already open is answered right away.
+    ed = get_eventdispatcher()
+    subscription = ed.observe_event(
+        observer_name="MessagingTest:openedStageResult",
+        event_name="openedStageResult",
+        on_event=on_opened,
+    )
+    payload = {"url": url.as_posix()}
+    if load:
+        payload["load"] = load
+    try:
+        ed.dispatch_event("openStageRequest", payload=payload)
+        result = await asyncio.wait_for(opened, timeout)
+    finally:
+        subscription = None
+
+    omni.usd.get_context().reset_renderer_accumulation()
+    for _ in range(wait_frames):
         await omni.kit.app.get_app().next_update_async()
-        frame_count += 1
-        continue
+    return result
 
 
 class MessagingTest(AsyncTestCase):
@@ -94,11 +106,443 @@ class MessagingTest(AsyncTestCase):
 
         # Send the openStageRequest event
         url = self._data_path / "testing.usd"
-        self._ed.dispatch_event("openStageRequest", payload={"url": url.as_posix()})
+        await open_stage(url)
+        self.assertTrue(all(outgoing.values()))
+
+    async def test_stage_loading_load_none(self):
+        """
+        Open a stage without payloads and load them afterwards
+        """
+
+        outgoing: Dict[str, bool] = {
+            "openedStageResult": False,      # the shell of the stage has opened
+            "payloadLoadingProgress": False, # deferred payloads finished loading
+            "loadPayloadsResponse": False,   # response to loadPayloadsRequest
+        }
+
+        def on_message_event(event: Event) -> None:
+            if event.event_name == "payloadLoadingProgress":
+                outgoing["payloadLoadingProgress"] = bool(event.payload["done"])
+            elif event.event_name == "loadPayloadsResponse":
+                outgoing["loadPayloadsResponse"] = event.payload["result"] == "success"
+            else:
+                outgoing[event.event_name] = True
+
+        subscriptions: List[int] = []
+        for event in outgoing.keys():
+            subscriptions.append(
+                self._ed.observe_event(
+                    observer_name=f"MessagingTest:{event}",
+                    event_name=event,
+                    on_event=on_message_event,
+                )
+            )
+            await self._app.next_update_async()
+
+        # Make sure the stage is opened again rather than reported as already open.
+        await omni.usd.get_context().new_stage_async()
+
+        url = self._data_path / "testing.usd"
+        await open_stage(url, load="none", wait_frames=300)
+
+        self._ed.dispatch_event("loadPayloadsRequest", payload={"paths": ["/World"]})
+        await self._app.next_update_async()
 
-        await wait_stage_loading(wait_frames=300)
         self.assertTrue(all(outgoing.values()))
 
+    async def test_stage_loading_timings(self):
+        """
+        Report the time to first frame, assets loaded and streaming idle of an open
+        """
+
+        # Make sure the stage is opened again rather than reported as already open.
+        await omni.usd.get_context().new_stage_async()
+
+        url = self._data_path / "testing.usd"
+        result = await open_stage(url)
+        self.assertEqual(result["result"], "success")
+        timings = result["timings"]
+        self.assertEqual(set(timings), {"first_frame_ms", "assets_loaded_ms", "streaming_idle_ms"})
+        self.assertGreaterEqual(timings["streaming_idle_ms"], timings["assets_loaded_ms"])
+
+        # Already open: answered right away, without timings.
+        result = await open_stage(url)
+        self.assertIsNone(result["timings"]["assets_loaded_ms"])
+
+    async def test_lod_policy(self):
+        """
+        Enable the LOD policy, change its distances and disable it again
+        """
+
+        responses: List[dict] = []
+
+        def on_message_event(event: Event) -> None:
+            responses.append(dict(event.payload))
+
+        subscription = self._ed.observe_event(
+            observer_name="MessagingTest:lodPolicyResponse",
+            event_name="lodPolicyResponse",
+            on_event=on_message_event,
+        )
+        await self._app.next_update_async()
+
+        self._ed.dispatch_event("setLodPolicyRequest", payload={"enabled": True, "distances": [5.0, 20.0]})
+        for _ in range(20):
+            await self._app.next_update_async()
+        self._ed.dispatch_event("setLodPolicyRequest", payload={"distances": [20.0, 5.0]})
+        await self._app.next_update_async()
+        self._ed.dispatch_event("setLodPolicyRequest", payload={"enabled": False})
+        await self._app.next_update_async()
+
+        self.assertEqual([response["result"] for response in responses], ["success", "error", "success"])
+        self.assertEqual(responses[1]["distances"], [5.0, 20.0])
+        self.assertFalse(responses[2]["enabled"])
+
+    async def test_lod_target_level(self):
+        """
+        Pick LOD levels around the distance thresholds, with hysteresis
+        """
+
+        manager = LodManager()
+        manager._distances = [15.0, 40.0]
+        # (distance, current level) -> level; thresholds move by 10% against the change.
+        cases = {
+            (41.0, 0): 1, (45.0, 0): 2, (16.0, 0): 0, (17.0, 0): 1,
+            (14.0, 1): 1, (13.0, 1): 0, (44.0, 1): 1, (44.1, 1): 2,
+            (35.0, 2): 1, (10.0, 2): 0,
+        }
+        try:
+            for (distance, level), expected in cases.items():
+                with self.subTest(distance=distance, level=level):
+                    self.assertEqual(manager._target_level(distance, level, 3), expected)
+            # Never coarser than the last variant.
+            self.assertEqual(manager._target_level(100.0, 0, 2), 1)
+        finally:
+            manager.on_shutdown()
+
+    async def test_lod_variant_switch(self):
+        """
+        Switch a far prim to its coarsest LOD and back when the policy is disabled
+        """
+
+        with tempfile.TemporaryDirectory() as directory:
+            url = Path(directory) / "lod.usda"
+            stage = Usd.Stage.CreateNew(str(url))
+            UsdGeom.SetStageMetersPerUnit(stage, 1.0)
+            prop = UsdGeom.Xform.Define(stage, "/World/Prop")
+            UsdGeom.XformCommonAPI(prop).SetTranslate((100000.0, 0.0, 0.0))
+            UsdGeom.Cube.Define(stage, "/World/Prop/Cube")
+            variant_set = prop.GetPrim().GetVariantSets().AddVariantSet("LOD")
+            for name in ("LOD0", "LOD1", "LOD2"):
+                variant_set.AddVariant(name)
+            variant_set.SetVariantSelection("LOD0")
+            stage.Save()
+            stage = None
+
+            await open_stage(url)
+            prim = omni.usd.get_context().get_stage().GetPrimAtPath("/World/Prop")
+            self._ed.dispatch_event("setLodPolicyRequest", payload={"enabled": True, "distances": [5.0, 20.0]})
+            for _ in range(20):
+                await self._app.next_update_async()
+            self.assertEqual(prim.GetVariantSet("LOD").GetVariantSelection(), "LOD2")
+
+            self._ed.dispatch_event("setLodPolicyRequest", payload={"enabled": False})
+            await self._app.next_update_async()
+            self.assertEqual(prim.GetVariantSet("LOD").GetVariantSelection(), "LOD0")
+
+            await omni.usd.get_context().new_stage_async()
+
+    async def test_spatial_query(self):
+        """
+        Query the spatial index of the test stage
+        """
+
+        responses: List[dict] = []
+
+        def on_message_event(event: Event) -> None:
+            responses.append(dict(event.payload))
+
+        subscription = self._ed.observe_event(
+            observer_name="MessagingTest:spatialQueryResponse",
+            event_name="spatialQueryResponse",
+            on_event=on_message_event,
+        )
+        await self._app.next_update_async()
+
+        url = self._data_path / "testing.usd"
+        await open_stage(url)
+
+        # The cube spans -50..50 and the sphere 0..100 on the y axis.
+        queries = [
+            {"type": "box", "min": [-10, -40, -10], "max": [10, -30, 10]},
+            {"type": "sphere", "center": [0, 90, 0], "radius": 5},
+            {"type": "ray", "origin": [0, 0, 500], "direction": [0, 0, -1]},
+            {"type": "nearest", "point": [0, -200, 0], "k": 1},
+            {"type": "cone"},
+        ]
+        for query in queries:
+            self._ed.dispatch_event("spatialQueryRequest", payload=query)
+            await self._app.next_update_async()
+
+        self.assertEqual([response["result"] for response in responses], ["success"] * 4 + ["error"])
+        self.assertEqual(list(responses[0]["paths"]), ["/World/Cube"])
+        self.assertEqual(list(responses[1]["paths"]), ["/World/Sphere"])
+        self.assertEqual(sorted(responses[2]["paths"]), ["/World/Cube", "/World/Sphere"])
+        self.assertEqual(list(responses[3]["paths"]), ["/World/Cube"])
+
+        # Hiding the cube drops it from the index, showing it again adds it back.
+        cube = UsdGeom.Imageable(omni.usd.get_context().get_stage().GetPrimAtPath("/World/Cube"))
+        cube.MakeInvisible()
+        self._ed.dispatch_event("spatialQueryRequest", payload=queries[0])
+        await self._app.next_update_async()
+        cube.MakeVisible()
+        self._ed.dispatch_event("spatialQueryRequest", payload=queries[0])
+        await self._app.next_update_async()
+        self.assertEqual(list(responses[5]["paths"]), [])
+        self.assertEqual(list(responses[6]["paths"]), ["/World/Cube"])
+
+    async def test_stage_statistics(self):
+        """
+        Request the statistics of the test stage
+        """
+
+        responses: List[dict] = []
+
+        def on_message_event(event: Event) -> None:
+            responses.append(dict(event.payload))
+
+        subscription = self._ed.observe_event(
+            observer_name="MessagingTest:stageStatisticsResponse",
+            event_name="stageStatisticsResponse",
+            on_event=on_message_event,
+        )
+        await self._app.next_update_async()
+
+        url = self._data_path / "testing.usd"
+        await open_stage(url)
+
+        self._ed.dispatch_event("stageStatisticsRequest", payload={"prim_path": "/World", "folded": "triangles"})
+        await self._app.next_update_async()
+        self._ed.dispatch_event("stageStatisticsRequest", payload={"prim_path": "/Missing"})
+        await self._app.next_update_async()
+
+        self.assertEqual([response["result"] for response in responses], ["success", "error"])
+        statistics = responses[0]["statistics"]
+        self.assertEqual(statistics["meshes"], 2)
+        self.assertGreater(statistics["triangles"], 0)
+        self.assertEqual(len(statistics["children"]), 2)
+        self.assertIn("World;Cube ", responses[0]["folded"])
+
+    async def test_get_children_pages(self):
+        """
+        Request the children of a prim one page at a time
+        """
+
+        responses: List[dict] = []
+
+        def on_message_event(event: Event) -> None:
+            responses.append(dict(event.payload))
+
+        subscription = self._ed.observe_event(
+            observer_name="MessagingTest:getChildrenResponse",
+            event_name="getChildrenResponse",
+            on_event=on_message_event,
+        )
+        await self._app.next_update_async()
+
+        url = self._data_path / "testing.usd"
+        await open_stage(url)
+
+        self._ed.dispatch_event("getChildrenRequest", payload={"prim_path": "/World", "offset": 0, "limit": 1})
+        await self._app.next_update_async()
+        self._ed.dispatch_event("getChildrenRequest", payload={"prim_path": "/World", "offset": 1, "limit": 1})
+        await self._app.next_update_async()
+
+        self.assertEqual([response["total"] for response in responses], [2, 2])
+        self.assertEqual([response["next_offset"] for response in responses], [1, -1])
+        paths = [child["path"] for response in responses for child in response["children"]]
+        self.assertEqual(sorted(paths), ["/World/Cube", "/World/Sphere"])
+
+    async def test_get_subtree(self):
+        """
+        Request two levels of the test stage in one response
+        """
+
+        responses: List[dict] = []
+
+        def on_message_event(event: Event) -> None:
+            responses.append(dict(event.payload))
+
+        subscription = self._ed.observe_event(
+            observer_name="MessagingTest:getSubtreeResponse",
+            event_name="getSubtreeResponse",
+            on_event=on_message_event,
+        )
+        await self._app.next_update_async()
+
+        url = self._data_path / "testing.usd"
+        await open_stage(url)
+
+        self._ed.dispatch_event("getSubtreeRequest", payload={"prim_path": "/", "depth": 2})
+        await self._app.next_update_async()
+        self._ed.dispatch_event("getSubtreeRequest", payload={"prim_path": "/", "depth": 2, "max_nodes": 1})
+        await self._app.next_update_async()
+
+        world = [child for child in responses[0]["children"] if child["path"] == "/World"][0]
+        self.assertEqual(sorted(child["path"] for child in world["children"]), ["/World/Cube", "/World/Sphere"])
+        self.assertFalse(responses[0]["truncated"])
+        self.assertTrue(responses[1]["truncated"])
+        # A prim with more children than max_nodes still gets the first ones.
+        self.assertEqual(len(responses[1]["children"]), 1)
+
+    async def test_find_prims(self):
+        """
+        Search the test stage by type, name and path pattern
+        """
+
+        responses: List[dict] = []
+
+        def on_message_event(event: Event) -> None:
+            responses.append(dict(event.payload))
+
+        subscription = self._ed.observe_event(
+            observer_name="MessagingTest:findPrimsResponse",
+            event_name="findPrimsResponse",
+            on_event=on_message_event,
+        )
+        await self._app.next_update_async()
+
+        url = self._data_path / "testing.usd"
+        await open_stage(url)
+
+        searches = [
+            {"types": ["Mesh"], "root": "/World", "limit": 1},
+            {"name": "sph"},
+            {"pattern": "/World/C*", "types": ["Gprim"]},
+            {"types": ["NotAPrimType"]},
+        ]
+        for search in searches:
+            self._ed.dispatch_event("findPrimsRequest", payload=search)
+            await self._app.next_update_async()
+
+        self.assertEqual([response["result"] for response in responses], ["success"] * 3 + ["error"])
+        self.assertEqual(responses[0]["total"], 2)
+        self.assertEqual(responses[0]["next_offset"], 1)
+        self.assertEqual([prim["path"] for prim in responses[1]["prims"]], ["/World/Sphere"])
+        self.assertEqual([prim["path"] for prim in responses[2]["prims"]], ["/World/Cube"])
+
+    async def test_selection_coalescing(self):
+        """
+        Selection changes of one frame are sent once, client requests are not echoed
+        """
+
+        broadcasts: List[dict] = []
+
+        def on_message_event(event: Event) -> None:
+            broadcasts.append(dict(event.payload))
+
+        subscription = self._ed.observe_event(
+            observer_name="MessagingTest:stageSelectionChanged",
+            event_name="stageSelectionChanged",
+            on_event=on_message_event,
+        )
+
+        url = self._data_path / "testing.usd"
+        await open_stage(url)
+        broadcasts.clear()
+
+        # A burst of local changes in one frame.
+        selection = omni.usd.get_context().get_selection()
+        selection.set_selected_prim_paths(["/World/Cube"], True)
+        selection.set_selected_prim_paths(["/World/Sphere"], True)
+        selection.set_selected_prim_paths(["/World/Cube", "/World/Sphere"], True)
+        for _ in range(3):
+            await self._app.next_update_async()
+
+        # A client request is not sent back.
+        self._ed.dispatch_event("selectPrimsRequest", payload={"paths": ["/World/Cube"], "request_id": "r1"})
+        for _ in range(3):
+            await self._app.next_update_async()
+
+        self.assertEqual(len(broadcasts), 1)
+        self.assertEqual(list(broadcasts[0]["prims"]), ["/World/Cube", "/World/Sphere"])
+
+    async def test_make_pickable_incremental(self):
+        """
+        Change the pickable prims incrementally and with patterns
+        """
+
+        responses: List[dict] = []
+
+        def on_message_event(event: Event) -> None:
+            responses.append(dict(event.payload))
+
+        subscription = self._ed.observe_event(
+            observer_name="MessagingTest:makePrimsPickableResponse",
+            event_name="makePrimsPickableResponse",
+            on_event=on_message_event,
+        )
+
+        url = self._data_path / "testing.usd"
+        await open_stage(url)
+
+        requests = [
+            {"paths": ["/World/Cube"]},
+            {"add": ["/World/S*"]},
+            {"remove": ["/World/Cube"]},
+            {},
+        ]
+        for request in requests:
+            self._ed.dispatch_event("makePrimsPickable", payload=request)
+            for _ in range(2):
+                await self._app.next_update_async()
+
+        self.assertEqual([response["result"] for response in responses], ["success"] * 4)
+        self.assertEqual([response["pickable"] for response in responses], [1, 2, 1, 1])
+        self.assertEqual([response["changed"] for response in responses], [1, 1, 1, 0])
+
+    async def test_camera_bookmarks(self):
+        """
+        Save a camera bookmark, move the camera and restore the bookmark
+        """
+
+        responses: List[dict] = []
+
+        def on_message_event(event: Event) -> None:
+            responses.append(dict(event.payload))
+
+        subscriptions = [
+            self._ed.observe_event(
+                observer_name=f"MessagingTest:{event}",
+                event_name=event,
+                on_event=on_message_event,
+            )
+            for event in ("saveCameraResponse", "restoreCameraResponse")
+        ]
+
+        url = self._data_path / "testing.usd"
+        await open_stage(url)
+
+        self._ed.dispatch_event("saveCameraRequest", payload={"name": "start"})
+        await self._app.next_update_async()
+
+        stage = omni.usd.get_context().get_stage()
+        camera = stage.GetPrimAtPath(get_active_viewport_camera_string())
+        focal_length = camera.GetAttribute("focalLength").Get()
+        # The viewport camera lives on the session layer.
+        with Usd.EditContext(stage, Usd.EditTarget(stage.GetSessionLayer())):
+            camera.GetAttribute("focalLength").Set(focal_length * 2.0)
+
+        self._ed.dispatch_event("restoreCameraRequest", payload={"name": "start"})
+        await self._app.next_update_async()
+        self._ed.dispatch_event("restoreCameraRequest", payload={"name": "missing"})
+        await self._app.next_update_async()
+
+        self.assertEqual([response["result"] for response in responses], ["success", "success", "error"])
+        self.assertEqual(list(responses[0]["bookmarks"]), ["start"])
+        self.assertEqual(responses[1]["changed"], 1)
+        self.assertEqual(camera.GetAttribute("focalLength").Get(), focal_length)
+
     async def test_stage_management_incoming(self):
         """
         Simulate incoming events of the stage management messaging system
@@ -140,10 +584,7 @@ class MessagingTest(AsyncTestCase):
 
         # Send the openStageRequest event
         url = self._data_path / "testing.usd"
-        self._ed.dispatch_event("openStageRequest", payload={"url": url.as_posix()})
-
-        # Wait for the stage to load
-        await wait_stage_loading(wait_frames=30)
+        await open_stage(url)
 
         # Get children of root
         self._ed.dispatch_event("getChildrenRequest", payload={"prim_path": "/World", "filters": []})
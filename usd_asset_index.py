@@ -0,0 +1,619 @@
+#!/usr/bin/env python3
+"""
+USD 資產索引 / USD asset inventory index
+
+Scans an asset root such as Factory_Lite/ in parallel and stores per-layer
+statistics in a SQLite database, so questions like "which SubUSD contains the
+heaviest meshes?" are answered by a query instead of opening files one by one.
+
+Per layer the index records:
+- prim counts by type (layer-local prim specs, nothing is composed)
+- mesh point and face counts (points / faceVertexCounts)
+- material bindings (material:binding targets)
+- sublayers, references and payloads
+- on-disk size and the size of the uncompressed array data (points, normals,
+  indices, primvars, time samples), a proxy for the in-memory size
+
+Usage:
+    python usd_asset_index.py index Factory_Lite [-j N] [--force]
+    python usd_asset_index.py top [--by points|faces|prims|meshes|size|memory|references|payloads] [-n 10]
+    python usd_asset_index.py meshes [-n 10]
+    python usd_asset_index.py types
+    python usd_asset_index.py materials
+    python usd_asset_index.py show Factory_Lite/SubUSDs/RoofPiece.usd
+    python usd_asset_index.py sql "SELECT path, points FROM layers ORDER BY points DESC LIMIT 5"
+
+All commands accept --db PATH (default: usd_asset_index.sqlite) and the query
+commands accept --json.
+
+Re-indexing is incremental: files whose size and mtime are unchanged are not
+opened at all, files with a new mtime but the same sha256 only get their
+mtime updated, and layers that disappeared from the root are removed.
+
+Indexing requires the USD Python API (pxr); querying only needs Python.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from convert_usd_to_usda import collect_inputs, file_fingerprint, print_helpful_message
+
+DEFAULT_DB = "usd_asset_index.sqlite"
+USD_PATTERNS = ("*.usd", "*.usda", "*.usdc")
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE layers (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    indexed_at REAL NOT NULL,
+    seconds REAL NOT NULL,
+    prims INTEGER NOT NULL DEFAULT 0,
+    meshes INTEGER NOT NULL DEFAULT 0,
+    points INTEGER NOT NULL DEFAULT 0,
+    faces INTEGER NOT NULL DEFAULT 0,
+    memory INTEGER NOT NULL DEFAULT 0,
+    sublayers INTEGER NOT NULL DEFAULT 0,
+    references_ INTEGER NOT NULL DEFAULT 0,
+    payloads INTEGER NOT NULL DEFAULT 0,
+    error TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE prim_types (
+    layer_id INTEGER NOT NULL REFERENCES layers(id) ON DELETE CASCADE,
+    type_name TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (layer_id, type_name)
+);
+CREATE TABLE meshes (
+    layer_id INTEGER NOT NULL REFERENCES layers(id) ON DELETE CASCADE,
+    prim_path TEXT NOT NULL,
+    points INTEGER NOT NULL,
+    faces INTEGER NOT NULL,
+    memory INTEGER NOT NULL,
+    PRIMARY KEY (layer_id, prim_path)
+);
+CREATE TABLE bindings (
+    layer_id INTEGER NOT NULL REFERENCES layers(id) ON DELETE CASCADE,
+    prim_path TEXT NOT NULL,
+    material TEXT NOT NULL
+);
+CREATE TABLE arcs (
+    layer_id INTEGER NOT NULL REFERENCES layers(id) ON DELETE CASCADE,
+    prim_path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    asset_path TEXT NOT NULL,
+    resolved TEXT NOT NULL
+);
+CREATE INDEX meshes_points ON meshes(points);
+CREATE INDEX bindings_material ON bindings(material);
+CREATE INDEX arcs_resolved ON arcs(resolved);
+"""
+
+# top 指令可用的排序欄位 -> layers 欄位
+RANK_COLUMNS = {
+    "points": "points",
+    "faces": "faces",
+    "prims": "prims",
+    "meshes": "meshes",
+    "size": "size",
+    "memory": "memory",
+    "references": "references_",
+    "payloads": "payloads",
+}
+
+
+def _array_bytes(value):
+    """回傳陣列值（Vt 陣列）的資料大小，非陣列回傳 0"""
+    try:
+        return memoryview(value).nbytes
+    except TypeError:
+        return 0
+
+
+def _array_length(value):
+    try:
+        return len(value) if value is not None else 0
+    except TypeError:
+        return 0
+
+
+def scan_layer(path):
+    """
+    開啟單一圖層並統計其 prim、mesh、材質綁定與組合弧（不組合場景）
+
+    Returns:
+        dict: prims, prim_types, meshes, bindings, arcs, memory 等統計
+
+    Raises:
+        ImportError: 沒有 pxr 模組時
+        ValueError: 無法開啟圖層時
+    """
+    from pxr import Sdf
+
+    layer = Sdf.Layer.FindOrOpen(path)
+    if not layer:
+        raise ValueError(f"無法開啟 USD 檔案 {path}")
+
+    prim_types = {}
+    meshes = []
+    bindings = []
+    arcs = [{"prim_path": "/", "kind": "sublayer", "asset_path": sublayer,
+             "resolved": _resolve(layer, sublayer)} for sublayer in layer.subLayerPaths]
+    memory = 0
+
+    def visit(spec_path):
+        nonlocal memory
+        spec = layer.GetObjectAtPath(spec_path)
+        if isinstance(spec, Sdf.AttributeSpec):
+            memory += _array_bytes(spec.default)
+            for time_code in layer.ListTimeSamplesForPath(spec_path):
+                memory += _array_bytes(layer.QueryTimeSample(spec_path, time_code))
+            return
+        if not isinstance(spec, Sdf.PrimSpec):
+            return
+
+        type_name = spec.typeName or "(untyped)"
+        prim_types[type_name] = prim_types.get(type_name, 0) + 1
+        prim_path = str(spec_path)
+
+        for kind, list_op in (("reference", spec.referenceList), ("payload", spec.payloadList)):
+            for item in list_op.GetAddedOrExplicitItems():
+                # 只記錄外部檔案，同一圖層內的 internal reference 沒有 assetPath
+                if item.assetPath:
+                    arcs.append({"prim_path": prim_path, "kind": kind,
+                                 "asset_path": item.assetPath,
+                                 "resolved": _resolve(layer, item.assetPath)})
+
+        binding = layer.GetRelationshipAtPath(spec_path.AppendProperty("material:binding"))
+        if binding:
+            for target in binding.targetPathList.GetAddedOrExplicitItems():
+                bindings.append({"prim_path": prim_path, "material": str(target)})
+
+        if type_name == "Mesh":
+            mesh_memory = 0
+            counts = {}
+            for name in ("points", "faceVertexCounts"):
+                attr = layer.GetAttributeAtPath(spec_path.AppendProperty(name))
+                counts[name] = _array_length(attr.default) if attr else 0
+            for prop in spec.attributes:
+                mesh_memory += _array_bytes(prop.default)
+            meshes.append({"prim_path": prim_path, "points": counts["points"],
+                           "faces": counts["faceVertexCounts"], "memory": mesh_memory})
+
+    layer.Traverse(Sdf.Path.absoluteRootPath, visit)
+    return {
+        "prims": sum(prim_types.values()),
+        "prim_types": prim_types,
+        "meshes": meshes,
+        "bindings": bindings,
+        "arcs": arcs,
+        "memory": memory,
+    }
+
+
+def _resolve(layer, asset_path):
+    """把相對資產路徑解析為絕對路徑；無法解析時回傳原始路徑"""
+    try:
+        resolved = layer.ComputeAbsolutePath(asset_path)
+    except Exception:  # nosec B110 - 無法解析的資產路徑保持原樣
+        return asset_path
+    # omniverse:// 等 URL 不做路徑正規化
+    return resolved if "://" in resolved else os.path.normpath(resolved)
+
+
+def _index_job(path, known_sha256=None):
+    """
+    索引工作（在子行程中執行）；內容雜湊與已知值相同時不開啟圖層
+
+    Returns:
+        dict: path、fingerprint、unchanged，以及 scan_layer 的統計或 error
+    """
+    start = time.perf_counter()
+    result = {"path": path, "fingerprint": file_fingerprint(path), "unchanged": False, "error": ""}
+    if known_sha256 and result["fingerprint"]["sha256"] == known_sha256:
+        result["unchanged"] = True
+        return result
+    try:
+        result["stats"] = scan_layer(path)
+    except Exception as e:
+        result["error"] = str(e) or e.__class__.__name__
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+class AssetIndex:
+    """SQLite 資產索引"""
+
+    def __init__(self, db_path=DEFAULT_DB, readonly=False):
+        self.db_path = db_path
+        if readonly:
+            if not os.path.exists(db_path):
+                raise FileNotFoundError(f"找不到索引 {db_path}（請先執行 index）")
+            uri = f"file:{os.path.abspath(db_path)}?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True)
+        else:
+            self.conn = sqlite3.connect(db_path)
+            self._ensure_schema()
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+
+    def _ensure_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version == SCHEMA_VERSION:
+            return
+        # 結構版本不同時重建索引（索引內容都可以重新產生）
+        for table in ("arcs", "bindings", "meshes", "prim_types", "layers"):
+            self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+        self.conn.executescript(SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def known_layers(self):
+        """回傳 path -> (id, size, mtime_ns, sha256)"""
+        return {row["path"]: (row["id"], row["size"], row["mtime_ns"], row["sha256"])
+                for row in self.conn.execute("SELECT id, path, size, mtime_ns, sha256 FROM layers")}
+
+    def store(self, result):
+        """寫入（或取代）一個圖層的索引結果"""
+        fingerprint = result["fingerprint"]
+        stats = result.get("stats") or {"prims": 0, "prim_types": {}, "meshes": [],
+                                        "bindings": [], "arcs": [], "memory": 0}
+        arcs = stats["arcs"]
+        self.conn.execute("DELETE FROM layers WHERE path = ?", (result["path"],))
+        cursor = self.conn.execute(
+            "INSERT INTO layers (path, size, mtime_ns, sha256, indexed_at, seconds, prims, meshes,"
+            " points, faces, memory, sublayers, references_, payloads, error)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (result["path"], fingerprint["size"], fingerprint["mtime_ns"], fingerprint["sha256"],
+             time.time(), result.get("seconds", 0.0), stats["prims"], len(stats["meshes"]),
+             sum(mesh["points"] for mesh in stats["meshes"]),
+             sum(mesh["faces"] for mesh in stats["meshes"]), stats["memory"],
+             sum(1 for arc in arcs if arc["kind"] == "sublayer"),
+             sum(1 for arc in arcs if arc["kind"] == "reference"),
+             sum(1 for arc in arcs if arc["kind"] == "payload"),
+             result["error"]),
+        )
+        layer_id = cursor.lastrowid
+        self.conn.executemany(
+            "INSERT INTO prim_types (layer_id, type_name, count) VALUES (?, ?, ?)",
+            [(layer_id, name, count) for name, count in stats["prim_types"].items()])
+        self.conn.executemany(
+            "INSERT INTO meshes (layer_id, prim_path, points, faces, memory) VALUES (?, ?, ?, ?, ?)",
+            [(layer_id, m["prim_path"], m["points"], m["faces"], m["memory"])
+             for m in stats["meshes"]])
+        self.conn.executemany(
+            "INSERT INTO bindings (layer_id, prim_path, material) VALUES (?, ?, ?)",
+            [(layer_id, b["prim_path"], b["material"]) for b in stats["bindings"]])
+        self.conn.executemany(
+            "INSERT INTO arcs (layer_id, prim_path, kind, asset_path, resolved) VALUES (?, ?, ?, ?, ?)",
+            [(layer_id, a["prim_path"], a["kind"], a["asset_path"], a["resolved"]) for a in arcs])
+
+    def touch(self, path, mtime_ns):
+        """內容未變更、只有修改時間改變時更新 mtime"""
+        self.conn.execute("UPDATE layers SET mtime_ns = ? WHERE path = ?", (mtime_ns, path))
+
+    def remove(self, paths):
+        self.conn.executemany("DELETE FROM layers WHERE path = ?", [(path,) for path in paths])
+
+    def commit(self):
+        self.conn.commit()
+
+    def query(self, sql, params=()):
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+
+def _under(path, roots):
+    return any(path == root or path.startswith(root + os.sep) for root in roots)
+
+
+def index_roots(index, roots, jobs=None, force=False):
+    """
+    增量索引一或多個資產根目錄
+
+    Returns:
+        dict: files, indexed, touched, unchanged, removed, failed, seconds
+    """
+    start = time.perf_counter()
+    abs_roots = [os.path.normpath(os.path.abspath(root)) for root in roots]
+    files = []
+    for pattern in USD_PATTERNS:
+        files.extend(collect_inputs(roots, pattern))
+    files = sorted({os.path.normpath(os.path.abspath(path)) for path in files})
+
+    known = index.known_layers()
+    summary = {"files": len(files), "indexed": 0, "touched": 0, "unchanged": 0,
+               "removed": 0, "failed": 0}
+
+    # 大小與修改時間都未變的檔案完全不開啟，也不重新計算雜湊
+    tasks = []
+    for path in files:
+        row = known.get(path)
+        stat = os.stat(path)
+        if row and not force and row[1] == stat.st_size and row[2] == stat.st_mtime_ns:
+            summary["unchanged"] += 1
+        else:
+            tasks.append((path, None if force or not row else row[3]))
+
+    current = set(files)
+    removed = [path for path in known if _under(path, abs_roots) and path not in current]
+    index.remove(removed)
+    summary["removed"] = len(removed)
+
+    def record(result):
+        if result["unchanged"]:
+            index.touch(result["path"], result["fingerprint"]["mtime_ns"])
+            summary["touched"] += 1
+            return
+        index.store(result)
+        summary["indexed"] += 1
+        if result["error"]:
+            summary["failed"] += 1
+            print(f"  ✗ {result['path']}: {result['error']}")
+
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(tasks) or 1))
+    if jobs == 1:
+        for task in tasks:
+            record(_index_job(*task))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for result in pool.map(_index_job, *zip(*tasks)) if tasks else []:
+                record(result)
+    index.commit()
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def _display_path(path):
+    """在目前目錄之下的路徑以相對路徑顯示"""
+    relative = os.path.relpath(path)
+    return path if relative.startswith("..") else relative
+
+
+def _format_bytes(size):
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def _print_table(rows, columns):
+    """以固定寬度輸出查詢結果；columns 為 (標題, 欄位, 格式函式) 清單"""
+    if not rows:
+        print("(沒有資料 / no rows)")
+        return
+    cells = [[fmt(row[key]) if fmt else str(row[key]) for _, key, fmt in columns] for row in rows]
+    widths = [max(len(title), *(len(line[i]) for line in cells))
+              for i, (title, _, _) in enumerate(columns)]
+    print("  ".join(title.ljust(width) for (title, _, _), width in zip(columns, widths)))
+    print("  ".join("-" * width for width in widths))
+    for line in cells:
+        print("  ".join(cell.ljust(width) if i == 0 else cell.rjust(width)
+                        for i, (cell, width) in enumerate(zip(line, widths))))
+
+
+def _count(value):
+    return f"{value:,d}"
+
+
+def cmd_index(args):
+    try:
+        import pxr  # noqa: F401 - 只檢查是否可用，實際在工作行程中匯入
+    except ImportError:
+        print_helpful_message()
+        return 1
+
+    index = AssetIndex(args.db)
+    try:
+        summary = index_roots(index, args.roots, args.jobs, args.force)
+    finally:
+        index.close()
+
+    print("=" * 70)
+    print("資產索引 / Asset Index")
+    print("=" * 70)
+    print(f"  索引檔 / Database:     {args.db}")
+    print(f"  檔案 / Files:          {summary['files']}")
+    print(f"  已索引 / Indexed:      {summary['indexed']}")
+    print(f"  內容未變 / Same hash:  {summary['touched']}")
+    print(f"  未變更 / Unchanged:    {summary['unchanged']}")
+    print(f"  已移除 / Removed:      {summary['removed']}")
+    print(f"  失敗 / Failed:         {summary['failed']}")
+    print(f"  耗時 / Elapsed:        {summary['seconds']:.2f}s")
+    print("=" * 70)
+    return 1 if summary["failed"] else 0
+
+
+def _output(args, rows, columns):
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        _print_table(rows, columns)
+
+
+def cmd_top(args):
+    column = RANK_COLUMNS[args.by]
+    rows = args.index.query(
+        f"SELECT path, size, memory, prims, meshes, points, faces, references_ AS refs, payloads"
+        f" FROM layers ORDER BY {column} DESC, path LIMIT ?", (args.limit,))
+    for row in rows:
+        row["path"] = _display_path(row["path"])
+    _output(args, rows, [
+        ("Layer", "path", None), ("Size", "size", _format_bytes), ("Arrays", "memory", _format_bytes),
+        ("Prims", "prims", _count), ("Meshes", "meshes", _count), ("Points", "points", _count),
+        ("Faces", "faces", _count), ("Refs", "refs", _count), ("Payloads", "payloads", _count),
+    ])
+
+
+def cmd_meshes(args):
+    rows = args.index.query(
+        "SELECT layers.path AS layer, meshes.prim_path, meshes.points, meshes.faces, meshes.memory"
+        " FROM meshes JOIN layers ON layers.id = meshes.layer_id"
+        " ORDER BY meshes.points DESC, meshes.faces DESC LIMIT ?", (args.limit,))
+    for row in rows:
+        row["layer"] = _display_path(row["layer"])
+    _output(args, rows, [
+        ("Layer", "layer", None), ("Prim", "prim_path", None), ("Points", "points", _count),
+        ("Faces", "faces", _count), ("Arrays", "memory", _format_bytes),
+    ])
+
+
+def cmd_types(args):
+    rows = args.index.query(
+        "SELECT type_name, SUM(count) AS prims, COUNT(*) AS layers FROM prim_types"
+        " GROUP BY type_name ORDER BY prims DESC, type_name")
+    _output(args, rows, [("Type", "type_name", None), ("Prims", "prims", _count),
+                         ("Layers", "layers", _count)])
+
+
+def cmd_materials(args):
+    rows = args.index.query(
+        "SELECT material, COUNT(*) AS bindings, COUNT(DISTINCT layer_id) AS layers FROM bindings"
+        " GROUP BY material ORDER BY bindings DESC, material LIMIT ?", (args.limit,))
+    _output(args, rows, [("Material", "material", None), ("Bindings", "bindings", _count),
+                         ("Layers", "layers", _count)])
+
+
+def cmd_show(args):
+    path = os.path.normpath(os.path.abspath(args.layer))
+    layers = args.index.query("SELECT * FROM layers WHERE path = ?", (path,))
+    if not layers:
+        print(f"✗ 索引中沒有此圖層 / Not in index: {args.layer}")
+        return 1
+    layer = layers[0]
+    details = {
+        "layer": layer,
+        "prim_types": args.index.query(
+            "SELECT type_name, count FROM prim_types WHERE layer_id = ? ORDER BY count DESC",
+            (layer["id"],)),
+        "meshes": args.index.query(
+            "SELECT prim_path, points, faces, memory FROM meshes WHERE layer_id = ?"
+            " ORDER BY points DESC", (layer["id"],)),
+        "bindings": args.index.query(
+            "SELECT prim_path, material FROM bindings WHERE layer_id = ? ORDER BY prim_path",
+            (layer["id"],)),
+        "arcs": args.index.query(
+            "SELECT prim_path, kind, asset_path FROM arcs WHERE layer_id = ? ORDER BY kind, prim_path",
+            (layer["id"],)),
+        "referenced_by": [row["path"] for row in args.index.query(
+            "SELECT DISTINCT layers.path FROM arcs JOIN layers ON layers.id = arcs.layer_id"
+            " WHERE arcs.resolved = ? ORDER BY layers.path", (path,))],
+    }
+    if args.json:
+        print(json.dumps(details, indent=2))
+        return 0
+
+    print(f"{_display_path(layer['path'])}")
+    print(f"  大小 / Size: {_format_bytes(layer['size'])} on disk, "
+          f"{_format_bytes(layer['memory'])} of array data")
+    print(f"  Prims: {layer['prims']:,d}, meshes: {layer['meshes']:,d}, "
+          f"points: {layer['points']:,d}, faces: {layer['faces']:,d}")
+    if layer["error"]:
+        print(f"  ✗ {layer['error']}")
+    for title, key, columns in (
+        ("Prim 類型 / Prim types", "prim_types", [("Type", "type_name", None), ("Count", "count", _count)]),
+        ("Mesh", "meshes", [("Prim", "prim_path", None), ("Points", "points", _count),
+                            ("Faces", "faces", _count), ("Arrays", "memory", _format_bytes)]),
+        ("材質綁定 / Material bindings", "bindings", [("Prim", "prim_path", None),
+                                                     ("Material", "material", None)]),
+        ("組合弧 / Composition arcs", "arcs", [("Prim", "prim_path", None), ("Kind", "kind", None),
+                                              ("Asset", "asset_path", None)]),
+    ):
+        if details[key]:
+            print()
+            print(title)
+            _print_table(details[key], columns)
+    if details["referenced_by"]:
+        print()
+        print("被引用於 / Referenced by")
+        for referrer in details["referenced_by"]:
+            print(f"  {_display_path(referrer)}")
+    return 0
+
+
+def cmd_sql(args):
+    try:
+        rows = args.index.query(args.query)
+    except sqlite3.Error as e:
+        print(f"✗ SQL 錯誤: {e}")
+        return 1
+    if args.json or not rows:
+        print(json.dumps(rows, indent=2))
+    else:
+        _print_table(rows, [(key, key, None) for key in rows[0]])
+    return 0
+
+
+def parse_args(argv=None):
+    """解析命令列參數"""
+    parser = argparse.ArgumentParser(
+        description="Index USD layers (prims, meshes, materials, arcs) into SQLite and query them.",
+    )
+    parser.add_argument("--db", default=DEFAULT_DB, help=f"index database (default: {DEFAULT_DB})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index = commands.add_parser("index", help="(re-)index asset roots incrementally")
+    index.add_argument("roots", nargs="+", help="asset root directories, files or glob patterns")
+    index.add_argument("-j", "--jobs", type=int, default=None,
+                       help="number of worker processes (default: number of CPU cores)")
+    index.add_argument("--force", action="store_true", help="re-scan every layer")
+    index.set_defaults(handler=cmd_index)
+
+    query = argparse.ArgumentParser(add_help=False)
+    query.add_argument("--json", action="store_true", help="print rows as JSON")
+
+    top = commands.add_parser("top", parents=[query], help="rank layers")
+    top.add_argument("--by", choices=sorted(RANK_COLUMNS), default="points")
+    top.add_argument("-n", "--limit", type=int, default=10)
+    top.set_defaults(handler=cmd_top)
+
+    meshes = commands.add_parser("meshes", parents=[query], help="heaviest meshes across layers")
+    meshes.add_argument("-n", "--limit", type=int, default=10)
+    meshes.set_defaults(handler=cmd_meshes)
+
+    types = commands.add_parser("types", parents=[query], help="prim counts by type")
+    types.set_defaults(handler=cmd_types)
+
+    materials = commands.add_parser("materials", parents=[query], help="most bound materials")
+    materials.add_argument("-n", "--limit", type=int, default=20)
+    materials.set_defaults(handler=cmd_materials)
+
+    show = commands.add_parser("show", parents=[query], help="details of one layer")
+    show.add_argument("layer")
+    show.set_defaults(handler=cmd_show)
+
+    sql = commands.add_parser("sql", parents=[query], help="run a read-only SQL query")
+    sql.add_argument("query")
+    sql.set_defaults(handler=cmd_sql)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "index":
+        return cmd_index(args)
+
+    try:
+        args.index = AssetIndex(args.db, readonly=True)
+    except (FileNotFoundError, sqlite3.Error) as e:
+        print(f"✗ 錯誤: {e}")
+        return 1
+    try:
+        return args.handler(args) or 0
+    finally:
+        args.index.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
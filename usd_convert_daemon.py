@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+常駐轉換服務 / Warm USD conversion daemon
+
+Keeps a pool of converter processes with pxr imported and the USD plugins
+registered, and accepts convert/verify jobs over a local socket. A
+convert_usd_to_usda.py run that finds the daemon only sends the job
+descriptions, so the per-file cost drops to the layer I/O instead of
+interpreter startup + pxr import + plugin load.
+
+Usage:
+    python usd_convert_daemon.py serve [-j N] [--address ADDR]
+    python usd_convert_daemon.py status [--address ADDR]
+    python usd_convert_daemon.py stop [--address ADDR]
+
+Address: a Unix domain socket path (default
+$XDG_RUNTIME_DIR/usd_convert_daemon-<uid>.sock, or the temp directory), or
+HOST:PORT for TCP (default 127.0.0.1:8765 where Unix sockets are unavailable).
+Override the default with $USD_CONVERT_DAEMON. The Unix socket is created with
+mode 0600; TCP is meant for localhost only, since every connected client can
+make the daemon read and write files as the daemon's user.
+
+Protocol: one JSON object per line, one response line per request.
+    {"op": "ping"}
+        -> {"ok": true, "pid": ..., "workers": 4, "served": 120, "uptime": 3600.0}
+    {"op": "convert", "cwd": "/data", "input_path": "a.usd", "output_path": "a.usda",
+     "flatten": false, "asset_map": null, "verify": true}
+        -> {"ok": true, "result": {<convert_usd_to_usda._convert_job result>}}
+    {"op": "shutdown"}
+        -> {"ok": true}
+Relative paths are resolved against "cwd". Errors of the conversion itself are
+reported in "result" ("ok": false there); "ok": false at the top level means
+the request could not be run at all.
+"""
+
+import argparse
+import concurrent.futures
+import inspect
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import convert_usd_to_usda
+from convert_usd_to_usda import ConversionError, _convert_job
+
+ADDRESS_ENV_VAR = "USD_CONVERT_DAEMON"
+DEFAULT_TCP_ADDRESS = "127.0.0.1:8765"
+# 偵測服務是否存在時的連線逾時（秒）；找不到服務時用戶端會立即改用本機轉換
+CONNECT_TIMEOUT = 0.5
+
+# 可透過 socket 呼叫的工作函式
+OPERATIONS = {"convert": _convert_job}
+
+
+def default_address():
+    """回傳預設的服務位址（Unix socket 路徑或 HOST:PORT）"""
+    address = os.environ.get(ADDRESS_ENV_VAR)
+    if address:
+        return address
+    if not hasattr(socket, "AF_UNIX") or sys.platform == "win32":
+        return DEFAULT_TCP_ADDRESS
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, f"usd_convert_daemon-{os.getuid()}.sock")
+
+
+def parse_address(address):
+    """
+    解析服務位址
+
+    Returns:
+        tuple: (socket family, 位址)；HOST:PORT 為 TCP，其餘視為 Unix socket 路徑
+    """
+    host, sep, port = address.rpartition(":")
+    if sep and host and port.isdigit():
+        return socket.AF_INET, (host, int(port))
+    return socket.AF_UNIX, address
+
+
+def request(address, payload, timeout=None):
+    """
+    送出一個請求並等待回應
+
+    Args:
+        timeout: 連線逾時秒數；連線後等待回應不設逾時（轉換可能很久）
+
+    Raises:
+        OSError: 無法連線或連線中斷時
+        ValueError: 回應不是合法的 JSON 時
+    """
+    family, target = parse_address(address)
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(target)
+        sock.settimeout(None)
+        sock.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+        with sock.makefile("r", encoding="utf-8") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError(f"服務關閉了連線 / daemon closed the connection ({address})")
+    return json.loads(line)
+
+
+def _warm_worker():
+    """工作行程的初始化：先匯入 pxr 並載入檔案格式外掛"""
+    convert_usd_to_usda.load_pxr()
+    from pxr import Plug, Sdf
+    Plug.Registry().GetAllPlugins()
+    for extension in ("usd", "usda", "usdc"):
+        Sdf.FileFormat.FindByExtension(extension)
+
+
+def _worker_pid():
+    return os.getpid()
+
+
+def _run_operation(op, cwd, kwargs):
+    """在工作行程中執行一個工作；每個工作行程一次只執行一個工作，因此可以切換目錄"""
+    os.chdir(cwd)
+    return OPERATIONS[op](**kwargs)
+
+
+class _ReusableTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+
+
+class ConversionDaemon:
+    """持有暖機的工作行程池，並處理 socket 請求"""
+
+    def __init__(self, address=None, workers=None):
+        self.address = address or default_address()
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.served = 0
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._pool = None
+        self._server = None
+
+    def _start_pool(self):
+        """建立工作行程池，並等待所有工作行程完成暖機"""
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        # 行程池會延遲建立工作行程，送出與工作行程數相同的工作讓它們全部啟動並完成初始化
+        for future in [pool.submit(_worker_pid) for _ in range(self.workers)]:
+            future.result()
+        self._pool = pool
+
+    def handle(self, payload):
+        """處理一個請求，回傳回應 dict"""
+        op = payload.get("op")
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid(), "address": self.address,
+                    "workers": self.workers, "served": self.served,
+                    "uptime": time.time() - self.started}
+        if op == "shutdown":
+            # 必須在其他執行緒呼叫，shutdown() 會等待 serve_forever 結束
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+            return {"ok": True}
+        if op not in OPERATIONS:
+            return {"ok": False, "error": f"unknown op: {op!r}"}
+
+        kwargs = {key: value for key, value in payload.items() if key not in ("op", "cwd")}
+        try:
+            inspect.signature(OPERATIONS[op]).bind(**kwargs)
+        except TypeError as e:
+            return {"ok": False, "error": f"invalid arguments for {op}: {e}"}
+
+        cwd = payload.get("cwd") or os.getcwd()
+        pool = self._pool
+        try:
+            result = pool.submit(_run_operation, op, cwd, kwargs).result()
+        except BrokenProcessPool:
+            # 工作行程異常結束（例如 pxr 當機），重建行程池讓後續工作可以繼續；
+            # 同時失敗的其他請求不會重複重建
+            with self._lock:
+                if self._pool is pool:
+                    pool.shutdown(wait=False)
+                    self._start_pool()
+            return {"ok": False, "error": "worker process crashed, pool restarted"}
+        with self._lock:
+            self.served += 1
+        return {"ok": True, "result": result}
+
+    def serve_forever(self):
+        """啟動行程池並開始接受連線，直到收到 shutdown 請求"""
+        family, target = parse_address(self.address)
+        if family == socket.AF_UNIX:
+            if os.path.exists(target):
+                try:
+                    request(self.address, {"op": "ping"}, CONNECT_TIMEOUT)
+                except (OSError, ValueError):
+                    os.remove(target)  # 上次未正常結束留下的 socket 檔
+                else:
+                    raise ConversionError(f"服務已在執行 / daemon already running at {target}")
+            server_class = socketserver.ThreadingUnixStreamServer
+        else:
+            server_class = _ReusableTCPServer
+
+        print(f"暖機 {self.workers} 個工作行程 / Warming up {self.workers} worker(s)...")
+        start = time.perf_counter()
+        self._start_pool()
+        print(f"✓ 工作行程已就緒 / Workers ready in {time.perf_counter() - start:.2f}s")
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        payload = json.loads(line)
+                        if not isinstance(payload, dict):
+                            raise ValueError("request must be a JSON object")
+                    except ValueError as e:
+                        response = {"ok": False, "error": f"invalid request: {e}"}
+                    else:
+                        response = daemon.handle(payload)
+                    self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+
+        old_umask = os.umask(0o177) if family == socket.AF_UNIX else None
+        try:
+            self._server = server_class(target, Handler)
+        finally:
+            if old_umask is not None:
+                os.umask(old_umask)
+        self._server.daemon_threads = True
+
+        print(f"✓ 監聽中 / Listening on {self.address}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            self._pool.shutdown()
+            if family == socket.AF_UNIX and os.path.exists(target):
+                os.remove(target)
+            print(f"服務已停止 / Daemon stopped after {self.served} job(s)")
+
+
+class DaemonExecutor(concurrent.futures.Executor):
+    """
+    把 _convert_job 交給常駐服務執行的 Executor
+
+    可直接取代 convert_batch 使用的 ProcessPoolExecutor；每個工作使用一條連線，
+    同時進行的請求數等於服務的工作行程數。
+    """
+
+    def __init__(self, address, workers=1):
+        self.address = address
+        self.workers = max(1, workers)
+        self._threads = ThreadPoolExecutor(max_workers=self.workers)
+
+    def submit(self, fn, *args, **kwargs):
+        # 以名稱比對：以腳本執行時 __main__._convert_job 與模組中的是不同物件
+        ops = [op for op, function in OPERATIONS.items()
+               if getattr(fn, "__name__", None) == function.__name__]
+        if not ops:
+            raise ValueError(f"{getattr(fn, '__name__', fn)} cannot run on the conversion daemon")
+        arguments = inspect.signature(fn).bind(*args, **kwargs)
+        arguments.apply_defaults()
+        payload = {"op": ops[0], "cwd": os.getcwd(), **arguments.arguments}
+        return self._threads.submit(self._call, payload)
+
+    def _call(self, payload):
+        try:
+            response = request(self.address, payload)
+        except (OSError, ValueError) as e:
+            response = {"ok": False, "error": f"daemon request failed: {e}"}
+        if response.get("ok"):
+            return response["result"]
+        # 服務無法執行此工作時，回報為單一檔案的失敗，不中斷整個批次
+        input_path = payload.get("input_path")
+        return {
+            "input": input_path,
+            "output": payload.get("output_path"),
+            "ok": False,
+            "error": response.get("error", "daemon error"),
+            "bytes": os.path.getsize(input_path) if input_path and os.path.isfile(input_path) else 0,
+            "dependencies": [],
+            "mismatches": [],
+            "seconds": 0.0,
+            "peak_rss": 0,
+        }
+
+    def shutdown(self, wait=True, **kwargs):
+        self._threads.shutdown(wait=wait)
+
+
+def connect(address=None, timeout=CONNECT_TIMEOUT):
+    """
+    連線到常駐轉換服務
+
+    Returns:
+        DaemonExecutor，或找不到服務時回傳 None（呼叫端應改用本機轉換）
+    """
+    address = address or default_address()
+    try:
+        info = request(address, {"op": "ping"}, timeout)
+    except (OSError, ValueError):
+        return None
+    if not info.get("ok"):
+        return None
+    return DaemonExecutor(address, info.get("workers", 1))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Warm USD conversion daemon for convert_usd_to_usda.py.",
+    )
+    parser.add_argument("command", choices=("serve", "status", "stop"))
+    parser.add_argument(
+        "--address",
+        help=f"Unix socket path or HOST:PORT (default: ${ADDRESS_ENV_VAR} or {default_address()})",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None,
+        help="number of warm converter processes (default: number of CPU cores)",
+    )
+    args = parser.parse_args(argv)
+    address = args.address or default_address()
+
+    if args.command == "serve":
+        try:
+            convert_usd_to_usda.load_pxr()
+        except ImportError:
+            convert_usd_to_usda.print_helpful_message()
+            return 1
+        try:
+            ConversionDaemon(address, args.jobs).serve_forever()
+        except ConversionError as e:
+            print(f"✗ 錯誤: {e}")
+            return 1
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    try:
+        response = request(address, {"op": "ping" if args.command == "status" else "shutdown"},
+                           CONNECT_TIMEOUT)
+    except (OSError, ValueError):
+        print(f"✗ 找不到服務 / No daemon at {address}")
+        return 1
+    if args.command == "status":
+        print(json.dumps(response, indent=2))
+    else:
+        print(f"✓ 已要求服務停止 / Stop requested ({address})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
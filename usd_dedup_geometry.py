@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+重複幾何偵測與實例化 / Duplicate geometry detector
+
+Finds SubUSD assets that contain the same geometry (e.g. BlueBeamB_01..10.usd
+or MetalFencing_A1 / MetalFencing_A1_1) and optionally rewrites a layout so
+that every group is referenced through one prototype file with
+`instanceable = true`, letting USD share the prototype instead of composing
+a full copy per reference.
+
+Geometry signature per asset:
+- every Mesh below the default prim is baked into the default prim's space
+  (the transforms inside the asset are normalized away)
+- points are centered on the asset's centroid and quantized to --tolerance
+- each mesh hashes its faceVertexCounts, faceVertexIndices and quantized
+  points; the asset hash is the sorted list of mesh hashes (prim names and
+  order do not matter)
+- a second "look" hash covers the bound materials (path relative to the
+  default prim plus the authored shader values); groups are only rewritten
+  for members with the same look unless --ignore-materials is given
+
+Usage:
+    python usd_dedup_geometry.py Factory_Lite/SubUSDs [-j N] [--json report.json]
+    python usd_dedup_geometry.py Factory_Lite/SubUSDs --layout Factory_Lite/Factory_Lite.usd --rewrite [-o OUT.usd]
+
+--rewrite edits the references and payloads authored in the layout's root layer and writes
+the result next to the layout (default: <layout>_instanced.usd); the source
+layout is never modified. Where the prototype's content sits at a different
+offset than the duplicate, or the duplicate's root transform differs, the
+referencing prim gets an explicit xformOp:transform that keeps the placement
+unchanged. Prims with animated transforms or with opinions on their
+descendants (ignored once instanced) are left alone.
+
+Note: This script requires the USD Python API (pxr) and NumPy.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from convert_usd_to_usda import collect_inputs, print_helpful_message, temp_output_path
+
+try:
+    from pxr import Gf, Sdf, Usd, UsdGeom, UsdShade
+except ImportError:
+    print_helpful_message()
+    sys.exit(1)
+
+try:
+    import numpy as np
+except ImportError:
+    print("錯誤: 需要 NumPy / Error: NumPy is required (pip install numpy)")
+    sys.exit(1)
+
+DEFAULT_TOLERANCE = 1e-4
+USD_PATTERNS = ("*.usd", "*.usda", "*.usdc")
+
+
+def _points_in_root_space(mesh_prim, root_prim, xform_cache):
+    """回傳 mesh 的 points，已套用 mesh 到 root prim 之間的所有變換（float64, N x 3）"""
+    points = UsdGeom.Mesh(mesh_prim).GetPointsAttr().Get()
+    if points is None or len(points) == 0:
+        return np.zeros((0, 3))
+    points = np.array(points, dtype=np.float64).reshape(-1, 3)
+    if mesh_prim == root_prim:
+        return points
+    matrix, _ = xform_cache.ComputeRelativeTransform(mesh_prim, root_prim)
+    matrix = np.array(matrix, dtype=np.float64).reshape(4, 4)
+    # USD 使用列向量慣例：p' = p * M
+    return points @ matrix[:3, :3] + matrix[3, :3]
+
+
+def _material_digest(mesh_prim, root_path):
+    """綁定材質的雜湊：相對於 root 的材質路徑加上材質下所有屬性的值"""
+    material, _ = UsdShade.MaterialBindingAPI(mesh_prim).ComputeBoundMaterial()
+    if not material:
+        return ""
+    material_path = material.GetPath()
+    digest = hashlib.blake2b(digest_size=16)
+    if material_path.HasPrefix(root_path):
+        digest.update(str(material_path.MakeRelativePath(root_path)).encode("utf-8"))
+    else:
+        digest.update(str(material_path).encode("utf-8"))
+    for prim in Usd.PrimRange(material.GetPrim()):
+        for attr in sorted(prim.GetAuthoredAttributes(), key=lambda a: a.GetName()):
+            digest.update(attr.GetName().encode("utf-8"))
+            digest.update(repr(attr.Get()).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def asset_signature(path, tolerance=DEFAULT_TOLERANCE):
+    """
+    計算一個資產檔案的幾何簽章
+
+    Returns:
+        dict: path, geometry（幾何雜湊）, look（材質雜湊）, centroid, meshes,
+        points, faces, size, error
+    """
+    result = {"path": path, "geometry": "", "look": "", "centroid": [0.0, 0.0, 0.0],
+              "meshes": 0, "points": 0, "faces": 0, "size": os.path.getsize(path), "error": ""}
+    stage = Usd.Stage.Open(path)
+    if not stage:
+        result["error"] = f"無法開啟 USD 檔案 {path}"
+        return result
+    root = stage.GetDefaultPrim() or stage.GetPseudoRoot()
+    xform_cache = UsdGeom.XformCache()
+
+    meshes = []
+    for prim in Usd.PrimRange(root, Usd.TraverseInstanceProxies()):
+        if not prim.IsA(UsdGeom.Mesh):
+            continue
+        mesh = UsdGeom.Mesh(prim)
+        counts = np.array(mesh.GetFaceVertexCountsAttr().Get() or [], dtype=np.int32)
+        indices = np.array(mesh.GetFaceVertexIndicesAttr().Get() or [], dtype=np.int32)
+        points = _points_in_root_space(prim, root, xform_cache)
+        meshes.append((counts, indices, points, _material_digest(prim, root.GetPath())))
+    if not meshes:
+        return result
+
+    all_points = np.concatenate([points for _, _, points, _ in meshes])
+    centroid = all_points.mean(axis=0) if len(all_points) else np.zeros(3)
+
+    mesh_digests = []
+    look_digests = []
+    for counts, indices, points, material in meshes:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(counts.tobytes())
+        digest.update(b"|")
+        digest.update(indices.tobytes())
+        digest.update(b"|")
+        digest.update(np.round((points - centroid) / tolerance).astype(np.int64).tobytes())
+        mesh_digests.append(digest.hexdigest())
+        look_digests.append(f"{digest.hexdigest()}:{material}")
+
+    result.update({
+        "geometry": hashlib.blake2b("".join(sorted(mesh_digests)).encode("ascii"),
+                                    digest_size=16).hexdigest(),
+        "look": hashlib.blake2b("".join(sorted(look_digests)).encode("ascii"),
+                                digest_size=16).hexdigest(),
+        "centroid": centroid.tolist(),
+        "meshes": len(meshes),
+        "points": int(sum(len(points) for _, _, points, _ in meshes)),
+        "faces": int(sum(len(counts) for counts, _, _, _ in meshes)),
+    })
+    return result
+
+
+def _signature_job(path, tolerance):
+    """平行處理的工作函式，錯誤會回報在結果中"""
+    try:
+        return asset_signature(path, tolerance)
+    except Exception as e:
+        return {"path": path, "geometry": "", "look": "", "centroid": [0.0, 0.0, 0.0],
+                "meshes": 0, "points": 0, "faces": 0,
+                "size": os.path.getsize(path) if os.path.isfile(path) else 0,
+                "error": str(e) or e.__class__.__name__}
+
+
+def find_duplicate_groups(signatures):
+    """
+    依幾何雜湊分組，只保留兩個以上成員的群組
+
+    每組的原型 (prototype) 為路徑排序後的第一個檔案。
+
+    Returns:
+        list: {"geometry", "prototype", "members", "meshes", "points", "faces",
+        "duplicate_bytes"}，依可節省的大小排序
+    """
+    by_hash = {}
+    for signature in signatures:
+        if signature["geometry"]:
+            by_hash.setdefault(signature["geometry"], []).append(signature)
+
+    groups = []
+    for geometry, members in by_hash.items():
+        if len(members) < 2:
+            continue
+        members = sorted(members, key=lambda s: s["path"])
+        prototype = members[0]
+        groups.append({
+            "geometry": geometry,
+            "prototype": prototype["path"],
+            "members": [{
+                "path": member["path"],
+                "same_look": member["look"] == prototype["look"],
+                "offset": (np.array(member["centroid"]) - np.array(prototype["centroid"])).tolist(),
+                "size": member["size"],
+            } for member in members],
+            "meshes": prototype["meshes"],
+            "points": prototype["points"],
+            "faces": prototype["faces"],
+            "duplicate_bytes": sum(member["size"] for member in members[1:]),
+        })
+    groups.sort(key=lambda group: group["duplicate_bytes"], reverse=True)
+    return groups
+
+
+def scan_assets(paths, tolerance=DEFAULT_TOLERANCE, jobs=None):
+    """以行程池計算所有資產的簽章"""
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(paths) or 1))
+    if jobs == 1:
+        return [_signature_job(path, tolerance) for path in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(_signature_job, paths, [tolerance] * len(paths)))
+
+
+def _relative_asset_path(target, layer_path):
+    relative = os.path.relpath(target, os.path.dirname(os.path.abspath(layer_path)))
+    relative = relative.replace(os.sep, "/")
+    return relative if relative.startswith("../") else f"./{relative}"
+
+
+def rewrite_layout(layout_path, groups, output_path=None, ignore_materials=False):
+    """
+    把 layout 根圖層中指向重複資產的 reference 與 payload 改為指向原型，並設為 instanceable
+
+    Returns:
+        dict: output, rewritten（改寫的 prim 路徑清單）, instanced, skipped（(prim, 原因) 清單）
+    """
+    if output_path is None:
+        base, ext = os.path.splitext(layout_path)
+        output_path = f"{base}_instanced{ext}"
+
+    # 成員檔案 -> (原型檔案, 偏移)；外觀不同的成員不改寫
+    targets = {}
+    for group in groups:
+        for member in group["members"]:
+            if member["same_look"] or ignore_materials:
+                key = os.path.normpath(os.path.abspath(member["path"]))
+                targets[key] = (os.path.normpath(os.path.abspath(group["prototype"])),
+                                member["offset"])
+
+    stage = Usd.Stage.Open(layout_path)
+    if not stage:
+        raise ValueError(f"無法開啟 layout {layout_path}")
+    layer = stage.GetRootLayer()
+    stage.SetEditTarget(Usd.EditTarget(layer))
+
+    edits = []
+
+    def visit(spec_path):
+        spec = layer.GetObjectAtPath(spec_path)
+        if not isinstance(spec, Sdf.PrimSpec):
+            return
+        # Factory_Lite 的資產多半以 payload 掛上（usd_payloadize.py 也會把 reference 轉成 payload）
+        for list_name in ("referenceList", "payloadList"):
+            for item in getattr(spec, list_name).GetAddedOrExplicitItems():
+                if not item.assetPath:
+                    continue
+                resolved = os.path.normpath(layer.ComputeAbsolutePath(item.assetPath))
+                if resolved in targets:
+                    edits.append((spec_path, list_name, item, resolved))
+
+    layer.Traverse(Sdf.Path.absoluteRootPath, visit)
+
+    result = {"output": output_path, "rewritten": [], "instanced": [], "skipped": []}
+    for spec_path, list_name, item, resolved in edits:
+        if str(spec_path) in result["instanced"]:
+            # 第二個指向重複資產的 arc 會讓位移補償重複套用
+            result["skipped"].append((str(spec_path), f"more than one duplicate arc ({item.assetPath})"))
+            continue
+        spec = layer.GetPrimAtPath(spec_path)
+        if spec.nameChildren:
+            # 設為 instanceable 後，子 prim 上的 opinion 會被忽略
+            result["skipped"].append((str(spec_path), "opinions on descendants"))
+            continue
+        prim = stage.GetPrimAtPath(spec_path)
+        xformable = UsdGeom.Xformable(prim)
+        if xformable and xformable.TransformMightBeTimeVarying():
+            result["skipped"].append((str(spec_path), "animated transform"))
+            continue
+        before = xformable.GetLocalTransformation() if xformable else None
+
+        prototype, offset = targets[resolved]
+        if prototype != resolved:
+            asset_path = _relative_asset_path(prototype, layout_path)
+            if list_name == "payloadList":
+                new_item = Sdf.Payload(asset_path, item.primPath, item.layerOffset)
+            else:
+                new_item = Sdf.Reference(asset_path, item.primPath, item.layerOffset, item.customData)
+            getattr(spec, list_name).ReplaceItemEdits(item, new_item)
+            result["rewritten"].append(str(spec_path))
+        spec.instanceable = True
+        result["instanced"].append(str(spec_path))
+
+        if xformable and prototype != resolved:
+            # 原型內容相對於重複資產的位移 + 原本的局部變換 = 改寫後應有的變換
+            desired = Gf.Matrix4d(1.0).SetTranslate(Gf.Vec3d(*offset)) * before
+            after = xformable.GetLocalTransformation()
+            if not np.allclose(np.array(after), np.array(desired), atol=1e-9):
+                xformable.MakeMatrixXform().Set(desired)
+
+    tmp_path = temp_output_path(output_path)
+    try:
+        if not layer.Export(tmp_path):
+            raise ValueError(f"無法匯出 {output_path}")
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return result
+
+
+def print_report(signatures, groups, elapsed, tolerance=DEFAULT_TOLERANCE):
+    """輸出重複幾何群組與可節省的大小"""
+    failed = [s for s in signatures if s["error"]]
+    duplicates = sum(len(group["members"]) - 1 for group in groups)
+    saved = sum(group["duplicate_bytes"] for group in groups)
+
+    print("=" * 70)
+    print("重複幾何 / Duplicate Geometry")
+    print("=" * 70)
+    for group in groups:
+        print(f"  {os.path.relpath(group['prototype'])} ({len(group['members'])} copies, "
+              f"{group['meshes']} mesh(es), {group['points']:,d} points, "
+              f"{group['faces']:,d} faces)")
+        for member in group["members"][1:]:
+            notes = []
+            if np.linalg.norm(member["offset"]) > tolerance:
+                notes.append("offset ({:.3g}, {:.3g}, {:.3g})".format(*member["offset"]))
+            if not member["same_look"]:
+                notes.append("materials differ")
+            suffix = f"  [{', '.join(notes)}]" if notes else ""
+            print(f"    = {os.path.relpath(member['path'])}{suffix}")
+    print()
+    print(f"  資產 / Assets:            {len(signatures)}")
+    print(f"  重複群組 / Groups:        {len(groups)}")
+    print(f"  重複資產 / Duplicates:    {duplicates}")
+    print(f"  重複大小 / Duplicate size: {saved / (1024 * 1024):.2f} MB")
+    print(f"  失敗 / Failed:            {len(failed)}")
+    print(f"  耗時 / Elapsed:           {elapsed:.2f}s")
+    for signature in failed:
+        print(f"    ✗ {signature['path']}: {signature['error']}")
+    print("=" * 70)
+
+
+def parse_args(argv=None):
+    """解析命令列參數"""
+    parser = argparse.ArgumentParser(
+        description="Find assets with identical geometry and reference them as instanceable prototypes.",
+    )
+    parser.add_argument("inputs", nargs="+", help="asset files, directories or glob patterns")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"point quantization step in scene units (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of worker processes (default: number of CPU cores)")
+    parser.add_argument("--layout", help="layout file whose references and payloads are rewritten with --rewrite")
+    parser.add_argument("--rewrite", action="store_true",
+                        help="write a copy of the layout that references one prototype per group")
+    parser.add_argument("-o", "--output", help="rewritten layout path (default: <layout>_instanced.usd)")
+    parser.add_argument("--ignore-materials", action="store_true",
+                        help="also rewrite members whose bound materials differ from the prototype")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+    if args.rewrite and not args.layout:
+        parser.error("--rewrite requires --layout")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    paths = []
+    for pattern in USD_PATTERNS:
+        paths.extend(collect_inputs(args.inputs, pattern))
+    paths = sorted({os.path.normpath(os.path.abspath(path)) for path in paths})
+    if args.layout:
+        # layout 本身不是候選資產
+        paths = [path for path in paths if path != os.path.normpath(os.path.abspath(args.layout))]
+    if not paths:
+        print(f"錯誤: 找不到符合的 USD 檔案: {' '.join(args.inputs)}")
+        return 1
+
+    start = time.perf_counter()
+    signatures = scan_assets(paths, args.tolerance, args.jobs)
+    groups = find_duplicate_groups(signatures)
+    print_report(signatures, groups, time.perf_counter() - start, args.tolerance)
+
+    report = {"tolerance": args.tolerance, "assets": signatures, "groups": groups}
+    if args.rewrite:
+        try:
+            rewrite = rewrite_layout(args.layout, groups, args.output, args.ignore_materials)
+        except ValueError as e:
+            print(f"✗ 錯誤: {e}")
+            return 1
+        report["rewrite"] = rewrite
+        print()
+        print(f"✓ 已寫入 / Written: {rewrite['output']}")
+        print(f"  改寫 reference/payload / Arcs rewritten: {len(rewrite['rewritten'])}")
+        print(f"  instanceable prims:                     {len(rewrite['instanced'])}")
+        for prim_path, reason in rewrite["skipped"]:
+            print(f"  ⚠️  略過 / Skipped {prim_path}: {reason}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
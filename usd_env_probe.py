@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+USD 環境探測模組 / Shared USD environment probe
+
+Probes the USD Python API (pxr path, USD version, plugin registry size) and the
+Omniverse/Kit environment variables for the conversion tools. Importing pxr and
+loading the plugin registry is the expensive part, so the pxr results are cached
+in a small JSON file keyed by the interpreter and PYTHONPATH. The cache is
+re-validated with importlib's module lookup, which does not import pxr.
+
+Cache location: $USD_ENV_PROBE_CACHE, or usd_env_probe.json in the user cache
+directory ($XDG_CACHE_HOME, ~/.cache or %LOCALAPPDATA%) under
+digital_twin_omniverse/.
+
+Usage:
+    python usd_env_probe.py [--refresh] [--no-cache]
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+
+import usd_profile
+
+CACHE_VERSION = 1
+CACHE_ENV_VAR = "USD_ENV_PROBE_CACHE"
+CACHE_FILE_NAME = "usd_env_probe.json"
+
+# Omniverse/Kit 環境變數
+KIT_ENV_VARS = ("OMNIVERSE_PATH", "KIT_PATH", "OMNIVERSE_APP_PATH")
+
+# 影響 pxr 匯入結果的環境變數，納入快取鍵
+KEY_ENV_VARS = ("PYTHONPATH", "PXR_PLUGINPATH_NAME")
+
+
+def cache_path():
+    """回傳快取檔路徑"""
+    override = os.environ.get(CACHE_ENV_VAR)
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "digital_twin_omniverse", CACHE_FILE_NAME)
+
+
+def cache_key():
+    """以直譯器與 PYTHONPATH 等環境變數計算快取鍵"""
+    parts = [sys.executable, sys.version] + [os.environ.get(var, "") for var in KEY_ENV_VARS]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def _pxr_location():
+    """不匯入 pxr，只查詢模組位置與修改時間"""
+    try:
+        spec = importlib.util.find_spec("pxr")
+    except (ImportError, ValueError):
+        spec = None
+    origin = spec.origin if spec else None
+    try:
+        mtime_ns = os.stat(origin).st_mtime_ns if origin else None
+    except OSError:
+        mtime_ns = None
+    return {"origin": origin, "mtime_ns": mtime_ns}
+
+
+def _probe_pxr():
+    """匯入 pxr 並收集版本與外掛資訊（昂貴，結果會被快取）"""
+    result = {"available": False, "path": None, "version": None, "plugin_count": None, "error": ""}
+    try:
+        with usd_profile.phase("import pxr"):
+            import pxr
+            from pxr import Plug, Usd
+    except ImportError as e:
+        result["error"] = str(e)
+        return result
+
+    result["available"] = True
+    result["path"] = getattr(pxr, "__file__", None)
+    try:
+        result["version"] = ".".join(str(part) for part in Usd.GetVersion())
+        with usd_profile.phase("plugin registration"):
+            result["plugin_count"] = len(Plug.Registry().GetAllPlugins())
+    except Exception as e:  # nosec B110 - 版本資訊為附加資訊，探測結果仍有效
+        result["error"] = str(e)
+    return result
+
+
+def _read_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        return {}
+    return data
+
+
+def _write_cache(path, data):
+    """寫入快取；無法寫入時忽略（快取只是加速用）"""
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def kit_environment():
+    """回傳已設定的 Omniverse/Kit 環境變數（不快取，成本極低）"""
+    return {var: os.environ[var] for var in KIT_ENV_VARS if os.environ.get(var)}
+
+
+def in_omniverse_environment():
+    """檢查是否在 Omniverse 環境中"""
+    return bool(kit_environment())
+
+
+def probe(refresh=False, use_cache=True):
+    """
+    探測 USD 環境
+
+    Args:
+        refresh: 忽略快取重新探測
+        use_cache: 是否讀寫快取檔
+
+    Returns:
+        dict: python（版本、直譯器）、pxr（available, path, version,
+        plugin_count, error）、kit_env、cached（是否來自快取）
+    """
+    key = cache_key()
+    location = _pxr_location()
+    path = cache_path()
+
+    pxr_info = None
+    if use_cache and not refresh:
+        with usd_profile.phase("read probe cache"):
+            cached = _read_cache(path).get("entries", {}).get(key)
+        # pxr 的位置或修改時間改變（安裝、升級、移除）時快取失效
+        if cached and cached.get("location") == location:
+            pxr_info = cached.get("pxr")
+
+    cached_hit = pxr_info is not None
+    if not cached_hit:
+        pxr_info = _probe_pxr()
+        if use_cache:
+            data = _read_cache(path) or {"version": CACHE_VERSION, "entries": {}}
+            data.setdefault("entries", {})[key] = {"location": location, "pxr": pxr_info}
+            _write_cache(path, data)
+
+    version = sys.version_info
+    return {
+        "python": {
+            "executable": sys.executable,
+            "version": f"{version.major}.{version.minor}.{version.micro}",
+        },
+        "pxr": pxr_info,
+        "kit_env": kit_environment(),
+        "cached": cached_hit,
+    }
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Probe the USD Python environment (JSON output).")
+    parser.add_argument("--refresh", action="store_true", help="ignore the cache and probe again")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the cache")
+    args = parser.parse_args(argv)
+
+    result = probe(refresh=args.refresh, use_cache=not args.no_cache)
+    print(json.dumps(result, indent=2))
+    return 0 if result["pxr"]["available"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
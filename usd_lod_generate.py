@@ -0,0 +1,624 @@
+#!/usr/bin/env python3
+"""
+LOD 產生器 / Level-of-detail generator
+
+Decimates the meshes of an asset (e.g. Factory_Lite/SubUSDs/RoofPiece.usd)
+into coarser levels with vertex clustering and authors them as an `LOD`
+variant set, so a viewer can switch distant props to cheaper geometry.
+
+For an asset A.usd the tool writes, next to it:
+- A_LOD1.usd, A_LOD2.usd, ...: copies of A.usd whose meshes are decimated
+- A_LOD.usd: a wrapper whose default prim has the same name and type as A's,
+  with a variant set "LOD" = {LOD0: references A.usd, LOD1: references
+  A_LOD1.usd, ...} and LOD0 selected, so pointing a layout at A_LOD.usd
+  changes nothing until a variant is selected. Only the selected variant is
+  composed, the other levels are never opened.
+
+Vertex clustering (pure NumPy):
+- the asset's world-space bounding box is divided into a uniform grid; each
+  mesh uses the same cell size converted to its local space. The grid
+  resolution of every level is found by bisection so that the asset keeps
+  about --ratios of its faces (default 0.5 and 0.15: LOD1 and LOD2)
+- all vertices in a cell collapse to their mean, polygons are triangulated
+  as fans and triangles that collapse or repeat are dropped
+- vertex primvars (and normals) are averaged per cell, faceVarying and
+  uniform primvars keep the values of the surviving corners and faces,
+  GeomSubsets are remapped to the new faces and the extent is recomputed
+- unknown per-face arrays (e.g. smoothgroups3DSMax) are remapped like
+  uniform primvars; creases, corners and holes are removed
+- meshes with time-sampled data or elementSize > 1 primvars are copied
+  unchanged
+
+Usage:
+    python usd_lod_generate.py Factory_Lite/SubUSDs/RoofPiece.usd [--ratios 0.5 0.15]
+    python usd_lod_generate.py Factory_Lite/SubUSDs --min-points 20000 -j 4 --json lods.json
+
+The viewer side lives in the usd_viewer.messaging extension template
+(lod_management.py), which selects a level per prim by camera distance.
+
+Note: This script requires the USD Python API (pxr) and NumPy.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from convert_usd_to_usda import collect_inputs, print_helpful_message, temp_output_path
+
+try:
+    from pxr import Sdf, Usd, UsdGeom
+except ImportError:
+    print_helpful_message()
+    sys.exit(1)
+
+try:
+    import numpy as np
+except ImportError:
+    print("錯誤: 需要 NumPy / Error: NumPy is required (pip install numpy)")
+    sys.exit(1)
+
+# 各 LOD 層的目標面數比例（相對於原始資產）
+DEFAULT_RATIOS = (0.5, 0.15)
+# 網格解析度搜尋的上限（最長邊上的格數）
+MAX_CELLS = 4096
+VARIANT_SET = "LOD"
+USD_PATTERNS = ("*.usd", "*.usda", "*.usdc")
+# 本工具產生的檔案，不再當作輸入
+OUTPUT_MARKER = "_LOD"
+
+# mesh 上依拓撲而定、減面後無法保留的屬性
+TOPOLOGY_ONLY_ATTRS = (
+    "holeIndices", "cornerIndices", "cornerSharpnesses",
+    "creaseIndices", "creaseLengths", "creaseSharpnesses",
+)
+TOPOLOGY_ATTRS = ("points", "faceVertexCounts", "faceVertexIndices")
+# 沒有 interpolation metadata、但每個頂點一個值的屬性
+VERTEX_ATTRS = ("velocities", "accelerations")
+
+
+def lod_path(path, level):
+    """回傳第 level 層的檔案路徑；level 為 None 時回傳 variant 包裝檔路徑"""
+    base, ext = os.path.splitext(path)
+    return f"{base}{OUTPUT_MARKER}{'' if level is None else level}{ext}"
+
+
+def triangulate(counts):
+    """
+    以扇形三角化多邊形
+
+    Returns:
+        tuple: (corners, faces)；corners 為 (T, 3) 的原始 corner 索引，
+        faces 為每個三角形所屬的原始面
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])) if len(counts) else counts
+    tri_counts = np.maximum(counts - 2, 0)
+    faces = np.repeat(np.arange(len(counts)), tri_counts)
+    first = np.repeat(np.cumsum(tri_counts) - tri_counts, tri_counts)
+    step = np.arange(len(faces)) - first + 1
+    base = starts[faces]
+    corners = np.stack((base, base + step, base + step + 1), axis=1)
+    return corners, faces
+
+
+def cluster_vertices(points, cell):
+    """
+    把頂點依網格分群
+
+    Returns:
+        tuple: (labels, count)；labels 為每個頂點所屬的群組
+    """
+    keys = np.floor(points / cell).astype(np.int64)
+    _, labels = np.unique(keys, axis=0, return_inverse=True)
+    labels = labels.reshape(-1)
+    return labels, int(labels.max()) + 1 if len(labels) else 0
+
+
+def decimate(points, counts, indices, cell):
+    """
+    頂點分群減面
+
+    Returns:
+        dict: points（新頂點）, indices（三角形頂點索引，攤平）, labels（每個原頂點
+        對應的新頂點，已捨棄為 -1）, clusters（新頂點數）, corners（保留的原始
+        corner）, faces（每個三角形的原始面）
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    indices = np.asarray(indices, dtype=np.int64)
+    labels, count = cluster_vertices(points, cell)
+    corners, faces = triangulate(counts)
+
+    triangles = labels[indices[corners]]
+    keep = ((triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2])
+            & (triangles[:, 0] != triangles[:, 2]))
+    triangles, corners, faces = triangles[keep], corners[keep], faces[keep]
+    # 去除重複的三角形（不論頂點順序），保留第一個出現的方向
+    _, first = np.unique(np.sort(triangles, axis=1), axis=0, return_index=True)
+    first.sort()
+    triangles, corners, faces = triangles[first], corners[first], faces[first]
+
+    # 只保留仍被使用的群組，並重新編號
+    used = np.unique(triangles)
+    remap = np.full(count, -1, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    sums = np.zeros((count, 3))
+    np.add.at(sums, labels, points)
+    members = np.bincount(labels, minlength=count)
+    centers = sums[used] / members[used, None]
+    return {
+        "points": centers,
+        "indices": remap[triangles].reshape(-1),
+        "labels": remap[labels],
+        "clusters": len(used),
+        "corners": corners.reshape(-1),
+        "faces": faces,
+    }
+
+
+def _first_per_cluster(labels, count):
+    """回傳每個群組中索引最小的原頂點（labels 為 -1 的頂點已被捨棄）"""
+    valid = labels >= 0
+    first = np.zeros(count, dtype=np.int64)
+    # 反向寫入，重複索引時最後寫入的（即索引最小的）生效
+    first[labels[valid][::-1]] = np.nonzero(valid)[0][::-1]
+    return first
+
+
+def _like(original, array):
+    """以原屬性值的 Vt 型別包裝 NumPy 陣列"""
+    array = np.ascontiguousarray(array, dtype=np.asarray(original).dtype)
+    return type(original).FromNumpy(array)
+
+
+def _take(value, index):
+    """依索引取出陣列元素，保留原本的 Vt 型別"""
+    array = np.asarray(value)
+    if array.dtype.kind in "OUS":
+        return type(value)([value[int(i)] for i in index])
+    return _like(value, array[index])
+
+
+def _average(value, labels, count, normalize=False):
+    """依群組平均每個頂點的值；非浮點數取每群的第一個值"""
+    array = np.asarray(value)
+    if array.dtype.kind != "f":
+        return _take(value, _first_per_cluster(labels, count))
+    flat = array.reshape(len(array), -1).astype(np.float64)
+    valid = labels >= 0
+    sums = np.zeros((count, flat.shape[1]))
+    np.add.at(sums, labels[valid], flat[valid])
+    result = sums / np.maximum(np.bincount(labels[valid], minlength=count), 1)[:, None]
+    if normalize:
+        lengths = np.linalg.norm(result, axis=1, keepdims=True)
+        result = np.divide(result, lengths, out=result, where=lengths > 0)
+    return _like(value, result.reshape((count,) + array.shape[1:]))
+
+
+def _authored(attr):
+    """回傳屬性的預設值；未設定或被 block 時回傳 None"""
+    value = attr.default if attr is not None else None
+    return None if value is None or isinstance(value, Sdf.ValueBlock) else value
+
+
+def mesh_skip_reason(spec):
+    """回傳無法減面的原因，可以減面時回傳空字串"""
+    attrs = spec.attributes
+    if any(name not in attrs or _authored(attrs[name]) is None for name in TOPOLOGY_ATTRS):
+        return "no authored topology"
+    if any(attr.HasInfo("timeSamples") for attr in attrs):
+        return "time-sampled"
+    if any(attr.HasInfo("elementSize") and attr.GetInfo("elementSize") != 1 for attr in attrs):
+        return "elementSize > 1"
+    return ""
+
+
+def _compact_indexed(attr, indices_attr, indices):
+    """只保留仍被索引到的值，並重新編號索引"""
+    used, remapped = np.unique(np.asarray(indices, dtype=np.int64), return_inverse=True)
+    attr.default = _take(attr.default, used)
+    indices_attr.default = _like(indices_attr.default, remapped.reshape(-1))
+
+
+def decimate_mesh_spec(spec, cell):
+    """
+    在圖層中直接改寫一個 Mesh prim spec
+
+    Returns:
+        dict: prim, points/faces（前後）, status（"decimated" 或略過原因）
+    """
+    attrs = {attr.name: attr for attr in spec.attributes}
+    result = {"prim": str(spec.path), "points_before": 0, "faces_before": 0,
+              "points": 0, "faces": 0, "status": mesh_skip_reason(spec) or "decimated"}
+    if result["status"] == "no authored topology":
+        return result
+    points = attrs["points"].default
+    counts = attrs["faceVertexCounts"].default
+    result.update(points_before=len(points), faces_before=len(counts),
+                  points=len(points), faces=len(counts))
+    if result["status"] != "decimated":
+        return result
+
+    lod = decimate(points, counts, attrs["faceVertexIndices"].default, cell)
+    num_points, num_corners, num_faces = len(points), len(attrs["faceVertexIndices"].default), len(counts)
+    first_vertex = _first_per_cluster(lod["labels"], lod["clusters"])
+
+    for name, attr in attrs.items():
+        value = _authored(attr)
+        if name in TOPOLOGY_ATTRS or value is None or name.endswith(":indices"):
+            continue
+        if name in TOPOLOGY_ONLY_ATTRS:
+            spec.RemoveProperty(attr)
+            continue
+        # 只重新對應幾何資料；xformOp、extent 與其他自訂屬性原封不動保留
+        if not (name.startswith("primvars:") or name == "normals" or name in VERTEX_ATTRS):
+            continue
+        if not hasattr(value, "__len__") or isinstance(value, str):
+            continue
+        interpolation = attr.GetInfo("interpolation") if attr.HasInfo("interpolation") else None
+        if interpolation is None:
+            interpolation = "constant" if name.startswith("primvars:") else "vertex"
+        if interpolation == "constant":
+            continue
+
+        indices_attr = attrs.get(f"{name}:indices")
+        indexed = _authored(indices_attr) is not None
+        element = {"vertex": lod["labels"], "varying": lod["labels"],
+                   "faceVarying": lod["corners"], "uniform": lod["faces"]}.get(interpolation)
+        expected = {"vertex": num_points, "varying": num_points,
+                    "faceVarying": num_corners, "uniform": num_faces}.get(interpolation)
+        target = indices_attr if indexed else attr
+        if element is None or len(target.default) != expected:
+            spec.RemoveProperty(attr)
+            if indexed:
+                spec.RemoveProperty(indices_attr)
+            continue
+        if indexed:
+            if interpolation in ("vertex", "varying"):
+                element = first_vertex
+            _compact_indexed(attr, indices_attr, np.asarray(indices_attr.default)[element])
+        elif interpolation in ("vertex", "varying"):
+            attr.default = _average(value, lod["labels"], lod["clusters"],
+                                    normalize=name == "normals")
+        else:
+            attr.default = _take(value, element)
+
+    attrs["points"].default = _like(points, lod["points"])
+    attrs["faceVertexCounts"].default = _like(counts, np.full(len(lod["faces"]), 3))
+    attrs["faceVertexIndices"].default = _like(attrs["faceVertexIndices"].default, lod["indices"])
+    if "extent" in attrs and len(lod["points"]):
+        attrs["extent"].default = _like(
+            attrs["extent"].default, np.stack((lod["points"].min(axis=0), lod["points"].max(axis=0))))
+
+    # GeomSubset 的面索引改為新三角形的索引
+    for child in spec.nameChildren:
+        if child.typeName != "GeomSubset" or "indices" not in child.attributes:
+            continue
+        subset_indices = child.attributes["indices"]
+        if _authored(subset_indices) is not None:
+            selected = np.nonzero(np.isin(lod["faces"], np.asarray(subset_indices.default)))[0]
+            subset_indices.default = _like(subset_indices.default, selected)
+
+    result.update(points=len(lod["points"]), faces=len(lod["faces"]))
+    return result
+
+
+def _mesh_scales(stage, layer):
+    """
+    找出圖層中的 Mesh spec 與其局部空間到世界空間的縮放
+
+    Returns:
+        tuple: (資產最長邊長度, {mesh spec 路徑: 縮放})
+    """
+    root = stage.GetDefaultPrim() or stage.GetPseudoRoot()
+    bbox = UsdGeom.BBoxCache(Usd.TimeCode.Default(), [UsdGeom.Tokens.default_, UsdGeom.Tokens.render])
+    box = bbox.ComputeWorldBound(root).ComputeAlignedRange()
+    longest = max(box.GetSize()) if not box.IsEmpty() else 0.0
+    xform_cache = UsdGeom.XformCache()
+
+    mesh_paths = []
+
+    def visit(spec_path):
+        spec = layer.GetObjectAtPath(spec_path)
+        if isinstance(spec, Sdf.PrimSpec) and spec.typeName == "Mesh":
+            mesh_paths.append(spec_path)
+
+    layer.Traverse(Sdf.Path.absoluteRootPath, visit)
+
+    scales = {}
+    for path in mesh_paths:
+        prim = stage.GetPrimAtPath(path.StripAllVariantSelections())
+        scale = 1.0
+        if prim:
+            matrix = np.array(xform_cache.GetLocalToWorldTransform(prim)).reshape(4, 4)
+            scale = abs(np.linalg.det(matrix[:3, :3])) ** (1.0 / 3.0) or 1.0
+        scales[path] = scale
+    if longest <= 0.0:
+        # 沒有可計算的範圍時（例如沒有 extent），以頂點範圍估計
+        longest = max((np.ptp(np.asarray(layer.GetAttributeAtPath(path.AppendProperty("points")).default,
+                                         dtype=np.float64).reshape(-1, 3), axis=0).max() * scales[path]
+                       for path in mesh_paths
+                       if not mesh_skip_reason(layer.GetPrimAtPath(path))), default=1.0) or 1.0
+    return longest, scales
+
+
+def choose_cells(layer, scales, longest, target_faces):
+    """
+    以二分搜尋找出最接近目標面數的網格解析度（最長邊上的格數）
+
+    只計算拓撲，不處理 primvar；無法減面的 mesh 以原面數計入。
+    """
+    meshes = []
+    fixed_faces = 0
+    for path, scale in scales.items():
+        spec = layer.GetPrimAtPath(path)
+        reason = mesh_skip_reason(spec)
+        if reason == "no authored topology":
+            continue
+        attrs = spec.attributes
+        if reason:
+            fixed_faces += len(attrs["faceVertexCounts"].default)
+            continue
+        meshes.append((np.asarray(attrs["points"].default, dtype=np.float64).reshape(-1, 3),
+                       np.asarray(attrs["faceVertexCounts"].default),
+                       np.asarray(attrs["faceVertexIndices"].default), scale))
+
+    def faces_at(cells):
+        return fixed_faces + sum(len(decimate(points, counts, indices, longest / cells / scale)["faces"])
+                                 for points, counts, indices, scale in meshes)
+
+    low, high = 1, MAX_CELLS
+    if faces_at(high) <= target_faces:
+        return high, faces_at(high)
+    low_faces, high_faces = faces_at(low), faces_at(high)
+    while high - low > 1:
+        middle = int(round((low * high) ** 0.5))
+        middle = min(max(middle, low + 1), high - 1)
+        faces = faces_at(middle)
+        if faces < target_faces:
+            low, low_faces = middle, faces
+        else:
+            high, high_faces = middle, faces
+    if abs(low_faces - target_faces) <= abs(high_faces - target_faces):
+        return low, low_faces
+    return high, high_faces
+
+
+def _export(layer, output_path):
+    tmp_path = temp_output_path(output_path)
+    try:
+        if not layer.Export(tmp_path):
+            raise ValueError(f"無法匯出 {output_path}")
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_variant_wrapper(path, levels):
+    """寫出帶有 LOD variant set 的包裝檔（LOD0 為原始資產）"""
+    source = Sdf.Layer.FindOrOpen(path)
+    default_prim = source.defaultPrim
+    if not default_prim:
+        raise ValueError(f"{path} 沒有 defaultPrim，無法建立 LOD 包裝檔")
+    source_prim = source.GetPrimAtPath(Sdf.Path.absoluteRootPath.AppendChild(default_prim))
+
+    layer = Sdf.Layer.CreateAnonymous(os.path.splitext(path)[1])
+    for key in ("metersPerUnit", "upAxis", "timeCodesPerSecond", "startTimeCode", "endTimeCode"):
+        if source.pseudoRoot.HasInfo(key):
+            layer.pseudoRoot.SetInfo(key, source.pseudoRoot.GetInfo(key))
+    layer.defaultPrim = default_prim
+
+    prim = Sdf.PrimSpec(layer, default_prim, Sdf.SpecifierDef,
+                        source_prim.typeName if source_prim else "Xform")
+    if source_prim and source_prim.kind:
+        prim.kind = source_prim.kind
+    variant_set = Sdf.VariantSetSpec(prim, VARIANT_SET)
+    names = [f"LOD{level}" for level in range(levels + 1)]
+    for level, name in enumerate(names):
+        variant = Sdf.VariantSpec(variant_set, name)
+        target = path if level == 0 else lod_path(path, level)
+        variant.primSpec.referenceList.Prepend(Sdf.Reference(f"./{os.path.basename(target)}"))
+    prim.variantSetNameList.Prepend(VARIANT_SET)
+    prim.variantSelections[VARIANT_SET] = names[0]
+
+    output = lod_path(path, None)
+    _export(layer, output)
+    return output
+
+
+def mesh_world_bounds(path):
+    """每個有面的 Mesh prim 的世界座標範圍"""
+    stage = Usd.Stage.Open(path)
+    bbox = UsdGeom.BBoxCache(Usd.TimeCode.Default(), [UsdGeom.Tokens.default_, UsdGeom.Tokens.render])
+    bounds = {}
+    for prim in stage.Traverse():
+        if prim.IsA(UsdGeom.Mesh) and UsdGeom.Mesh(prim).GetFaceCount():
+            bounds[str(prim.GetPath())] = bbox.ComputeWorldBound(prim).ComputeAlignedRange()
+    return bounds
+
+
+def check_bounds(expected, actual, tolerance):
+    """
+    檢查 LOD 層每個 mesh 的世界範圍都落在 LOD0 同一 mesh 的範圍內
+
+    頂點群聚把每格的頂點移到其平均位置，不會超出原本的範圍；細長的部分
+    可能整段消失，所以範圍可以內縮，但外擴超過 tolerance（浮點誤差）代表
+    減面改動了變換或其他非幾何資料。
+
+    Raises:
+        ValueError: 有 mesh 超出 LOD0 的範圍時
+    """
+    for prim_path, box in actual.items():
+        original = expected.get(prim_path)
+        if original is None:
+            raise ValueError(f"{prim_path} 不在 LOD0 中")
+        outside = max(np.max(np.array(original.GetMin()) - np.array(box.GetMin())),
+                      np.max(np.array(box.GetMax()) - np.array(original.GetMax())))
+        if outside > tolerance:
+            raise ValueError(f"{prim_path} 的世界範圍超出 LOD0 {outside:.4g}（容許 {tolerance:.4g}）")
+
+
+def generate_lods(path, ratios=DEFAULT_RATIOS):
+    """
+    產生一個資產的 LOD 檔與包裝檔
+
+    Returns:
+        dict: path, wrapper, levels（各層的 output、points、faces、size、cells）,
+        skipped（未減面的 mesh 與原因）, points, faces, size, error
+    """
+    result = {"path": path, "wrapper": None, "levels": [], "skipped": [],
+              "points": 0, "faces": 0, "size": os.path.getsize(path), "error": ""}
+    stage = Usd.Stage.Open(path)
+    if not stage:
+        result["error"] = f"無法開啟 USD 檔案 {path}"
+        return result
+    source = stage.GetRootLayer()
+    longest, scales = _mesh_scales(stage, source)
+    if not scales:
+        result["error"] = "沒有 Mesh"
+        return result
+
+    for mesh_path in scales:
+        spec = source.GetPrimAtPath(mesh_path)
+        reason = mesh_skip_reason(spec)
+        if reason:
+            result["skipped"].append((str(mesh_path), reason))
+        if reason != "no authored topology":
+            result["points"] += len(spec.attributes["points"].default)
+            result["faces"] += len(spec.attributes["faceVertexCounts"].default)
+
+    bounds = mesh_world_bounds(path)
+    for level, ratio in enumerate(ratios, start=1):
+        cells, _ = choose_cells(source, scales, longest, result["faces"] * ratio)
+        layer = Sdf.Layer.CreateAnonymous(os.path.splitext(path)[1])
+        layer.TransferContent(source)
+        points = faces = 0
+        for mesh_path, scale in scales.items():
+            mesh = decimate_mesh_spec(layer.GetPrimAtPath(mesh_path), longest / cells / scale)
+            points += mesh["points"]
+            faces += mesh["faces"]
+        output = lod_path(path, level)
+        # 相對資產路徑（sublayer、材質等）以原檔為基準，輸出在同一目錄所以仍然有效
+        _export(layer, output)
+        try:
+            check_bounds(bounds, mesh_world_bounds(output), longest * 1e-6)
+        except ValueError:
+            os.remove(output)
+            raise
+        result["levels"].append({"level": level, "output": output, "points": points,
+                                 "faces": faces, "size": os.path.getsize(output), "cells": cells})
+
+    result["wrapper"] = write_variant_wrapper(path, len(ratios))
+    return result
+
+
+def _lod_job(path, ratios):
+    """平行處理的工作函式，錯誤會回報在結果中"""
+    try:
+        return generate_lods(path, ratios)
+    except Exception as e:
+        return {"path": path, "wrapper": None, "levels": [], "skipped": [], "points": 0,
+                "faces": 0, "size": os.path.getsize(path) if os.path.isfile(path) else 0,
+                "error": str(e) or e.__class__.__name__}
+
+
+def _mesh_points(path):
+    """只讀圖層統計頂點數，用於 --min-points 篩選"""
+    layer = Sdf.Layer.FindOrOpen(path)
+    total = 0
+
+    def visit(spec_path):
+        nonlocal total
+        if spec_path.IsPropertyPath() and spec_path.name == "points":
+            value = layer.GetAttributeAtPath(spec_path).default
+            total += len(value) if value is not None else 0
+
+    if layer:
+        layer.Traverse(Sdf.Path.absoluteRootPath, visit)
+    return total
+
+
+def print_report(results, elapsed):
+    """輸出各資產每一層的頂點、面數與檔案大小"""
+    failed = [r for r in results if r["error"]]
+    print("=" * 70)
+    print("LOD 產生 / LOD Generation")
+    print("=" * 70)
+    for result in results:
+        if result["error"]:
+            continue
+        print(f"  {os.path.relpath(result['path'])}")
+        print(f"    LOD0  {result['points']:>10,d} points {result['faces']:>10,d} faces"
+              f"  {result['size'] / (1024 * 1024):>7.2f} MB")
+        for level in result["levels"]:
+            ratio = level["faces"] / result["faces"] if result["faces"] else 0.0
+            print(f"    LOD{level['level']}  {level['points']:>10,d} points {level['faces']:>10,d} faces"
+                  f"  {level['size'] / (1024 * 1024):>7.2f} MB  ({ratio:.1%} faces,"
+                  f" {level['cells']} cells)")
+        for prim, reason in result["skipped"]:
+            print(f"    ⚠️  未減面 / Kept {prim}: {reason}")
+        print(f"    → {os.path.relpath(result['wrapper'])}")
+    print()
+    print(f"  資產 / Assets:   {len(results) - len(failed)}")
+    print(f"  失敗 / Failed:   {len(failed)}")
+    print(f"  耗時 / Elapsed:  {elapsed:.2f}s")
+    for result in failed:
+        print(f"    ✗ {result['path']}: {result['error']}")
+    print("=" * 70)
+
+
+def parse_args(argv=None):
+    """解析命令列參數"""
+    parser = argparse.ArgumentParser(
+        description="Decimate asset meshes into LOD levels and author them as an LOD variant set.",
+    )
+    parser.add_argument("inputs", nargs="+", help="asset files, directories or glob patterns")
+    parser.add_argument("--ratios", type=float, nargs="+", default=list(DEFAULT_RATIOS),
+                        help="target face count of each LOD level as a fraction of the original, "
+                             f"coarser levels last (default: {' '.join(map(str, DEFAULT_RATIOS))})")
+    parser.add_argument("--min-points", type=int, default=0,
+                        help="only process assets with at least this many mesh points")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of worker processes (default: number of CPU cores)")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+    if (any(not 0 < ratio < 1 for ratio in args.ratios)
+            or args.ratios != sorted(args.ratios, reverse=True)):
+        parser.error("--ratios must be between 0 and 1 and decreasing (finer levels first)")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    paths = []
+    for pattern in USD_PATTERNS:
+        paths.extend(collect_inputs(args.inputs, pattern))
+    paths = sorted({os.path.normpath(os.path.abspath(path)) for path in paths
+                    if OUTPUT_MARKER not in os.path.basename(path)})
+    if args.min_points:
+        paths = [path for path in paths if _mesh_points(path) >= args.min_points]
+    if not paths:
+        print(f"錯誤: 找不到符合的 USD 檔案: {' '.join(args.inputs)}")
+        return 1
+
+    start = time.perf_counter()
+    ratios = tuple(args.ratios)
+    jobs = max(1, min(args.jobs or os.cpu_count() or 1, len(paths)))
+    if jobs == 1:
+        results = [_lod_job(path, ratios) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_lod_job, paths, [ratios] * len(paths)))
+    print_report(results, time.perf_counter() - start)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 1 if any(result["error"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,621 @@
+#!/usr/bin/env python3
+"""
+Mesh 資料壓縮 / Lossless mesh data compaction
+
+Most of the crate data in Factory_Lite/SubUSDs is float3 arrays: points,
+normals and texture coordinates, often stored once per face corner. This pass
+rewrites the meshes of each layer with the same shape but fewer bytes, all in
+NumPy over the Vt arrays:
+
+1. unused data: the `normals` attribute when `primvars:normals` is authored
+   (the primvar wins, the attribute is never read), primvars whose length
+   does not match their interpolation, and primvars named with
+   --drop-primvars (e.g. extra UV sets the materials do not read)
+2. constant primvars: vertex/faceVarying/uniform primvars whose values are
+   all equal become a single constant value
+3. faceVarying to vertex: normals and primvars whose corners agree for every
+   vertex are stored per vertex instead of per corner
+4. vertex welding: vertices with identical positions and identical vertex
+   data (normals, primvars, velocities) are merged and faceVertexIndices is
+   remapped; skipped for subdivision surfaces, meshes without authored
+   normals, crease/corner indices and time-sampled or elementSize > 1
+   vertex data
+5. indexing: faceVarying/vertex/uniform primvars with many repeated values
+   are stored as unique values plus indices; indexed primvars drop duplicate
+   and unused values
+6. time samples: samples equal to both neighbours are dropped, constant
+   sample runs collapse to one sample (any attribute in the layer)
+
+Every step is lossless: after compaction each mesh's flattened corner
+positions, normals and primvars are compared with the original and the layer
+is not written if anything differs. --weld-tolerance and --half-normals
+(normal3h) trade exactness for size and relax the comparison accordingly.
+
+Usage:
+    python usd_mesh_compact.py Factory_Lite/SubUSDs [-j N] [--json report.json]
+    python usd_mesh_compact.py Factory_Lite/SubUSDs --in-place
+    python usd_mesh_compact.py Factory_Lite/SubUSDs/WalkwayC_01.usd --drop-primvars st1 st2
+
+Without --in-place the result is written next to each layer as
+<name>_compact.usd. The report lists bytes and stage open time (measured in a
+fresh interpreter, so the layer cache does not help) before and after.
+
+Note: This script requires the USD Python API (pxr) and NumPy.
+"""
+
+import argparse
+import json
+import os
+import subprocess  # nosec B404 - 以同一個直譯器量測開啟時間
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from convert_usd_to_usda import collect_inputs, print_helpful_message, temp_output_path
+
+try:
+    from pxr import Sdf, Vt
+except ImportError:
+    print_helpful_message()
+    sys.exit(1)
+
+try:
+    import numpy as np
+except ImportError:
+    print("錯誤: 需要 NumPy / Error: NumPy is required (pip install numpy)")
+    sys.exit(1)
+
+USD_PATTERNS = ("*.usd", "*.usda", "*.usdc")
+OUTPUT_SUFFIX = "_compact"
+# 建立索引後至少要省下的比例
+INDEX_MIN_SAVING = 0.2
+# 沒有 interpolation metadata、但每個頂點一個值的屬性
+VERTEX_ATTRS = ("velocities", "accelerations")
+TOPOLOGY_ATTRS = ("points", "faceVertexCounts", "faceVertexIndices")
+
+# 在新的直譯器中開啟 stage 並讀取所有 mesh 的 points，輸出耗時（秒）
+OPEN_TIMING_CODE = """
+import sys, time
+from pxr import Usd, UsdGeom
+start = time.perf_counter()
+stage = Usd.Stage.Open(sys.argv[1])
+for prim in stage.Traverse():
+    if prim.IsA(UsdGeom.Mesh):
+        UsdGeom.Mesh(prim).GetPointsAttr().Get()
+print(time.perf_counter() - start)
+"""
+
+
+def compact_path(path):
+    base, ext = os.path.splitext(path)
+    return f"{base}{OUTPUT_SUFFIX}{ext}"
+
+
+def _authored(attr):
+    """回傳屬性的預設值；未設定或被 block 時回傳 None"""
+    value = attr.default if attr is not None else None
+    return None if value is None or isinstance(value, Sdf.ValueBlock) else value
+
+
+def _like(original, array):
+    """以原屬性值的 Vt 型別包裝 NumPy 陣列"""
+    array = np.ascontiguousarray(array, dtype=np.asarray(original).dtype)
+    return type(original).FromNumpy(array)
+
+
+def _take(value, index):
+    """依索引取出陣列元素，保留原本的 Vt 型別"""
+    array = np.asarray(value)
+    if array.dtype.kind in "OUS":
+        return type(value)([value[int(i)] for i in index])
+    return _like(value, array[index])
+
+
+def _rows(value):
+    """把陣列的每個元素轉成一列位元組（np.void），用於完全相等的比較"""
+    array = np.ascontiguousarray(np.asarray(value))
+    if array.dtype.kind in "OUS":
+        array = np.array([str(item) for item in value]).astype("U")
+    array = array.reshape(len(array), -1)
+    return np.ascontiguousarray(array).view(np.dtype((np.void, array.dtype.itemsize * array.shape[1]))).reshape(-1)
+
+
+class MeshData:
+    """一個 Mesh prim spec 上的拓撲與逐元素資料"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.attrs = {attr.name: attr for attr in spec.attributes}
+        self.points = _authored(self.attrs.get("points"))
+        self.counts = _authored(self.attrs.get("faceVertexCounts"))
+        self.indices = _authored(self.attrs.get("faceVertexIndices"))
+
+    @property
+    def valid(self):
+        if self.points is None or self.counts is None or self.indices is None:
+            return False
+        if any(self.attrs[name].HasInfo("timeSamples") for name in TOPOLOGY_ATTRS):
+            return False
+        return int(np.asarray(self.counts).sum()) == len(self.indices)
+
+    def element_count(self, interpolation):
+        return {"vertex": len(self.points), "varying": len(self.points),
+                "faceVarying": len(self.indices), "uniform": len(self.counts)}.get(interpolation)
+
+    def interpolation(self, attr):
+        if attr.HasInfo("interpolation"):
+            return attr.GetInfo("interpolation")
+        if attr.name == "normals" or attr.name in VERTEX_ATTRS:
+            return "vertex"
+        return "constant" if attr.name.startswith("primvars:") else None
+
+    def data_attrs(self, include_constant=False):
+        """回傳 (屬性, interpolation, indices 屬性或 None)；只含有預設值的逐元素陣列"""
+        result = []
+        for name, attr in self.attrs.items():
+            if name in TOPOLOGY_ATTRS or name.endswith(":indices") or name == "extent":
+                continue
+            if attr.HasInfo("timeSamples") or _authored(attr) is None:
+                continue
+            interpolation = self.interpolation(attr)
+            if interpolation is None or (interpolation == "constant" and not include_constant):
+                continue
+            if attr.HasInfo("elementSize") and attr.GetInfo("elementSize") != 1:
+                continue
+            indices = self.attrs.get(f"{name}:indices")
+            result.append((attr, interpolation, indices if _authored(indices) is not None else None))
+        return result
+
+    def flattened(self, attr, indices):
+        value = np.asarray(_authored(attr))
+        return value[np.asarray(_authored(indices))] if indices is not None else value
+
+    def snapshot(self):
+        """回傳每個 corner 的位置與各屬性的展開值，用於壓縮前後比對"""
+        indices = np.asarray(self.indices)
+        snapshot = {"points": np.asarray(self.points)[indices]}
+        for attr, interpolation, attr_indices in self.data_attrs(include_constant=True):
+            values = np.atleast_1d(self.flattened(attr, attr_indices))
+            if interpolation == "constant":
+                # constant 與「所有值都相同」在展開後相等
+                snapshot[attr.name] = np.repeat(values[:1], len(indices), axis=0)
+                continue
+            if len(values) != self.element_count(interpolation):
+                continue
+            if interpolation in ("vertex", "varying"):
+                values = values[indices]
+            elif interpolation == "uniform":
+                values = np.repeat(values, np.asarray(self.counts), axis=0)
+            snapshot[attr.name] = values
+        return snapshot
+
+
+def _remove(spec, attr, stats, key):
+    spec.RemoveProperty(attr)
+    stats[key] = stats.get(key, 0) + 1
+
+
+def remove_unused(mesh, drop, stats):
+    """移除不會被讀取的資料；拓撲無效時只移除確定不會被讀取的部分"""
+    if "primvars:normals" in mesh.attrs and "normals" in mesh.attrs:
+        _remove(mesh.spec, mesh.attrs.pop("normals"), stats, "shadowed normals")
+    for name in list(mesh.attrs):
+        attr = mesh.attrs.get(name)
+        if attr is None or not name.startswith("primvars:") or name.endswith(":indices"):
+            continue
+        indices = mesh.attrs.get(f"{name}:indices")
+        if name[len("primvars:"):] in drop:
+            _remove(mesh.spec, mesh.attrs.pop(name), stats, "dropped primvars")
+            if indices is not None:
+                mesh.spec.RemoveProperty(mesh.attrs.pop(f"{name}:indices"))
+            continue
+        if attr.HasInfo("timeSamples") or _authored(attr) is None:
+            continue
+        interpolation = mesh.interpolation(attr)
+        if interpolation in (None, "constant") or not hasattr(_authored(attr), "__len__"):
+            continue
+        if not mesh.valid:
+            continue
+        length = len(_authored(indices)) if _authored(indices) is not None else len(_authored(attr))
+        element_size = attr.GetInfo("elementSize") if attr.HasInfo("elementSize") else 1
+        if length != mesh.element_count(interpolation) * element_size:
+            # 長度與 interpolation 不符的 primvar 會被 renderer 忽略
+            _remove(mesh.spec, mesh.attrs.pop(name), stats, "invalid primvars")
+            if indices is not None:
+                mesh.spec.RemoveProperty(mesh.attrs.pop(f"{name}:indices"))
+
+
+def collapse_constant(mesh, stats):
+    """所有值都相同的 primvar 改為 constant"""
+    for attr, interpolation, indices in mesh.data_attrs():
+        if not attr.name.startswith("primvars:"):
+            continue
+        rows = _rows(mesh.flattened(attr, indices))
+        if len(rows) == 0 or not (rows == rows[0]).all():
+            continue
+        first = int(np.asarray(_authored(indices))[0]) if indices is not None else 0
+        attr.default = _take(_authored(attr), [first])
+        attr.SetInfo("interpolation", "constant")
+        if indices is not None:
+            mesh.spec.RemoveProperty(mesh.attrs.pop(indices.name))
+        stats["constant primvars"] = stats.get("constant primvars", 0) + 1
+
+
+def face_varying_to_vertex(mesh, stats):
+    """每個頂點所有 corner 值都相同的 faceVarying 資料改為逐頂點"""
+    corners = np.asarray(mesh.indices)
+    order = np.argsort(corners, kind="stable")
+    sorted_vertices = corners[order]
+    same_vertex = sorted_vertices[1:] == sorted_vertices[:-1]
+    for attr, interpolation, indices in mesh.data_attrs():
+        if interpolation != "faceVarying":
+            continue
+        values = np.asarray(_authored(indices)) if indices is not None else _rows(_authored(attr))
+        if len(values) != len(corners):
+            continue
+        ordered = values[order]
+        if not (ordered[1:] == ordered[:-1])[same_vertex].all():
+            continue
+        # 每個頂點取其任一 corner；未被使用的頂點取第一個 corner（不影響結果）
+        per_vertex = np.zeros(len(mesh.points), dtype=np.int64)
+        per_vertex[corners[::-1]] = np.arange(len(corners))[::-1]
+        if indices is not None:
+            indices.default = _take(_authored(indices), per_vertex)
+        else:
+            attr.default = _take(_authored(attr), per_vertex)
+        attr.SetInfo("interpolation", "vertex")
+        stats["faceVarying to vertex"] = stats.get("faceVarying to vertex", 0) + 1
+
+
+def weld_skip_reason(mesh):
+    """
+    回傳不能合併頂點的原因，可以合併時回傳空字串
+
+    合併會把接縫的兩側接起來，細分曲面與未設定 normals 時計算出的法線都會改變；
+    頂點索引（crease/corner）、time sample 與 elementSize > 1 的逐頂點資料也不會被重新對應。
+    """
+    scheme = mesh.spec.attributes.get("subdivisionScheme")
+    if _authored(scheme) != "none":
+        return "subdivision surface"
+    if _authored(mesh.attrs.get("normals")) is None and _authored(mesh.attrs.get("primvars:normals")) is None:
+        return "computed normals"
+    for name in ("creaseIndices", "cornerIndices"):
+        value = _authored(mesh.attrs.get(name))
+        if value is not None and len(value):
+            return name
+    for name, attr in mesh.attrs.items():
+        if name in TOPOLOGY_ATTRS or mesh.interpolation(attr) not in ("vertex", "varying"):
+            continue
+        if attr.HasInfo("timeSamples"):
+            return "time-sampled vertex data"
+        if attr.HasInfo("elementSize") and attr.GetInfo("elementSize") != 1:
+            return "elementSize > 1"
+    return ""
+
+
+def weld_vertices(mesh, tolerance, stats):
+    """合併位置與逐頂點資料都相同的頂點"""
+    reason = weld_skip_reason(mesh)
+    if reason:
+        key = f"weld skipped ({reason})"
+        stats[key] = stats.get(key, 0) + 1
+        return
+    points = np.asarray(mesh.points)
+    if tolerance > 0:
+        key_columns = [_rows(np.round(points / tolerance).astype(np.int64))]
+    else:
+        key_columns = [_rows(points)]
+    vertex_attrs = []
+    for attr, interpolation, indices in mesh.data_attrs():
+        if interpolation not in ("vertex", "varying"):
+            continue
+        values = _authored(indices) if indices is not None else _authored(attr)
+        if len(values) != len(points):
+            continue
+        vertex_attrs.append((attr, indices))
+        key_columns.append(_rows(values))
+    # 依所有欄位分組：逐欄取得群組編號後再組合
+    labels = np.zeros(len(points), dtype=np.int64)
+    for column in key_columns:
+        _, column_labels = np.unique(column, return_inverse=True)
+        _, labels = np.unique(np.stack((labels, column_labels.reshape(-1)), axis=1), axis=0,
+                              return_inverse=True)
+        labels = labels.reshape(-1)
+    _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    if len(first) == len(points):
+        return
+    # 保持原本的頂點順序
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    keep = first[order]
+    remap = rank[inverse.reshape(-1)]
+
+    mesh.attrs["points"].default = mesh.points = _take(mesh.points, keep)
+    mesh.attrs["faceVertexIndices"].default = mesh.indices = _like(
+        mesh.indices, remap[np.asarray(mesh.indices)])
+    for attr, indices in vertex_attrs:
+        target = indices if indices is not None else attr
+        target.default = _take(_authored(target), keep)
+    stats["welded vertices"] = stats.get("welded vertices", 0) + len(points) - len(keep)
+
+
+def index_primvars(mesh, stats):
+    """重複值多的 primvar 改用 indices；已有 indices 的移除重複與未使用的值"""
+    for attr, interpolation, indices in mesh.data_attrs():
+        if not attr.name.startswith("primvars:"):
+            continue
+        values = _authored(attr)
+        rows = _rows(values)
+        if indices is not None:
+            used, remapped = np.unique(np.asarray(_authored(indices)), return_inverse=True)
+            unique_rows, first, inverse = np.unique(rows[used], return_index=True, return_inverse=True)
+            if len(unique_rows) == len(values):
+                continue
+            attr.default = _take(values, used[first])
+            indices.default = _like(_authored(indices), inverse.reshape(-1)[remapped.reshape(-1)])
+            stats["deduplicated primvars"] = stats.get("deduplicated primvars", 0) + 1
+            continue
+        _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+        item_size = np.asarray(values).itemsize * max(1, int(np.prod(np.asarray(values).shape[1:])))
+        before = len(values) * item_size
+        after = len(first) * item_size + len(values) * 4
+        if after > before * (1.0 - INDEX_MIN_SAVING):
+            continue
+        order = np.argsort(first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        attr.default = _take(values, first[order])
+        # 可能已有未設定值或被 block 的 indices 屬性
+        indices_spec = mesh.attrs.get(f"{attr.name}:indices") or Sdf.AttributeSpec(
+            mesh.spec, f"{attr.name}:indices", Sdf.ValueTypeNames.IntArray)
+        indices_spec.default = Vt.IntArray.FromNumpy(rank[inverse.reshape(-1)].astype(np.int32))
+        mesh.attrs[indices_spec.name] = indices_spec
+        stats["indexed primvars"] = stats.get("indexed primvars", 0) + 1
+
+
+def half_normals(mesh, stats):
+    """normal3f 改為 normal3h（有損，約 3 位有效數字）"""
+    for name in ("normals", "primvars:normals"):
+        attr = mesh.attrs.get(name)
+        if attr is None or _authored(attr) is None or attr.typeName != Sdf.ValueTypeNames.Normal3fArray:
+            continue
+        values = np.asarray(_authored(attr), dtype=np.float16)
+        info = {key: attr.GetInfo(key) for key in attr.ListInfoKeys()
+                if key not in ("default", "typeName")}
+        mesh.spec.RemoveProperty(attr)
+        half = Sdf.AttributeSpec(mesh.spec, name, Sdf.ValueTypeNames.Normal3hArray)
+        for key, value in info.items():
+            half.SetInfo(key, value)
+        half.default = Vt.Vec3hArray.FromNumpy(np.ascontiguousarray(values))
+        mesh.attrs[name] = half
+        stats["half normals"] = stats.get("half normals", 0) + 1
+
+
+def prune_time_samples(layer, stats):
+    """移除與前後相同的 time sample；整段相同時只保留一個"""
+    paths = []
+
+    def visit(path):
+        if path.IsPropertyPath() and layer.GetNumTimeSamplesForPath(path) > 1:
+            paths.append(path)
+
+    layer.Traverse(Sdf.Path.absoluteRootPath, visit)
+    for path in paths:
+        times = list(layer.ListTimeSamplesForPath(path))
+        rows = [_rows(np.atleast_1d(np.asarray(layer.QueryTimeSample(path, t)))).tobytes()
+                if hasattr(layer.QueryTimeSample(path, t), "__len__")
+                else repr(layer.QueryTimeSample(path, t)) for t in times]
+        if all(row == rows[0] for row in rows):
+            redundant = times[1:]
+        else:
+            redundant = [times[i] for i in range(1, len(times) - 1)
+                         if rows[i] == rows[i - 1] and rows[i] == rows[i + 1]]
+        for t in redundant:
+            layer.EraseTimeSample(path, t)
+        if redundant:
+            stats["time samples"] = stats.get("time samples", 0) + len(redundant)
+
+
+def _verify(before, after, tolerance, half=False):
+    """
+    比對壓縮前後每個 corner 的展開值；回傳不一致（含消失或長度不同）的屬性名稱
+
+    只有 points 容許 --weld-tolerance 的誤差，normals 只在 --half-normals 時容許 1e-3。
+    """
+    mismatched = []
+    for name, values in before.items():
+        other = after.get(name)
+        if other is None or values.shape != other.shape:
+            mismatched.append(name)
+            continue
+        if values.dtype.kind == "f" or other.dtype.kind == "f":
+            atol = tolerance if name == "points" else (1e-3 if half and "normals" in name else 0.0)
+            if not np.allclose(values, other, rtol=0.0, atol=atol):
+                mismatched.append(name)
+        elif not np.array_equal(values, other):
+            mismatched.append(name)
+    return mismatched
+
+
+def compact_layer(layer, drop=(), weld_tolerance=0.0, half=False):
+    """
+    壓縮圖層中所有 Mesh spec 並移除多餘的 time sample（直接修改 layer）
+
+    Returns:
+        dict: 各步驟的計數
+    """
+    stats = {}
+    meshes = []
+
+    def visit(path):
+        spec = layer.GetObjectAtPath(path)
+        if isinstance(spec, Sdf.PrimSpec) and spec.typeName == "Mesh":
+            meshes.append(spec)
+
+    layer.Traverse(Sdf.Path.absoluteRootPath, visit)
+    for spec in meshes:
+        mesh = MeshData(spec)
+        remove_unused(mesh, drop, stats)
+        if not mesh.valid:
+            continue
+        before = mesh.snapshot()
+        collapse_constant(mesh, stats)
+        face_varying_to_vertex(mesh, stats)
+        weld_vertices(mesh, weld_tolerance, stats)
+        index_primvars(mesh, stats)
+        if half:
+            half_normals(mesh, stats)
+        after = MeshData(spec).snapshot()
+        mismatched = _verify(before, after, weld_tolerance, half)
+        if mismatched:
+            raise ValueError(f"{spec.path} 壓縮後資料不一致: {', '.join(mismatched)}")
+    prune_time_samples(layer, stats)
+    stats["meshes"] = len(meshes)
+    return stats
+
+
+def measure_open(path):
+    """在新的直譯器中量測開啟 stage 並讀取 points 的秒數；失敗時回傳 None"""
+    try:
+        output = subprocess.run(  # nosec B603 - 固定的程式碼與本機路徑
+            [sys.executable, "-c", OPEN_TIMING_CODE, path],
+            capture_output=True, text=True, timeout=600, check=True,
+        ).stdout
+        return float(output.strip().splitlines()[-1])
+    except (subprocess.SubprocessError, OSError, ValueError, IndexError):
+        return None
+
+
+def compact_file(path, output_path, drop=(), weld_tolerance=0.0, half=False, timing=True):
+    """
+    壓縮一個 USD 檔案並寫到 output_path（可與 path 相同）
+
+    Returns:
+        dict: path, output, bytes_before/after, open_before/after, stats, error
+    """
+    result = {"path": path, "output": output_path, "bytes_before": os.path.getsize(path),
+              "bytes_after": None, "open_before": None, "open_after": None, "stats": {}, "error": ""}
+    if timing:
+        result["open_before"] = measure_open(path)
+    source = Sdf.Layer.FindOrOpen(path)
+    if not source:
+        result["error"] = f"無法開啟 USD 檔案 {path}"
+        return result
+    # 在匿名圖層上修改，原始圖層保持不變；相對路徑以原檔位置為準，輸出在同一目錄
+    layer = Sdf.Layer.CreateAnonymous(os.path.splitext(path)[1])
+    layer.TransferContent(source)
+    result["stats"] = compact_layer(layer, drop, weld_tolerance, half)
+
+    tmp_path = temp_output_path(output_path)
+    try:
+        if not layer.Export(tmp_path):
+            raise ValueError(f"無法匯出 {output_path}")
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    result["bytes_after"] = os.path.getsize(output_path)
+    if timing:
+        result["open_after"] = measure_open(output_path)
+    return result
+
+
+def _compact_job(path, output_path, drop, weld_tolerance, half, timing):
+    """平行處理的工作函式，錯誤會回報在結果中"""
+    try:
+        return compact_file(path, output_path, drop, weld_tolerance, half, timing)
+    except Exception as e:
+        return {"path": path, "output": output_path, "bytes_before": os.path.getsize(path),
+                "bytes_after": None, "open_before": None, "open_after": None, "stats": {},
+                "error": str(e) or e.__class__.__name__}
+
+
+def _format_seconds(seconds):
+    return f"{seconds * 1000:.0f} ms" if seconds is not None else "-"
+
+
+def print_report(results, elapsed):
+    """輸出每個檔案壓縮前後的大小與開啟時間"""
+    done = [r for r in results if not r["error"]]
+    failed = [r for r in results if r["error"]]
+    print("=" * 70)
+    print("Mesh 壓縮 / Mesh Compaction")
+    print("=" * 70)
+    print(f"  {'檔案 / Layer':<34} {'Before':>9} {'After':>9} {'Saved':>6} {'Open':>17}")
+    for result in done:
+        before, after = result["bytes_before"], result["bytes_after"]
+        saved = 1.0 - after / before if before else 0.0
+        open_times = f"{_format_seconds(result['open_before'])} → {_format_seconds(result['open_after'])}"
+        print(f"  {os.path.basename(result['path']):<34} {before / (1024 * 1024):>7.2f}MB"
+              f" {after / (1024 * 1024):>7.2f}MB {saved:>6.1%} {open_times:>17}")
+    totals = {}
+    for result in done:
+        for key, count in result["stats"].items():
+            totals[key] = totals.get(key, 0) + count
+    before = sum(r["bytes_before"] for r in done)
+    after = sum(r["bytes_after"] for r in done)
+    print()
+    for key in sorted(totals):
+        print(f"  {key + ':':<28} {totals[key]:,d}")
+    print(f"  總大小 / Total:             {before / (1024 * 1024):.2f} MB → {after / (1024 * 1024):.2f} MB")
+    print(f"  失敗 / Failed:              {len(failed)}")
+    print(f"  耗時 / Elapsed:             {elapsed:.2f}s")
+    for result in failed:
+        print(f"    ✗ {result['path']}: {result['error']}")
+    print("=" * 70)
+
+
+def parse_args(argv=None):
+    """解析命令列參數"""
+    parser = argparse.ArgumentParser(
+        description="Losslessly compact mesh data (unused primvars, welding, indexing, time samples).",
+    )
+    parser.add_argument("inputs", nargs="+", help="USD files, directories or glob patterns")
+    parser.add_argument("--in-place", action="store_true",
+                        help="replace the input files (default: write <name>_compact.usd)")
+    parser.add_argument("--drop-primvars", nargs="+", default=[], metavar="NAME",
+                        help="primvars to remove, without the 'primvars:' prefix (e.g. st1 st2)")
+    parser.add_argument("--weld-tolerance", type=float, default=0.0,
+                        help="also weld vertices closer than this (lossy, default: exact matches only)")
+    parser.add_argument("--half-normals", action="store_true",
+                        help="store normals as normal3h (lossy, about 3 significant digits)")
+    parser.add_argument("--no-timing", action="store_true", help="skip the open time measurement")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of worker processes (default: number of CPU cores)")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    paths = []
+    for pattern in USD_PATTERNS:
+        paths.extend(collect_inputs(args.inputs, pattern))
+    paths = sorted({os.path.normpath(os.path.abspath(path)) for path in paths
+                    if not os.path.splitext(path)[0].endswith(OUTPUT_SUFFIX)})
+    if not paths:
+        print(f"錯誤: 找不到符合的 USD 檔案: {' '.join(args.inputs)}")
+        return 1
+
+    outputs = paths if args.in_place else [compact_path(path) for path in paths]
+    count = len(paths)
+    start = time.perf_counter()
+    jobs = max(1, min(args.jobs or os.cpu_count() or 1, count))
+    job_args = (paths, outputs, [tuple(args.drop_primvars)] * count, [args.weld_tolerance] * count,
+                [args.half_normals] * count, [not args.no_timing] * count)
+    if jobs == 1:
+        results = list(map(_compact_job, *job_args))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_compact_job, *job_args))
+    print_report(results, time.perf_counter() - start)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 1 if any(result["error"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
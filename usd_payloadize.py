@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+重量級 reference 轉為 payload / Convert heavy references into payloads
+
+A layout that pulls its SubUSDs in as references composes every prop when
+the stage opens. Payloads are
+composed only when they are loaded, which lets a viewer open the stage with
+nothing loaded (omni.usd.UsdContextInitialLoadSet.LOAD_NONE), show the shell
+and load the heavy props afterwards.
+
+This tool moves the external references authored in the layout's layer stack
+(the root layer and its sublayers, e.g. Factory_Lite's SetDressing.usd) into
+the payload list of the same prim when the referenced asset is at least
+--min-size large. The weight of an asset is taken from the asset index
+(usd_asset_index.py): the layer itself plus every layer it reaches through
+sublayers, references and payloads, each counted once. Layers that are not
+in the index fall back to their file size.
+
+Rules:
+- a prim is converted only when all of its references are external and
+  their total weight reaches the threshold; internal references (no asset
+  path) would change meaning as payloads and are left alone
+- the list-op kind (explicit / prepended / appended) is kept, and the moved
+  items are placed before the prim's existing payloads, so the strength
+  order between them does not change
+- prims whose edits cannot be moved as they are skipped: legacy
+  added/ordered items, deleted references, and explicit references with
+  prepended/appended payloads (or the reverse)
+- reference customData has no payload equivalent and is dropped (reported)
+
+Usage:
+    python usd_asset_index.py index Factory_Lite
+    python usd_payloadize.py Factory_Lite/Factory_Lite.usd [--min-size 1] [--by size|memory]
+    python usd_payloadize.py Factory_Lite/Factory_Lite.usd --dry-run --json report.json
+
+The result is written next to the layout (default: <layout>_payloads.usd).
+Sublayers with converted references are written next to themselves as
+<sublayer>_payloads.usd and the new layout points at them; source files are
+never modified. The output must stay in the layout's directory because
+relative asset paths are copied as authored.
+
+Note: This script requires the USD Python API (pxr).
+"""
+
+import argparse
+import json
+import os
+import posixpath
+import sys
+
+from convert_usd_to_usda import print_helpful_message, temp_output_path
+from usd_asset_index import DEFAULT_DB, AssetIndex, _display_path, _format_bytes
+
+try:
+    from pxr import Sdf
+except ImportError:
+    print_helpful_message()
+    sys.exit(1)
+
+DEFAULT_MIN_SIZE_MB = 1.0
+OUTPUT_SUFFIX = "_payloads"
+# 計算權重時沿用的組合弧
+WEIGHT_ARCS = ("sublayer", "reference", "payload")
+# 轉換時保留的 list-op 種類
+LIST_OP_KINDS = ("explicitItems", "prependedItems", "appendedItems")
+
+
+class AssetWeights:
+    """
+    以資產索引計算資產（含其相依圖層）的大小
+
+    索引不存在或圖層未被索引時，以檔案大小代替。
+    """
+
+    def __init__(self, db_path=DEFAULT_DB, by="size"):
+        self.by = by
+        self.layers = {}
+        self.arcs = {}
+        self.indexed = False
+        if db_path and os.path.exists(db_path):
+            index = AssetIndex(db_path, readonly=True)
+            try:
+                self.layers = {row["path"]: row[by] for row in index.query(
+                    f"SELECT path, {by} FROM layers WHERE error = ''")}
+                for row in index.query(
+                        "SELECT layers.path AS path, arcs.resolved AS resolved FROM arcs"
+                        " JOIN layers ON layers.id = arcs.layer_id WHERE arcs.kind IN (?, ?, ?)",
+                        WEIGHT_ARCS):
+                    self.arcs.setdefault(row["path"], set()).add(row["resolved"])
+            finally:
+                index.close()
+            self.indexed = True
+        self.missing = set()
+        self._cache = {}
+
+    def _layer_weight(self, path):
+        if path in self.layers:
+            return self.layers[path]
+        self.missing.add(path)
+        # 未索引的圖層沒有陣列資料統計，兩種模式都以檔案大小估計
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def weight(self, path):
+        """回傳 path 與其遞移相依圖層的總大小（每個圖層只計一次）"""
+        if path in self._cache:
+            return self._cache[path]
+        seen = set()
+        pending = [path]
+        total = 0
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            total += self._layer_weight(current)
+            pending.extend(self.arcs.get(current, ()))
+        self._cache[path] = total
+        return total
+
+
+def _resolve(layer, asset_path):
+    resolved = layer.ComputeAbsolutePath(asset_path)
+    # omniverse:// 等 URL 不做路徑正規化，與資產索引一致
+    return resolved if "://" in resolved else os.path.normpath(resolved)
+
+
+def plan_payloads(layer, weights, min_bytes):
+    """
+    找出圖層中應轉為 payload 的 prim
+
+    Returns:
+        tuple: (converted, skipped)；converted 為 {"layer", "prim", "assets", "bytes"} 清單，
+        skipped 為 {"layer", "prim", "reason", "bytes"} 清單
+    """
+    converted = []
+    skipped = []
+
+    def visit(spec_path):
+        spec = layer.GetObjectAtPath(spec_path)
+        if not isinstance(spec, Sdf.PrimSpec):
+            return
+        items = spec.referenceList.GetAddedOrExplicitItems()
+        if not items:
+            return
+        entry = {"layer": layer.realPath, "prim": str(spec_path)}
+        if any(not item.assetPath for item in items):
+            skipped.append(dict(entry, reason="internal reference", bytes=0))
+            return
+        conflict = _list_op_conflict(spec)
+        if conflict:
+            skipped.append(dict(entry, reason=conflict, bytes=0))
+            return
+        assets = [_resolve(layer, item.assetPath) for item in items]
+        total = sum(weights.weight(asset) for asset in assets)
+        if total < min_bytes:
+            skipped.append(dict(entry, reason="below threshold", bytes=total))
+            return
+        converted.append(dict(entry, assets=assets, bytes=total,
+                              dropped_custom_data=any(item.customData for item in items)))
+
+    layer.Traverse(Sdf.Path.absoluteRootPath, visit)
+    return converted, skipped
+
+
+def _list_op_conflict(spec):
+    """
+    回傳 reference 無法原樣搬到 payload list 的原因，可以搬移時回傳空字串
+
+    ClearEdits 會一併清掉 added/ordered（舊式 list-op）與 deleted 項目；
+    explicit 與 prepended/appended 不能並存，插入另一種會清掉既有的 payload。
+    """
+    references = spec.referenceList
+    if len(references.addedItems) or len(references.orderedItems):
+        return "legacy list-op"
+    if len(references.deletedItems):
+        return "deleted references"
+    payloads = spec.payloadList
+    has_payloads = any(len(getattr(payloads, kind)) for kind in
+                       LIST_OP_KINDS + ("deletedItems", "addedItems", "orderedItems"))
+    if has_payloads and payloads.isExplicit != references.isExplicit:
+        return "mixed list-op kinds"
+    return ""
+
+
+def move_references_to_payloads(spec):
+    """把 prim spec 的 reference 移到 payload list（保留 list-op 種類與強度順序）"""
+    for kind in LIST_OP_KINDS:
+        references = list(getattr(spec.referenceList, kind))
+        if not references:
+            continue
+        payloads = getattr(spec.payloadList, kind)
+        for position, reference in enumerate(references):
+            payloads.insert(position, Sdf.Payload(reference.assetPath, reference.primPath,
+                                                  reference.layerOffset))
+    spec.referenceList.ClearEdits()
+
+
+def _payloads_path(path):
+    base, ext = os.path.splitext(path)
+    return f"{base}{OUTPUT_SUFFIX}{ext}"
+
+
+def _export(layer, output_path):
+    """原子地匯出圖層；只修改記憶體中的圖層，原始檔案不會被儲存"""
+    tmp_path = temp_output_path(output_path)
+    try:
+        if not layer.Export(tmp_path):
+            raise ValueError(f"無法匯出 {output_path}")
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def payloadize(layout_path, output_path=None, min_bytes=0, weights=None, dry_run=False):
+    """
+    轉換 layout 圖層堆疊（根圖層與其 sublayer）中的重量級 reference 並寫出新檔
+
+    有改動的 sublayer 寫成同目錄的 <sublayer>_payloads.usd，上層圖層的 subLayers
+    改為指向新檔；沒有改動的 sublayer 保持原樣。
+
+    Returns:
+        dict: output, written（寫出的檔案）, converted, skipped,
+        bytes（轉為延遲載入的總大小）, unindexed
+    """
+    if output_path is None:
+        output_path = _payloads_path(layout_path)
+    weights = weights or AssetWeights(None)
+    same_directory = (os.path.dirname(os.path.abspath(output_path))
+                      == os.path.dirname(os.path.abspath(layout_path)))
+    if not same_directory:
+        # Export 不會改寫相對資產路徑，換目錄後 reference 會失效
+        raise ValueError(f"輸出檔必須與 layout 在同一目錄: {output_path}")
+
+    root = Sdf.Layer.FindOrOpen(layout_path)
+    if not root:
+        raise ValueError(f"無法開啟 layout {layout_path}")
+
+    result = {"output": None if dry_run else output_path, "written": [],
+              "converted": [], "skipped": []}
+    # 圖層路徑 -> 改寫後的檔案（未改動為 None）；共用的 sublayer 只處理一次
+    processed = {}
+
+    def process(layer, target):
+        if layer.realPath in processed:
+            return processed[layer.realPath]
+        processed[layer.realPath] = None
+        converted, skipped = plan_payloads(layer, weights, min_bytes)
+        result["converted"].extend(converted)
+        result["skipped"].extend(skipped)
+
+        replaced = {}
+        for position, sublayer_path in enumerate(layer.subLayerPaths):
+            resolved = _resolve(layer, sublayer_path)
+            sublayer = None if "://" in resolved else Sdf.Layer.FindOrOpen(resolved)
+            if sublayer and process(sublayer, _payloads_path(resolved)):
+                replaced[position] = posixpath.join(
+                    posixpath.dirname(sublayer_path),
+                    os.path.basename(_payloads_path(resolved)))
+
+        if dry_run or not (converted or replaced or target == output_path):
+            return None
+        for entry in converted:
+            move_references_to_payloads(layer.GetPrimAtPath(entry["prim"]))
+        for position, sublayer_path in replaced.items():
+            # 取代路徑會重設該位置的 layer offset，需要還原
+            offset = layer.subLayerOffsets[position]
+            layer.subLayerPaths[position] = sublayer_path
+            layer.subLayerOffsets[position] = offset
+        _export(layer, target)
+        result["written"].append(target)
+        processed[layer.realPath] = target
+        return target
+
+    process(root, output_path)
+    result["bytes"] = sum(entry["bytes"] for entry in result["converted"])
+    result["unindexed"] = sorted(weights.missing)
+    return result
+
+
+def print_report(result, weights, min_bytes):
+    """輸出轉換結果"""
+    print("=" * 70)
+    print("Payload 轉換 / Payloadize")
+    print("=" * 70)
+    for entry in result["converted"]:
+        assets = ", ".join(_display_path(asset) for asset in entry["assets"])
+        print(f"  → {_display_path(entry['layer'])}:{entry['prim']}  {_format_bytes(entry['bytes'])}"
+              f"  {assets}")
+        if entry["dropped_custom_data"]:
+            print("    ⚠️  reference customData 無法保留 / customData dropped")
+    print()
+    below = [entry for entry in result["skipped"] if entry["reason"] == "below threshold"]
+    internal = [entry for entry in result["skipped"] if entry["reason"] == "internal reference"]
+    source = f"索引 / index ({weights.by})" if weights.indexed else "檔案大小 / file size"
+    print(f"  門檻 / Threshold:           {_format_bytes(min_bytes)} ({source})")
+    print(f"  轉為 payload / Converted:   {len(result['converted'])}"
+          f" ({_format_bytes(result['bytes'])})")
+    print(f"  低於門檻 / Below threshold: {len(below)}")
+    print(f"  內部 reference / Internal:  {len(internal)}")
+    for entry in result["skipped"]:
+        if entry["reason"] not in ("below threshold", "internal reference"):
+            print(f"  ⚠️  略過 / Skipped {_display_path(entry['layer'])}:{entry['prim']} ({entry['reason']})")
+    if result["unindexed"]:
+        print(f"  未索引 / Not indexed:       {len(result['unindexed'])}"
+              " (python usd_asset_index.py index ...)")
+    for path in result["written"]:
+        print(f"✓ 已寫入 / Written: {path}")
+    print("=" * 70)
+
+
+def parse_args(argv=None):
+    """解析命令列參數"""
+    parser = argparse.ArgumentParser(
+        description="Turn heavy references of a layout into payloads so the stage can open unloaded.",
+    )
+    parser.add_argument("layout", help="layout file whose root layer references are converted")
+    parser.add_argument("-o", "--output", help="output path (default: <layout>_payloads.usd)")
+    parser.add_argument("--min-size", type=float, default=DEFAULT_MIN_SIZE_MB, metavar="MB",
+                        help=f"minimum asset weight in MB (default: {DEFAULT_MIN_SIZE_MB})")
+    parser.add_argument("--by", choices=("size", "memory"), default="size",
+                        help="weigh assets by on-disk size or by array data size (default: size)")
+    parser.add_argument("--db", default=DEFAULT_DB,
+                        help=f"asset index database (default: {DEFAULT_DB})")
+    parser.add_argument("--dry-run", action="store_true", help="only report, do not write a file")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not os.path.isfile(args.layout):
+        print(f"錯誤: 找不到檔案 {args.layout}")
+        return 1
+    if not os.path.exists(args.db):
+        print(f"⚠️  找不到資產索引 {args.db}，改用檔案大小 / index not found, using file sizes")
+
+    weights = AssetWeights(args.db, args.by)
+    min_bytes = int(args.min_size * 1024 * 1024)
+    try:
+        result = payloadize(args.layout, args.output, min_bytes, weights, args.dry_run)
+    except ValueError as e:
+        print(f"✗ 錯誤: {e}")
+        return 1
+    print_report(result, weights, min_bytes)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
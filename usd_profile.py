@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+啟動與階段計時模組 / Startup and phase profiler for the conversion CLIs
+
+Records where the wall time of a script goes: interpreter startup (process
+start until the profiler is started), importing pxr, plugin registration,
+layer open, composition, serialization and so on. With --profile-imports every
+module import is timed as well, in the spirit of `python -X importtime`
+(self and cumulative microseconds, nested by the import that triggered it).
+
+The trace is written as JSON when the process exits. Besides the summary
+fields it contains "traceEvents" in the Chrome trace event format, so the file
+can be opened directly in chrome://tracing or https://ui.perfetto.dev.
+
+Usage (in a script, before the expensive imports):
+    import usd_profile
+    usd_profile.start_from_argv()          # consumes --profile[=PATH] / --profile-imports
+    with usd_profile.phase("import pxr"):
+        from pxr import Usd
+
+Library code only calls usd_profile.phase(); it is a no-op unless a profiler
+was started.
+"""
+
+import atexit
+import importlib.abc
+import json
+import os
+import sys
+import time
+
+PROFILE_OPTION = "--profile"
+IMPORTS_OPTION = "--profile-imports"
+TRACE_SUFFIX = ".profile.json"
+# 摘要中列出的最耗時匯入模組數量
+TOP_IMPORTS = 15
+
+_active = None
+
+
+class _NullPhase:
+    """未啟用剖析時使用的空 context manager"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def process_age():
+    """
+    回傳本行程已執行的秒數，僅 Linux 支援；無法取得時回傳 None
+
+    /proc/self/stat 的 starttime 與 /proc/uptime 都以開機時間為原點（解析度約 10ms）。
+    """
+    try:
+        with open("/proc/self/stat", "r") as f:
+            # comm 欄位可能含空白，從最後一個 ")" 之後開始切割
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class _Phase:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._stack.append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        self.profiler._stack.pop()
+        self.profiler.phases.append({
+            "name": self.name,
+            "start": self.profiler._offset(self.start),
+            "seconds": end - self.start,
+            "depth": len(self.profiler._stack),
+        })
+        return False
+
+
+class _TimedLoader:
+    """包裝原本的 loader，量測模組執行（含其觸發的巢狀匯入）的時間"""
+
+    def __init__(self, loader, tracer, find_seconds):
+        self._loader = loader
+        self._tracer = tracer
+        self._find_seconds = find_seconds
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._tracer._enter(module.__name__)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._tracer._exit(self._find_seconds)
+
+
+class ImportTracer(importlib.abc.MetaPathFinder):
+    """
+    記錄每個模組的匯入時間（類似 -X importtime）
+
+    放在 sys.meta_path 最前面，把查找交給其餘的 finder，再包裝找到的 loader。
+    """
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.records = []
+        self._stack = []
+        self._finding = set()
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname in self._finding:
+            return None
+        self._finding.add(fullname)
+        start = time.perf_counter()
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding.discard(fullname)
+        find_seconds = time.perf_counter() - start
+
+        # namespace package 或舊式 loader 無法包裝，不列入紀錄
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self, find_seconds)
+        return spec
+
+    def _enter(self, name):
+        # [模組名稱, 開始時間, 子模組累計時間]
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def _exit(self, find_seconds):
+        name, start, children = self._stack.pop()
+        cumulative = time.perf_counter() - start + find_seconds
+        if self._stack:
+            self._stack[-1][2] += cumulative
+        self.records.append({
+            "module": name,
+            "start": self.profiler._offset(start),
+            "self_us": int((cumulative - children) * 1e6),
+            "cumulative_us": int(cumulative * 1e6),
+            "depth": len(self._stack),
+        })
+
+
+class Profiler:
+    """
+    收集階段計時與匯入時間，並在結束時寫出 JSON trace
+
+    所有時間點都以行程啟動時間為原點（無法取得時以剖析器啟動時間為原點）。
+    """
+
+    def __init__(self, trace_path, trace_imports=False, command=None):
+        self.trace_path = trace_path
+        self.command = list(sys.argv if command is None else command)
+        self.phases = []
+        self._stack = []
+        self._written = False
+
+        self._started = time.perf_counter()
+        # 行程啟動到剖析器啟動之間的時間（直譯器啟動 + 剖析器之前的匯入）
+        self.startup_seconds = process_age()
+        self._origin = self._started - (self.startup_seconds or 0.0)
+        if self.startup_seconds is not None:
+            self.phases.append({"name": "interpreter startup", "start": 0.0,
+                                "seconds": self.startup_seconds, "depth": 0})
+
+        self.import_tracer = ImportTracer(self) if trace_imports else None
+        if self.import_tracer:
+            self.import_tracer.install()
+
+    def _offset(self, perf_time):
+        return perf_time - self._origin
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def to_dict(self):
+        """回傳 trace 內容（summary 欄位 + Chrome trace events）"""
+        total = time.perf_counter() - self._origin
+        phases = sorted(self.phases, key=lambda p: p["start"])
+        imports = self.import_tracer.records if self.import_tracer else []
+
+        events = [
+            {"name": p["name"], "cat": "phase", "ph": "X", "pid": os.getpid(), "tid": 0,
+             "ts": int(p["start"] * 1e6), "dur": int(p["seconds"] * 1e6)}
+            for p in phases
+        ]
+        events.extend(
+            {"name": record["module"], "cat": "import", "ph": "X", "pid": os.getpid(), "tid": 1,
+             "ts": int(record["start"] * 1e6), "dur": record["cumulative_us"],
+             "args": {"self_us": record["self_us"]}}
+            for record in imports
+        )
+        return {
+            "command": self.command,
+            "python": sys.version.split()[0],
+            "executable": sys.executable,
+            "pid": os.getpid(),
+            "total_seconds": total,
+            "startup_seconds": self.startup_seconds,
+            "phases": phases,
+            "imports": imports,
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+        }
+
+    def write(self):
+        """寫出 trace 並輸出摘要；只會執行一次（也由 atexit 呼叫）"""
+        if self._written:
+            return None
+        self._written = True
+        if self.import_tracer:
+            self.import_tracer.uninstall()
+
+        trace = self.to_dict()
+        with open(self.trace_path, "w", encoding="utf-8") as f:
+            json.dump(trace, f, indent=1)
+        print_summary(trace, self.trace_path)
+        return trace
+
+def print_summary(trace, trace_path, file=None):
+    """輸出各階段耗時與最耗時的匯入模組（輸出到 stderr，不影響 --json 等標準輸出）"""
+    file = sys.stderr if file is None else file
+    print(file=file)
+    print("效能剖析 / Profile", file=file)
+    print("-" * 70, file=file)
+    for p in trace["phases"]:
+        label = "  " * p["depth"] + p["name"]
+        print(f"  {label:<40} {p['seconds'] * 1000:>10.1f} ms", file=file)
+    print(f"  {'總計 / Total':<38} {trace['total_seconds'] * 1000:>10.1f} ms", file=file)
+
+    imports = sorted(trace["imports"], key=lambda r: r["self_us"], reverse=True)
+    if imports:
+        print(file=file)
+        top = min(TOP_IMPORTS, len(imports))
+        print(f"  最耗時的匯入 / Slowest imports (self, top {top}):", file=file)
+        for record in imports[:TOP_IMPORTS]:
+            print(f"    {record['module']:<44} {record['self_us'] / 1000:>8.1f} ms"
+                  f"  (cumulative {record['cumulative_us'] / 1000:.1f} ms)", file=file)
+    print(f"  Trace: {trace_path}", file=file)
+
+
+def default_trace_path(argv=None):
+    """回傳預設的 trace 路徑：<腳本名稱>.profile.json（目前目錄）"""
+    argv = sys.argv if argv is None else argv
+    script = os.path.splitext(os.path.basename(argv[0] if argv else ""))[0] or "python"
+    return f"{script}{TRACE_SUFFIX}"
+
+
+def start(trace_path=None, trace_imports=False):
+    """啟動全域剖析器，並在行程結束時寫出 trace"""
+    global _active
+    if _active is None:
+        _active = Profiler(trace_path or default_trace_path(), trace_imports)
+        atexit.register(_active.write)
+    return _active
+
+
+def start_from_argv(argv=None):
+    """
+    若命令列含有 --profile[=PATH] 或 --profile-imports 就啟動剖析器
+
+    這些選項會從 argv（預設 sys.argv）中移除，之後的參數解析不需要認得它們；
+    必須在匯入 pxr 之前呼叫，才能量測匯入時間。
+
+    Returns:
+        Profiler 或 None
+    """
+    argv = sys.argv if argv is None else argv
+    enabled = False
+    trace_imports = False
+    trace_path = None
+    remaining = argv[:1]
+    for arg in argv[1:]:
+        if arg == IMPORTS_OPTION:
+            enabled = trace_imports = True
+        elif arg == PROFILE_OPTION:
+            enabled = True
+        elif arg.startswith(PROFILE_OPTION + "="):
+            enabled = True
+            trace_path = arg.split("=", 1)[1] or None
+        else:
+            remaining.append(arg)
+    if not enabled:
+        return None
+    argv[:] = remaining
+    return start(trace_path or default_trace_path(argv), trace_imports)
+
+
+def add_arguments(parser):
+    """在 argparse 說明中列出剖析選項（實際由 start_from_argv 處理）"""
+    group = parser.add_argument_group("profiling")
+    group.add_argument(
+        PROFILE_OPTION, metavar="PATH", nargs="?", const=True,
+        help=f"record phase timings and write a JSON trace "
+             f"(--profile=PATH, default: <script>{TRACE_SUFFIX})",
+    )
+    group.add_argument(
+        IMPORTS_OPTION, action="store_true",
+        help="also time every module import, like python -X importtime (implies --profile)",
+    )
+
+
+def enabled():
+    return _active is not None
+
+
+def active():
+    return _active
+
+
+def phase(name):
+    """
+    量測一個階段的耗時；未啟用剖析時不做任何事
+
+    Example:
+        with usd_profile.phase("layer open"):
+            layer = Sdf.Layer.FindOrOpen(path)
+    """
+    if _active is None:
+        return _NULL_PHASE
+    return _active.phase(name)